@@ -1,12 +1,41 @@
-import matplotlib.pyplot as plt
-import threading, logging, time, random
-import pandas as pd
+from ...ack_batching import bic_increase
+from ...core.base import CongestionControl
+from ...rendering import Renderer, make_renderer
+from ...scheduler import EventScheduler
+from ...tracing import EventTable, Tracer, decode_file
 
 
-class BICTCPCongestionControl:
+# trace events, the templates reproduce the former log lines.
+EVENTS = EventTable()
+CWND = EVENTS.add('{} -- cwnd = {}')
+WMAX = EVENTS.add('{} -- wmax = {}')
+RTT_ACKS = EVENTS.add('{} -- {} acks: cwnd = {}')
+BELOW_LOW_WINDOW = EVENTS.add('{} -- cwnd({}) < low window({})')
+BELOW_WMAX = EVENTS.add('{} -- cwnd({}) < wmax({})')
+ABOVE_WMAX = EVENTS.add('{} -- cwnd({}) >= wmax({})')
+ABOVE_SMAX = EVENTS.add('{} -- bic increase({}) > Smax({})')
+BELOW_SMIN = EVENTS.add('{} -- bic increase({}) < Smin({})')
+PACKET_LOSS = EVENTS.add('{} -- PACKET LOSS')
+RECOVERY_LOW_WINDOW = EVENTS.add('{} -- FastRecovery: cwnd({}) < low window({})')
+RECOVERY_BELOW_WMAX = EVENTS.add('{} -- FastRecovery: cwnd({}) < wmax({})')
+RECOVERY_ABOVE_WMAX = EVENTS.add('{} -- FastRecovery: cwnd({}) >= wmax({})')
+
+
+class BICTCPCongestionControl(CongestionControl):
+
+    __slots__ = ('wmax', 'wmin', 'SMAX', 'SMIN', 'BETA', 'LOW_WINDOW', 'round_number', 'scheduler')
+
+    EVENTS = EVENTS
+    COLUMNS = ('round', 'cwnd', 'wmax', 'wmin')
+
+    # simulated seconds per round.
+    ROUND_TIME = 0.1
+    # packet losses are random()*LOSS_INTERVAL simulated seconds apart.
+    LOSS_INTERVAL = 5
 
     def __init__(self, cwnd:int, wmax:int, wmin:int, SMAX:int,
-                SMIN:int, BETA:float, LOW_WINDOW:int
+                SMIN:int, BETA:float, LOW_WINDOW:int, renderer:Renderer=None,
+                seed:int=None, tracer:Tracer=None,
         ):
         """
         Args:
@@ -20,10 +49,17 @@ class BICTCPCongestionControl:
             BETA (float): multiplicative window decrease factor. (constant)
             LOW_WINDOW (int): if the window size is larger than this threshold,
                                  BIC engages. (constant)
+            renderer (Renderer): draws the cwnd evolution, headless when None.
+            seed (int): seed of the random number generator, the same seed
+                           gives the same run.
+            tracer (Tracer): records the trace events, no tracing when None.
 
         Other Instance Variables:
-            is_running(bool): variable to stop threads when is False.
             round_number(int): The round number.
+            loss_count(int): number of packet losses so far.
+            random(random.Random): the flow's random number generator.
+            scheduler(EventScheduler): loss events on the simulated clock.
+            trace_mask(int): enabled trace events, 0 without a tracer.
         """
         self.cwnd = cwnd
         self.wmax = wmax
@@ -33,122 +69,141 @@ class BICTCPCongestionControl:
         self.BETA = BETA
         self.LOW_WINDOW = LOW_WINDOW
         self.round_number = 1
-        self.is_running = True
-
-        # setting up plot
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.line, = self.ax.plot([], [])
-        plt.xlabel('Round Number')
-        plt.ylabel('Congestion Window (cwnd)')
-        plt.title('Congestion Window Evolution')
-        plt.grid(True)
-        plt.show()
-        self.rounds, self.cwnd_values = [], []
-
-        # setting up Pandas dataFrame.
-        self.dataframe = pd.DataFrame(columns=['round', 'cwnd', 'wmax', 'wmin'])
-
-        # setting up logging.
-        logging.basicConfig(
-            level=logging.INFO, format='%(message)s',
-            filename='log.log', filemode='w',
-        )
-    
-        # simulating packet loss functionlity with thread.
-        self.packet_loss_thread = threading.Thread(target=self._packet_loss)
-        self.packet_loss_thread.start()
+        self._setup(renderer, seed, tracer)
+
+        # simulating packet loss functionlity with simulated-time events.
+        self.scheduler = EventScheduler()
+        self._schedule_packet_loss()
         
     def run(self):
+        """
+            one round of a single ACK.
+        """
+        self._ack()
+        self.renderer.update(self.round_number, self.cwnd)
+        self._fire_events()
+
+    def run_rtt(self, acks:int=None):
+        """
+            one round of a whole RTT: applies `acks` ACKs (a window's worth,
+            int(cwnd), by default) in closed form instead of one _ack() each.
+        """
+        if acks is None:
+            acks = int(self.cwnd)
+        self.cwnd = bic_increase(self.cwnd, self.wmax, acks, self.SMIN, self.SMAX, self.LOW_WINDOW)
+        if self.trace_mask & RTT_ACKS:
+            self.tracer.emit(RTT_ACKS, self.round_number, acks, self.cwnd)
+        self.renderer.update(self.round_number, self.cwnd)
+        self._fire_events()
+
+    def _ack(self):
         if self.cwnd < self.LOW_WINDOW :
-            logging.info(f"{self.round_number} -- cwnd({self.cwnd}) < low window({self.LOW_WINDOW})")
-            self.cwnd = self.cwnd + (1 / self.cwnd)
-            logging.info(f"{self.round_number} -- cwnd = {self.cwnd}")
+            self._low_window_increase()
             # everything is normal.
 
         else:
 
             if self.cwnd < self.wmax:
-                logging.info(f"{self.round_number} -- cwnd({self.cwnd}) < wmax({self.wmax})")
+                if self.trace_mask & BELOW_WMAX:
+                    self.tracer.emit(BELOW_WMAX, self.round_number, self.cwnd, self.wmax)
                 bic_increase = (self.wmax - self.cwnd) / 2
                          
             else:
                 # if window exceeds maximum increment.
-                logging.info(f"{self.round_number} -- cwnd({self.cwnd}) >= wmax({self.wmax})")
+                if self.trace_mask & ABOVE_WMAX:
+                    self.tracer.emit(ABOVE_WMAX, self.round_number, self.cwnd, self.wmax)
                 bic_increase = self.cwnd - self.wmax
             
             if bic_increase > self.SMAX:
                 # additve increase to prevent pressure to the network.
-                logging.info(f"{self.round_number} -- bic increase({bic_increase}) > Smax({self.SMAX})")
+                if self.trace_mask & ABOVE_SMAX:
+                    self.tracer.emit(ABOVE_SMAX, self.round_number, bic_increase, self.SMAX)
                 bic_increase = self.SMAX
 
             elif bic_increase < self.SMIN:
-                logging.info(f"{self.round_number} -- bic increase({bic_increase}) < Smin({self.SMIN})")
+                if self.trace_mask & BELOW_SMIN:
+                    self.tracer.emit(BELOW_SMIN, self.round_number, bic_increase, self.SMIN)
                 bic_increase = self.SMIN
 
             self.cwnd += (bic_increase/self.cwnd)
-            logging.info(f"{self.round_number} -- cwnd = {self.cwnd}")
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
-        self.cwnd_values.append(self.cwnd)
-        self.rounds.append(self.round_number)
+    def _low_window_increase(self):
+        if self.trace_mask & BELOW_LOW_WINDOW:
+            self.tracer.emit(BELOW_LOW_WINDOW, self.round_number, self.cwnd, self.LOW_WINDOW)
+        self.cwnd = self.cwnd + (1 / self.cwnd)
+        if self.trace_mask & CWND:
+            self.tracer.emit(CWND, self.round_number, self.cwnd)
 
-        self.line.set_data(self.rounds, self.cwnd_values)
-        self.ax.relim()
-        self.ax.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+    def _schedule_packet_loss(self):
+        self.scheduler.schedule(self.random.random() * self.LOSS_INTERVAL, '_random_packet_loss')
+
+    def _random_packet_loss(self):
+        """
+            scheduled loss event: handles the loss and schedules the next one
+            random()*LOSS_INTERVAL simulated seconds later.
+        """
+        self._packet_loss()
+        self._schedule_packet_loss()
 
     def _packet_loss(self):
         """
-            Another Thread is running and waiting until the random time(*5)
-            and then it invokes fast recovery method.
+            it invokes fast recovery method.
         """
-        while self.is_running:
-            number = random.random() * 5
-            time.sleep(number)
-            logging.error(f'{self.round_number} -- PACKET LOSS')
-            self._fast_recovery()
+        if self.trace_mask & PACKET_LOSS:
+            self.tracer.emit(PACKET_LOSS, self.round_number)
+        self.loss_count += 1
+        self._fast_recovery()
     
     def _fast_recovery(self):
         """
             it changes cnwd, wmax parameters.
         """
         if self.cwnd < self.LOW_WINDOW:
-            logging.info(f'{self.round_number} -- FastRecovery: cwnd({self.cwnd}) < low window({self.LOW_WINDOW})')
+            if self.trace_mask & RECOVERY_LOW_WINDOW:
+                self.tracer.emit(RECOVERY_LOW_WINDOW, self.round_number, self.cwnd, self.LOW_WINDOW)
             self.cwnd = self.cwnd * 0.5
-            logging.info(f"{self.round_number} -- cwnd = {self.cwnd}")
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
         else:
             
             if self.cwnd < self.wmax:
-                logging.info(f"{self.round_number} -- FastRecovery: cwnd({self.cwnd}) < wmax({self.wmax})")
+                if self.trace_mask & RECOVERY_BELOW_WMAX:
+                    self.tracer.emit(RECOVERY_BELOW_WMAX, self.round_number, self.cwnd, self.wmax)
                 self.wmax = self.cwnd * ((2-self.BETA)/2)
-                logging.info(f"{self.round_number} -- wmax = {self.wmax}")
+                if self.trace_mask & WMAX:
+                    self.tracer.emit(WMAX, self.round_number, self.wmax)
 
             else:
-                logging.info(f"{self.round_number} -- FastRecovery: cwnd({self.cwnd}) >= wmax({self.wmax})")
+                if self.trace_mask & RECOVERY_ABOVE_WMAX:
+                    self.tracer.emit(RECOVERY_ABOVE_WMAX, self.round_number, self.cwnd, self.wmax)
                 self.wmax = self.cwnd
-                logging.info(f"{self.round_number} -- wmax = {self.wmax}")
+                if self.trace_mask & WMAX:
+                    self.tracer.emit(WMAX, self.round_number, self.wmax)
 
             self.cwnd = self.cwnd * (1-self.BETA)
-            logging.info(f"{self.round_number} -- cwnd = {self.cwnd}")
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
-    def insert_paramaters_to_dataframe(self):
-        data = [self.round_number, self.cwnd, self.wmax, self.wmin]
-        self.dataframe.loc[len(self.dataframe)] = data
+    def state(self):
+        return (self.round_number, self.cwnd, self.wmax, self.wmin)
 
         
 if __name__ == '__main__':
     bic_tcp = BICTCPCongestionControl(
         cwnd=10, wmax= 30, wmin=5, 
-        SMIN=1, SMAX=5, LOW_WINDOW=4, BETA=0.125, 
+        SMIN=1, SMAX=5, LOW_WINDOW=4, BETA=0.125,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
     )
     for _ in range(1000):
         bic_tcp.run()
         bic_tcp.insert_paramaters_to_dataframe()
+        bic_tcp.tracer.end_round(bic_tcp.round_number)
         bic_tcp.round_number += 1
-        logging.info('')
 
-    bic_tcp.is_running = False
+    bic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
     bic_tcp.dataframe.to_csv('bic_tcp_parameters.csv', index=False)
-    plt.show(block=True)
+    bic_tcp.renderer.finish(block=True)
@@ -0,0 +1,153 @@
+from ...fixedpoint import ACK_RATIO_SHIFT, BETA_SCALE, HZ, bic_cnt, cong_avoid_ai, jiffies
+from ...rendering import Renderer, make_renderer
+from ...tracing import Tracer, decode_file
+from ..Article_implementation.bic import (
+    CWND, RECOVERY_ABOVE_WMAX, RECOVERY_BELOW_WMAX, RECOVERY_LOW_WINDOW, RTT_ACKS, WMAX,
+    BICTCPCongestionControl as ArticleBIC,
+)
+
+
+class BICTCPCongestionControl(ArticleBIC):
+    """
+        the Article implementation with the integer pipeline of Linux'
+        tcp_bic.c: cwnd in whole segments grown by one every cnt ACKs, cnt
+        from the binary search distance (fixedpoint.bic_cnt) scaled by the
+        delayed ACK ratio. Losses are those of the Article implementation,
+        so the same seed gives the same loss times.
+    """
+
+    __slots__ = ('beta', 'cnt', 'cwnd_cnt', 'last_cwnd', 'last_time', 'epoch_start', 'delayed_ack')
+
+    def __init__(self, cwnd:int, wmax:int, wmin:int, SMAX:int,
+                SMIN:int, BETA:float, LOW_WINDOW:int, renderer:Renderer=None,
+                seed:int=None, tracer:Tracer=None,
+        ):
+        """
+        Args:
+            cwnd (int): window size, in segments.
+            wmax (int): last_max_cwnd, the window size just before the
+                        last fast recovery.
+            wmin (int): the window size just after the last fast recovery
+                        (ssthresh).
+            SMAX (int): max_increment, the most segments added per RTT. (constant)
+            SMIN (int): not used, the kernel's smallest increment is
+                        BICTCP_B / SMOOTH_PART segments per RTT. (constant)
+            BETA (float): multiplicative window decrease factor, cwnd is
+                          multiplied by beta/BETA_SCALE = 1 - BETA. (constant)
+            LOW_WINDOW (int): low_window, BIC engages above it. (constant)
+            renderer, seed, tracer: as in the Article implementation.
+
+        Other Instance Variables:
+            beta(int): 1 - BETA in 1/BETA_SCALE.
+            cnt(int): ACKs per cwnd increment.
+            cwnd_cnt(int): ACKs counted towards the next increment.
+            last_cwnd(int), last_time(int): cwnd and jiffies of the last
+                                               update of cnt.
+            epoch_start(int): jiffies of the start of the epoch, 0 for none.
+            delayed_ack(int): segments per ACK in 1/2^ACK_RATIO_SHIFT.
+        """
+        super().__init__(int(cwnd), int(wmax), int(wmin), int(SMAX), SMIN, BETA, int(LOW_WINDOW), renderer, seed, tracer)
+        self.beta = round((1 - BETA) * BETA_SCALE)
+        if not 0 < self.beta < BETA_SCALE:
+            raise ValueError(f'BETA must be in (0, 1), got {BETA}')
+        self.cnt = 0
+        self.cwnd_cnt = 0
+        self.last_cwnd = 0
+        self.last_time = 0
+        self.epoch_start = 0
+        self.delayed_ack = 2 << ACK_RATIO_SHIFT
+
+    def run_rtt(self, acks:int=None):
+        """
+            one round of a whole RTT: `acks` ACKs (cwnd by default), one
+            cong_avoid each as in the kernel, evenly spaced over the round.
+        """
+        if acks is None:
+            acks = self.cwnd
+        start = self.scheduler.now
+        for i in range(acks):
+            self._ack(1, jiffies(start + i * self.ROUND_TIME / acks, HZ))
+        if self.trace_mask & RTT_ACKS:
+            self.tracer.emit(RTT_ACKS, self.round_number, acks, self.cwnd)
+        self.renderer.update(self.round_number, self.cwnd)
+        self._fire_events()
+
+    def _ack(self, acked:int=1, now:int=None):
+        """
+            bictcp_acked() then bictcp_cong_avoid() of one ACK covering
+            `acked` segments, received at jiffies `now` (the current
+            simulated time by default).
+        """
+        # delayed ACK ratio, an EWMA of the segments per ACK.
+        ratio = self.delayed_ack - (self.delayed_ack >> ACK_RATIO_SHIFT) + acked
+        self.delayed_ack = min(max(ratio, 1), 4096)
+
+        self._bic_update(now)
+        cwnd = self.cwnd
+        self.cwnd, self.cwnd_cnt = cong_avoid_ai(self.cwnd, self.cwnd_cnt, self.cnt, acked)
+        if self.cwnd != cwnd and self.trace_mask & CWND:
+            self.tracer.emit(CWND, self.round_number, self.cwnd)
+
+    def _bic_update(self, now:int=None):
+        """
+            bictcp_update(): cnt is recomputed when cwnd changed or every
+            HZ/32 jiffies.
+        """
+        if now is None:
+            now = jiffies(self.scheduler.now, HZ)
+        if self.last_cwnd == self.cwnd and now - self.last_time <= HZ // 32:
+            return
+        self.last_cwnd = self.cwnd
+        self.last_time = now
+        if self.epoch_start == 0:
+            # record the beginning of an epoch.
+            self.epoch_start = now
+        self.cnt = bic_cnt(self.cwnd, self.wmax, self.SMAX, self.LOW_WINDOW, self.delayed_ack)
+
+    def _fast_recovery(self):
+        """
+            bictcp_recalc_ssthresh(); fast recovery ends with cwnd = ssthresh.
+        """
+        self.epoch_start = 0
+        if self.cwnd <= self.LOW_WINDOW:
+            if self.trace_mask & RECOVERY_LOW_WINDOW:
+                self.tracer.emit(RECOVERY_LOW_WINDOW, self.round_number, self.cwnd, self.LOW_WINDOW)
+        elif self.cwnd < self.wmax:
+            if self.trace_mask & RECOVERY_BELOW_WMAX:
+                self.tracer.emit(RECOVERY_BELOW_WMAX, self.round_number, self.cwnd, self.wmax)
+        elif self.trace_mask & RECOVERY_ABOVE_WMAX:
+            self.tracer.emit(RECOVERY_ABOVE_WMAX, self.round_number, self.cwnd, self.wmax)
+
+        # wmax is remembered below low_window too, unlike the Article implementation.
+        if self.cwnd < self.wmax:
+            self.wmax = self.cwnd * (BETA_SCALE + self.beta) // (2 * BETA_SCALE)
+        else:
+            self.wmax = self.cwnd
+        if self.trace_mask & WMAX:
+            self.tracer.emit(WMAX, self.round_number, self.wmax)
+
+        if self.cwnd <= self.LOW_WINDOW:
+            self.wmin = max(self.cwnd >> 1, 2)
+        else:
+            self.wmin = max(self.cwnd * self.beta // BETA_SCALE, 2)
+        self.cwnd = self.wmin
+        if self.trace_mask & CWND:
+            self.tracer.emit(CWND, self.round_number, self.cwnd)
+
+
+if __name__ == '__main__':
+    bic_tcp = BICTCPCongestionControl(
+        cwnd=10, wmax=30, wmin=5,
+        SMIN=1, SMAX=16, LOW_WINDOW=14, BETA=0.2,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
+    )
+    for _ in range(1000):
+        bic_tcp.run_rtt()
+        bic_tcp.insert_paramaters_to_dataframe()
+        bic_tcp.tracer.end_round(bic_tcp.round_number)
+        bic_tcp.round_number += 1
+
+    bic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
+    bic_tcp.dataframe.to_csv('bic_tcp_parameters.csv', index=False)
+    bic_tcp.renderer.finish(block=True)
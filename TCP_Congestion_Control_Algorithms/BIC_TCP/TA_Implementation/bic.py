@@ -1,12 +1,34 @@
-import matplotlib.pyplot as plt
-import logging, random
-import pandas as pd
+from ...core.base import CongestionControl
+from ...rendering import Renderer, make_renderer
+from ...tracing import EventTable, Tracer, decode_file
 
 
-class BICTCPCongestionControl:
+# trace events, the templates reproduce the former log lines.
+EVENTS = EventTable()
+CWND = EVENTS.add('{} -- cwnd = {}')
+WMAX = EVENTS.add('{} -- wmax = {}')
+WMIN = EVENTS.add('{} -- wmin = {}')
+MIDPOINT = EVENTS.add('{} -- midpoint = {}')
+BELOW_LOW_WINDOW = EVENTS.add('{} -- cwnd({}) < low window({})')
+ABOVE_SMAX = EVENTS.add('{} -- wmax({}) - cwnd({}) > smax({})')
+ABOVE_WMAX = EVENTS.add('{} -- cwnd({}) > wmax({})')
+BELOW_SMIN = EVENTS.add('{} -- wmax({}) - wmin({}) < smin({})')
+BINARY_SEARCH_INCREASE = EVENTS.add('{} -- Binary Search Increase')
+ADDITIVE_INCREASE = EVENTS.add('{} -- Additive Increase')
+SLOW_START = EVENTS.add('{} -- Slow Start')
+PACKET_LOSS = EVENTS.add('{} -- PACKET LOSS')
+
+
+class BICTCPCongestionControl(CongestionControl):
+
+    __slots__ = ('wmax', 'wmin', 'SMAX', 'SMIN', 'LOW_WINDOW', 'round_number', 'pending_loss')
+
+    EVENTS = EVENTS
+    COLUMNS = ('round', 'cwnd', 'wmax', 'wmin')
 
     def __init__(self, cwnd:int, wmax:int, wmin:int, SMAX:int,
-                SMIN:int, LOW_WINDOW:int, 
+                SMIN:int, LOW_WINDOW:int, renderer:Renderer=None,
+                seed:int=None, tracer:Tracer=None,
         ):
         """
         Args:
@@ -19,9 +41,19 @@ class BICTCPCongestionControl:
             SMIN (int): minimum increment. (constant)
             LOW_WINDOW (int): if the window size is larger than this threshold,
                                  BIC engages. (constant)
+            renderer (Renderer): draws the cwnd evolution, headless when None.
+            seed (int): seed of the random number generator, the same seed
+                           gives the same run.
+            tracer (Tracer): records the trace events, no tracing when None.
             
             Other Instance Variables:
                 round_number(int): The round number.
+                loss_count(int): number of packet losses so far.
+                random(random.Random): the flow's random number generator.
+                pending_loss(bool): loss reported by a network (see netsim.py) for
+                                       the next binary search, None draws the
+                                       loss at random.
+                trace_mask(int): enabled trace events, 0 without a tracer.
         """
         self.cwnd = cwnd
         self.wmax = wmax
@@ -30,106 +62,105 @@ class BICTCPCongestionControl:
         self.SMIN = SMIN
         self.LOW_WINDOW = LOW_WINDOW
         self.round_number = 1
-
-        # setting up plot
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.line, = self.ax.plot([], [])
-        plt.xlabel('Round Number')
-        plt.ylabel('Congestion Window (cwnd)')
-        plt.title('Congestion Window Evolution')
-        plt.grid(True)
-        plt.show()
-        self.rounds, self.cwnd_values = [], []
-
-        # setting up Pandas dataFrame.
-        self.dataframe = pd.DataFrame(columns=['round', 'cwnd', 'wmax', 'wmin'])
-
-        # setting up logging.
-        logging.basicConfig(
-            level=logging.INFO, format='%(message)s',
-            filename='log.log', filemode='w',
-        )
+        self.pending_loss = None
+        self._setup(renderer, seed, tracer)
             
     def run(self):
         if self.cwnd < self.LOW_WINDOW :
-            logging.info(f"{self.round_number} -- cwnd({self.cwnd}) < low window({self.LOW_WINDOW})")
-            self.cwnd *= 0.5
-            logging.info(f"{self.round_number} -- cwnd = {self.cwnd}")
+            self._low_window_decrease()
 
         else:
             self._binary_search_increase()
     
             if self.wmax - self.cwnd > self.SMAX:
-                logging.info(f"{self.round_number} -- wmax({self.wmax}) - cwnd({self.cwnd}) > smax({self.SMAX})")
+                if self.trace_mask & ABOVE_SMAX:
+                    self.tracer.emit(ABOVE_SMAX, self.round_number, self.wmax, self.cwnd, self.SMAX)
                 self._additive_increase()
 
             if self.cwnd > self.wmax:
-                logging.info(f"{self.round_number} -- cwnd({self.cwnd}) > wmax({self.wmax})")
+                if self.trace_mask & ABOVE_WMAX:
+                    self.tracer.emit(ABOVE_WMAX, self.round_number, self.cwnd, self.wmax)
                 self._slow_start()
 
-        self.cwnd_values.append(self.cwnd)
-        self.rounds.append(self.round_number)
-
-        self.line.set_data(self.rounds, self.cwnd_values)
-        self.ax.relim()
-        self.ax.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+        self.renderer.update(self.round_number, self.cwnd)
     
+    def _low_window_decrease(self):
+        if self.trace_mask & BELOW_LOW_WINDOW:
+            self.tracer.emit(BELOW_LOW_WINDOW, self.round_number, self.cwnd, self.LOW_WINDOW)
+        self.cwnd *= 0.5
+        if self.trace_mask & CWND:
+            self.tracer.emit(CWND, self.round_number, self.cwnd)
+
     def _binary_search_increase(self):
-        logging.info(f"{self.round_number} -- Binary Search Increase")
+        if self.trace_mask & BINARY_SEARCH_INCREASE:
+            self.tracer.emit(BINARY_SEARCH_INCREASE, self.round_number)
         midpoint = (self.wmax + self.wmin) / 2
-        logging.info(f"{self.round_number} -- midpoint = {midpoint}")
+        if self.trace_mask & MIDPOINT:
+            self.tracer.emit(MIDPOINT, self.round_number, midpoint)
         if self.wmax - self.wmin < self.SMIN:
-            logging.info(f"{self.round_number} -- wmax({self.wmax}) - wmin({self.wmin}) < smin({self.SMIN})")
+            if self.trace_mask & BELOW_SMIN:
+                self.tracer.emit(BELOW_SMIN, self.round_number, self.wmax, self.wmin, self.SMIN)
             self.cwnd = midpoint
         else:
             if self._is_packet_loss():
-                logging.error(f'{self.round_number} -- PACKET LOSS')
+                if self.trace_mask & PACKET_LOSS:
+                    self.tracer.emit(PACKET_LOSS, self.round_number)
+                self.loss_count += 1
                 self.wmax = midpoint
-                logging.info(f'{self.round_number} -- wmax = {self.wmax}')
+                if self.trace_mask & WMAX:
+                    self.tracer.emit(WMAX, self.round_number, self.wmax)
             else:
                 self.wmin = midpoint
-                logging.info(f'{self.round_number} -- wmin = {self.wmin}')
+                if self.trace_mask & WMIN:
+                    self.tracer.emit(WMIN, self.round_number, self.wmin)
         
     def _additive_increase(self):
-        logging.info(f'{self.round_number} -- Additive Increase')
+        if self.trace_mask & ADDITIVE_INCREASE:
+            self.tracer.emit(ADDITIVE_INCREASE, self.round_number)
         if self.wmax - self.cwnd > self.SMAX:
-            logging.info(f'{self.round_number} -- wmax({self.wmax}) - cwnd({self.cwnd}) > smax({self.SMAX})')
+            if self.trace_mask & ABOVE_SMAX:
+                self.tracer.emit(ABOVE_SMAX, self.round_number, self.wmax, self.cwnd, self.SMAX)
             self.cwnd += self.SMAX
-            logging.info(f'{self.round_number} -- cwnd = {self.cwnd}')
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
         else:
             self.cwnd = self.wmax
-            logging.info(f'{self.round_number} -- cwnd = {self.cwnd}')
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
 
     def _slow_start(self):
-        logging.info(f'{self.round_number} -- Slow Start')
+        if self.trace_mask & SLOW_START:
+            self.tracer.emit(SLOW_START, self.round_number)
         while self.cwnd < self.wmax + self.SMAX:
             self.cwnd += self.SMAX
-            logging.info(f'{self.round_number} -- cwnd = {self.cwnd}')
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
     def _is_packet_loss(self):
-        return random.random() > 0.7
+        if self.pending_loss is not None:
+            loss, self.pending_loss = self.pending_loss, False
+            return loss
+        return self.random.random() > 0.7
         
-    def insert_paramaters_to_dataframe(self):
-        data = [self.round_number, self.cwnd, self.wmax, self.wmin]
-        self.dataframe.loc[len(self.dataframe)] = data
+    def state(self):
+        return (self.round_number, self.cwnd, self.wmax, self.wmin)
 
         
 if __name__ == '__main__':
     bic_tcp = BICTCPCongestionControl(
         cwnd=10, wmax= 30, wmin=5,
-        SMIN=1, SMAX=5, LOW_WINDOW=4
+        SMIN=1, SMAX=5, LOW_WINDOW=4,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
     )
     
     for _ in range(50):
         bic_tcp.run()
         bic_tcp.insert_paramaters_to_dataframe()
+        bic_tcp.tracer.end_round(bic_tcp.round_number)
         bic_tcp.round_number += 1
-        logging.info('')
 
-    bic_tcp.is_running = False
+    bic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
     bic_tcp.dataframe.to_csv('bic_tcp_parameters.csv', index=False)
-    plt.show(block=True)
+    bic_tcp.renderer.finish(block=True)
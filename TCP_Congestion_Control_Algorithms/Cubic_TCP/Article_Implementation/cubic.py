@@ -1,12 +1,65 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import time, threading, logging, random
+import math
 
+from ...ack_batching import cnt_increase
+from ...core.base import CongestionControl
+from ...rendering import Renderer, make_renderer
+from ...scheduler import EventScheduler
+from ...tracing import EventTable, Tracer, decode_file
 
-class CubicTCPCongestionControl:
+
+# trace events, the templates reproduce the former log lines.
+EVENTS = EventTable()
+DMIN = EVENTS.add('{} -- dmin: {}')
+CWND = EVENTS.add('{} -- cnwd: {}')
+CWND_CNT = EVENTS.add('{} -- cwnd_cnt: {}')
+CNT = EVENTS.add('{} -- cnt: {}')
+BELOW_SSTHRESH = EVENTS.add('{} -- cnwd({}) < ssthresh({})')
+ABOVE_SSTHRESH = EVENTS.add('{} -- cnwd({}) > ssthresh({})')
+ABOVE_CNT = EVENTS.add('{} -- cwnd_cnt({}) > cnt: ({})')
+BELOW_CNT = EVENTS.add('{} -- cwnd_cnt({}) < cnt: ({})')
+SLOW_START_ACKS = EVENTS.add('{} -- slow start {} acks, cnwd: {}')
+RTT_ACKS = EVENTS.add('{} -- {} acks, cwnd: {}, cwnd_cnt: {}')
+PACKET_LOSS = EVENTS.add('{} -- PACKET LOSS')
+FAST_CONVERGENCE = EVENTS.add('{} -- fast_convergence({}) and cwnd({}) < wlast_max({})')
+LOSS_DECREASE = EVENTS.add('{} -- ssthresh:{}, cwnd:{}')
+TIMEOUT = EVENTS.add('{} -- TIMEOUT')
+CUBIC_UPDATE = EVENTS.add('{} -- Cubic Update')
+ACK_CNT = EVENTS.add('{} -- ack_cnt: {}')
+NEW_EPOCH = EVENTS.add('{} -- no epoch')
+EPOCH_START = EVENTS.add('{} -- epoch_start: {}')
+BELOW_WLAST_MAX = EVENTS.add('{} -- cwnd({}) < wlast_max({})')
+ORIGIN = EVENTS.add('{} -- k: {}, origin_point: {}')
+EPOCH_WTCP = EVENTS.add('{} -- ack_cnt: {}, wtcp: {}')
+TARGET = EVENTS.add('{} -- t: {}, target: {}, cwnd: {}')
+ABOVE_TARGET = EVENTS.add('{} -- target({}) > cwnd({})')
+BELOW_TARGET = EVENTS.add('{} -- target({}) < cwnd({})')
+TCP_FRIENDLINESS = EVENTS.add('{} -- TCP Friendliness')
+FRIENDLY_WTCP = EVENTS.add('{} -- wtcp: {}, ack_cnt: {}')
+WTCP_AHEAD = EVENTS.add('{} -- wtcp({}) > cwnd({})')
+ABOVE_MAX_CNT = EVENTS.add('{} -- cnt({}) > max_cnt({})')
+MAX_CNT = EVENTS.add('{} -- max_cnt: {}, cnt: {}')
+
+
+class CubicTCPCongestionControl(CongestionControl):
+
+    __slots__ = (
+        'C', 'BETA', 'tcp_friendliness', 'fast_convergence', 'wlast_max', 'k', 'origin_point',
+        'ack_cnt', 'cwnd_cnt', 'wtcp', 'ssthresh', 'epoch_start', 'round_number', 'dMin',
+        'target', 'cnt', 'scheduler',
+    )
+
+    EVENTS = EVENTS
+    COLUMNS = ('round', 'cwnd', 'wlast_max', 'wtcp', 'epoch_start', 'origin_point', 'dMin', 'ack_cnt')
+
+    # simulated seconds per round.
+    ROUND_TIME = 0.1
+    # packet losses and timeouts are random()*INTERVAL simulated seconds apart.
+    LOSS_INTERVAL = 3
+    TIMEOUT_INTERVAL = 6
 
     def __init__(self, cwnd:float, C:float, BETA:float,
-                tcp_friendliness:bool, fast_convergence:bool):
+                tcp_friendliness:bool, fast_convergence:bool, renderer:Renderer=None,
+                seed:int=None, tracer:Tracer=None):
         """
         Args:
             C(float): cubic parameter. (constant)
@@ -15,10 +68,18 @@ class CubicTCPCongestionControl:
             fast_convergence(bool): if True when a loss event occurs, before a window reduction of the congestion window, the protocol
                                        remembers the last value of Wmax.
             tcp_friendliness(bool):
+            renderer(Renderer): draws the cwnd evolution, headless when None.
+            seed(int): seed of the random number generator, the same seed
+                          gives the same run.
+            tracer(Tracer): records the trace events, no tracing when None.
 
         Other Instance Variables:
-            is_running(bool): variable to stop packet loss and timeout threads when is False.
             round_number(int): The round number.
+            loss_count(int): number of packet losses so far.
+            random(random.Random): the flow's random number generator.
+            scheduler(EventScheduler): loss and timeout events on the simulated clock,
+                                          scheduler.now is the current time.
+            trace_mask(int): enabled trace events, 0 without a tracer.
 
             wlast_max(float): last value of wmax.
 
@@ -26,7 +87,9 @@ class CubicTCPCongestionControl:
                           to the wlast_max without encountering further packet loss.
 
             epoch_start(float): timestamp marking the beginning
-                                    of the current congestion epoch.
+                                    of the current congestion epoch, None
+                                    for none (the simulated clock starts
+                                    at 0, a valid start); recorded as 0.
 
             origin_point(float): congestion window value at the beginning
                                     of the current congestion epoch.
@@ -37,11 +100,12 @@ class CubicTCPCongestionControl:
             wtcp(float): target congestion window during
                              TCP-friendliness calculations.
 
+            target(float): cubic window target of the last cubic update.
+
             ssthresh(float): slow-start threshold, which determines
                                  the maximum congestion window size during
                                  the slow-start phase.
 
-            tcp_timestamp(float): timestamp representing the current time.
         """
         self.C = C
         self.BETA = BETA 
@@ -56,162 +120,217 @@ class CubicTCPCongestionControl:
         self.cwnd_cnt = 0
         self.wtcp = 0
         self.ssthresh = 30
-        self.epoch_start = 0
+        self.epoch_start = None
         self.round_number = 1
         self.dMin = 0 
+        self._setup(renderer, seed, tracer)
 
-        # setting up logging 
-        logging.basicConfig(
-            level=logging.INFO, format='%(message)s',
-            filename='log.log', filemode='w',
-        )
-
-        # setting up Pandas dataFrame.
-        self.dataframe = pd.DataFrame(columns=['round', 'cwnd', 'wlast_max', 'wtcp', 'epoch_start', 'origin_point', 'dMin', 'ack_cnt'])
-
-        # setting up plot
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.line, = self.ax.plot([], [])
-        plt.xlabel('Round Number')
-        plt.ylabel('Congestion Window (cwnd)')
-        plt.title('Congestion Window Evolution')
-        plt.grid(True)
-        plt.show()
-        self.rounds, self.cwnd_values = [], []
-
-        self.is_running = True
-        # setting up thread for packet loss.
-        packet_loss_thread = threading.Thread(target=self._packet_loss, daemon=True)
-        packet_loss_thread.start()
-        
-        # setting up thread for timeout.
-        timeout_thread = threading.Thread(target=self._timeout, daemon=True)
-        timeout_thread.start()
+        # setting up simulated-time events for packet loss and timeout.
+        self.scheduler = EventScheduler()
+        self._schedule_packet_loss()
+        self._schedule_timeout()
+
+    def run(self, rtt:float=None):
+        """
+            one round of a single ACK. rtt is the RTT sample of the round,
+            drawn at random when None.
+        """
+        self._sample_rtt(rtt)
+        self._ack()
+        self.renderer.update(self.round_number, self.cwnd)
+        self._fire_events()
 
-    def run(self):
-        rtt = random.uniform(0,1)
+    def run_rtt(self, acks:int=None, rtt:float=None):
+        """
+            one round of a whole RTT: applies `acks` ACKs (a window's worth,
+            int(cwnd), by default) in closed form instead of one _ack() each.
+        """
+        if acks is None:
+            acks = int(self.cwnd)
+        self._sample_rtt(rtt)
+        self._acks(acks)
+        self.renderer.update(self.round_number, self.cwnd)
+        self._fire_events()
+
+    def _sample_rtt(self, rtt:float=None):
+        if rtt is None:
+            rtt = self.random.uniform(0,1)
         if self.dMin != 0:
             self.dMin = min(self.dMin, rtt)
         else:
             self.dMin = rtt
-        logging.info(f'{self.round_number} -- dmin: {self.dMin}')
+        if self.trace_mask & DMIN:
+            self.tracer.emit(DMIN, self.round_number, self.dMin)
+
+    def _ack(self):
         if self.cwnd < self.ssthresh:
-            logging.info(f'{self.round_number} -- cnwd({self.cwnd}) < ssthresh({self.ssthresh})')
+            if self.trace_mask & BELOW_SSTHRESH:
+                self.tracer.emit(BELOW_SSTHRESH, self.round_number, self.cwnd, self.ssthresh)
             self.cwnd += 1
-            logging.info(f'{self.round_number} -- cnwd: {self.cwnd}')
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
 
         else:
-            logging.info(f'{self.round_number} -- cnwd({self.cwnd}) > ssthresh({self.ssthresh})')
+            if self.trace_mask & ABOVE_SSTHRESH:
+                self.tracer.emit(ABOVE_SSTHRESH, self.round_number, self.cwnd, self.ssthresh)
             self._cubic_update()
             if self.cwnd_cnt > self.cnt:
-                logging.info(f'{self.round_number} -- cwnd_cnt({self.cwnd_cnt}) > cnt: ({self.cnt})')
+                if self.trace_mask & ABOVE_CNT:
+                    self.tracer.emit(ABOVE_CNT, self.round_number, self.cwnd_cnt, self.cnt)
                 self.cwnd += 1
                 self.cwnd_cnt = 0
             else:
-                logging.info(f'{self.round_number} -- cwnd_cnt({self.cwnd_cnt}) < cnt: ({self.cnt})')
+                if self.trace_mask & BELOW_CNT:
+                    self.tracer.emit(BELOW_CNT, self.round_number, self.cwnd_cnt, self.cnt)
                 self.cwnd_cnt += 1
-                logging.info(f'{self.round_number} -- cwnd_cnt: {self.cwnd_cnt}')
+                if self.trace_mask & CWND_CNT:
+                    self.tracer.emit(CWND_CNT, self.round_number, self.cwnd_cnt)
 
-        self.cwnd_values.append(self.cwnd)
-        self.rounds.append(self.round_number)
+    def _acks(self, acks:int):
+        """
+            `acks` ACKs at once. slow start takes one ACK per segment up to
+            ssthresh; the remaining ACKs share one cubic update (the target
+            and the wtcp estimate are computed once, with ack_cnt = acks) and
+            grow cwnd by the closed form of the cwnd_cnt/cnt counting
+            (ack_batching.cnt_increase, checked against cnt_increase_per_ack).
+        """
+        if self.cwnd < self.ssthresh:
+            slow_start = min(acks, math.ceil(self.ssthresh - self.cwnd))
+            self.cwnd += slow_start
+            acks -= slow_start
+            if self.trace_mask & SLOW_START_ACKS:
+                self.tracer.emit(SLOW_START_ACKS, self.round_number, slow_start, self.cwnd)
+        if acks > 0:
+            self._cubic_update(acks)
+            wtcp = self.wtcp if self.tcp_friendliness else None
+            self.cwnd, self.cwnd_cnt, self.cnt = cnt_increase(self.cwnd, self.cwnd_cnt, acks, self.target, wtcp)
+            if self.trace_mask & RTT_ACKS:
+                self.tracer.emit(RTT_ACKS, self.round_number, acks, self.cwnd, self.cwnd_cnt)
 
-        self.line.set_data(self.rounds, self.cwnd_values)
-        self.ax.relim()
-        self.ax.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+    def _schedule_packet_loss(self):
+        self.scheduler.schedule(self.random.random() * self.LOSS_INTERVAL, '_random_packet_loss')
+
+    def _schedule_timeout(self):
+        self.scheduler.schedule(self.random.random() * self.TIMEOUT_INTERVAL, '_random_timeout')
+
+    def _random_packet_loss(self):
+        self._packet_loss()
+        self._schedule_packet_loss()
+
+    def _random_timeout(self):
+        self._timeout()
+        self._schedule_timeout()
 
     def _packet_loss(self):
-        while self.is_running:
-            number = random.random() * 3
-            time.sleep(number)
-            logging.error(f'{self.round_number} -- PACKET LOSS')
-            self.epoch_start = 0
-            if self.fast_convergence and self.cwnd < self.wlast_max:
-                logging.info(f'{self.round_number} -- fast_convergence({self.fast_convergence}) and cwnd({self.cwnd}) < wlast_max({self.wlast_max})')
-                self.wlast_max = self.cwnd * (2-self.BETA)/2
-            else:
-                logging.info(f'{self.round_number} -- fast_convergence({self.fast_convergence}) and cwnd({self.cwnd}) < wlast_max({self.wlast_max})')
-                self.wlast_max = self.cwnd
-            
-            self.ssthresh = self.cwnd
-            self.cwnd *= (1-self.BETA)
-            logging.info(f'{self.round_number} -- ssthresh:{self.ssthresh}, cwnd:{self.cwnd}')
+        if self.trace_mask & PACKET_LOSS:
+            self.tracer.emit(PACKET_LOSS, self.round_number)
+        self.loss_count += 1
+        self.epoch_start = None
+        if self.fast_convergence and self.cwnd < self.wlast_max:
+            if self.trace_mask & FAST_CONVERGENCE:
+                self.tracer.emit(FAST_CONVERGENCE, self.round_number, self.fast_convergence, self.cwnd, self.wlast_max)
+            self.wlast_max = self.cwnd * (2-self.BETA)/2
+        else:
+            if self.trace_mask & FAST_CONVERGENCE:
+                self.tracer.emit(FAST_CONVERGENCE, self.round_number, self.fast_convergence, self.cwnd, self.wlast_max)
+            self.wlast_max = self.cwnd
+        
+        self.ssthresh = self.cwnd
+        self.cwnd *= (1-self.BETA)
+        if self.trace_mask & LOSS_DECREASE:
+            self.tracer.emit(LOSS_DECREASE, self.round_number, self.ssthresh, self.cwnd)
 
     def _timeout(self):
-        while self.is_running:
-            number = random.random() * 6
-            time.sleep(number)
-            logging.error(f'{self.round_number} -- TIMEOUT')
+        if self.trace_mask & TIMEOUT:
+            self.tracer.emit(TIMEOUT, self.round_number)
         self._cubic_reset()
 
-    def _cubic_update(self):
-        logging.info(f'{self.round_number} -- Cubic Update')
-        self.ack_cnt += 1
-        logging.info(f'{self.round_number} -- ack_cnt: {self.ack_cnt}')
-        if self.epoch_start <= 0:
-            logging.info(f'{self.round_number} -- epoch_start({self.epoch_start}) <= 0')
-            self.epoch_start = time.time()
-            logging.info(f'{self.round_number} -- epoch_start: {self.epoch_start}')
+    def _cubic_update(self, acked:int=1):
+        if self.trace_mask & CUBIC_UPDATE:
+            self.tracer.emit(CUBIC_UPDATE, self.round_number)
+        self.ack_cnt += acked
+        if self.trace_mask & ACK_CNT:
+            self.tracer.emit(ACK_CNT, self.round_number, self.ack_cnt)
+        if self.epoch_start is None:
+            if self.trace_mask & NEW_EPOCH:
+                self.tracer.emit(NEW_EPOCH, self.round_number)
+            self.epoch_start = self.scheduler.now
+            if self.trace_mask & EPOCH_START:
+                self.tracer.emit(EPOCH_START, self.round_number, self.epoch_start)
             if self.cwnd < self.wlast_max:
-                logging.info(f'{self.round_number} -- cwnd({self.cwnd}) < wlast_max({self.wlast_max})')
-                self.k = ((self.wlast_max - self.cwnd) / self.c) ** (1/3)
+                if self.trace_mask & BELOW_WLAST_MAX:
+                    self.tracer.emit(BELOW_WLAST_MAX, self.round_number, self.cwnd, self.wlast_max)
+                self.k = ((self.wlast_max - self.cwnd) / self.C) ** (1/3)
                 self.origin_point = self.wlast_max
             else:
-                logging.info(f'{self.round_number} -- cwnd({self.cwnd}) < wlast_max({self.wlast_max})')
+                if self.trace_mask & BELOW_WLAST_MAX:
+                    self.tracer.emit(BELOW_WLAST_MAX, self.round_number, self.cwnd, self.wlast_max)
                 self.k = 0
                 self.origin_point = self.cwnd
-            logging.info(f'{self.round_number} -- k: {self.k}, origin_point: {self.origin_point}')
-            self.ack_cnt = 1
+            if self.trace_mask & ORIGIN:
+                self.tracer.emit(ORIGIN, self.round_number, self.k, self.origin_point)
+            self.ack_cnt = acked
             self.wtcp = self.cwnd
-            logging.info(f'{self.round_number} -- ack_cnt: {self.ack_cnt}, wtcp: {self.wtcp}')
+            if self.trace_mask & EPOCH_WTCP:
+                self.tracer.emit(EPOCH_WTCP, self.round_number, self.ack_cnt, self.wtcp)
 
-        t = time.time() + self.dMin - self.epoch_start
+        t = self.scheduler.now + self.dMin - self.epoch_start
         target = self.origin_point + self.C * (t-self.k)**3
-        logging.info(f'{self.round_number} -- t: {t}, target: {target}, cwnd: {self.cwnd}')
+        self.target = target
+        if self.trace_mask & TARGET:
+            self.tracer.emit(TARGET, self.round_number, t, target, self.cwnd)
         if target > self.cwnd:
-            logging.info(f'{self.round_number} -- target({target}) > cwnd({self.cwnd})')
+            if self.trace_mask & ABOVE_TARGET:
+                self.tracer.emit(ABOVE_TARGET, self.round_number, target, self.cwnd)
             self.cnt = self.cwnd / (target - self.cwnd)
         else:
-            logging.info(f'{self.round_number} -- target({target}) < cwnd({self.cwnd})')
+            if self.trace_mask & BELOW_TARGET:
+                self.tracer.emit(BELOW_TARGET, self.round_number, target, self.cwnd)
             self.cnt = 100 * self.cwnd
-        logging.info(f"{self.round_number} -- cnt: {self.cnt}")
+        if self.trace_mask & CNT:
+            self.tracer.emit(CNT, self.round_number, self.cnt)
         if self.tcp_friendliness:
             self._cubic_tcp_friendliness()
         
     def _cubic_tcp_friendliness(self):
-        logging.info(f'{self.round_number} -- TCP Friendliness')
+        if self.trace_mask & TCP_FRIENDLINESS:
+            self.tracer.emit(TCP_FRIENDLINESS, self.round_number)
         self.wtcp = self.wtcp + (3*self.BETA)/(2-self.BETA) * (self.ack_cnt/self.cwnd)
         self.ack_cnt = 0
-        logging.info(f'{self.round_number} -- wtcp: {self.wlast_max}, ack_cnt: {self.ack_cnt}')
+        if self.trace_mask & FRIENDLY_WTCP:
+            self.tracer.emit(FRIENDLY_WTCP, self.round_number, self.wlast_max, self.ack_cnt)
         if self.wtcp > self.cwnd:
-            logging.info(f'{self.round_number} -- wtcp({self.wtcp}) > cwnd({self.cwnd})')
+            if self.trace_mask & WTCP_AHEAD:
+                self.tracer.emit(WTCP_AHEAD, self.round_number, self.wtcp, self.cwnd)
             max_cnt = (self.cwnd)/(self.wtcp-self.cwnd)
             if self.cnt > max_cnt:
-                logging.info(f'{self.round_number} -- cnt({self.cnt}) > max_cnt({max_cnt})')
+                if self.trace_mask & ABOVE_MAX_CNT:
+                    self.tracer.emit(ABOVE_MAX_CNT, self.round_number, self.cnt, max_cnt)
                 self.cnt = max_cnt
-            logging.info(f'{self.round_number} -- max_cnt: {max_cnt}, cnt: {self.cnt}')
+            if self.trace_mask & MAX_CNT:
+                self.tracer.emit(MAX_CNT, self.round_number, max_cnt, self.cnt)
 
     def _cubic_reset(self):
-        self.wlast_max, self.epoch_start, self.origin_point = 0, 0, 0 
+        self.wlast_max, self.epoch_start, self.origin_point = 0, None, 0
         self.dMin, self.wtcp, self.k ,self.ack_cnt = 0, 0, 0, 0 
 
-    def insert_paramaters_to_dataframe(self):
-        data = [self.round_number, self.cwnd, self.wlast_max, self.wtcp, self.epoch_start, self.origin_point, self.dMin, self.ack_cnt]
-        self.dataframe.loc[len(self.dataframe)] = data
+    def state(self):
+        epoch_start = 0 if self.epoch_start is None else self.epoch_start
+        return (self.round_number, self.cwnd, self.wlast_max, self.wtcp, epoch_start, self.origin_point, self.dMin, self.ack_cnt)
 
 
 if __name__ == '__main__':
     cubic_tcp = CubicTCPCongestionControl(
-        cwnd=10, C=0.4, BETA=0.2, tcp_friendliness=True, fast_convergence=True
+        cwnd=10, C=0.4, BETA=0.2, tcp_friendliness=True, fast_convergence=True,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
     )
     for _ in range(1000):
         cubic_tcp.run()
         cubic_tcp.insert_paramaters_to_dataframe()
+        cubic_tcp.tracer.end_round(cubic_tcp.round_number)
         cubic_tcp.round_number += 1
-        logging.info('')
     
-    cubic_tcp.is_running = False
+    cubic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
     cubic_tcp.dataframe.to_csv('cubic_tcp_parameters.csv', index=False)
-    plt.show(block=True)
+    cubic_tcp.renderer.finish(block=True)
@@ -0,0 +1,221 @@
+from ...fixedpoint import (
+    BETA_SCALE, BICTCP_HZ, HZ, cong_avoid_ai, cubic_constants, cubic_root, jiffies, usecs_to_jiffies,
+)
+from ...rendering import Renderer, make_renderer
+from ...tracing import Tracer, decode_file
+from ..Article_Implementation.cubic import (
+    ABOVE_SSTHRESH, ABOVE_TARGET, BELOW_SSTHRESH, BELOW_TARGET, CNT, CUBIC_UPDATE, CWND,
+    EPOCH_START, FAST_CONVERGENCE, LOSS_DECREASE, MAX_CNT, ORIGIN, PACKET_LOSS, TARGET,
+    TCP_FRIENDLINESS, CubicTCPCongestionControl as ArticleCubic,
+)
+
+
+class CubicTCPCongestionControl(ArticleCubic):
+    """
+        the Article implementation with the integer pipeline of Linux'
+        tcp_cubic.c: cwnd in whole segments grown by one every cnt ACKs,
+        time in jiffies, K from the cube root table (fixedpoint.py). The
+        losses, timeouts and RTT samples are those of the Article
+        implementation, so the same seed gives the same events.
+    """
+
+    __slots__ = ('beta', 'bic_scale', 'beta_scale', 'cube_rtt_scale', 'cube_factor', 'last_cwnd', 'last_time')
+
+    def __init__(self, cwnd:int, C:float, BETA:float,
+                tcp_friendliness:bool, fast_convergence:bool, renderer:Renderer=None,
+                seed:int=None, tracer:Tracer=None):
+        """
+        Args:
+            cwnd(int): congestion window size, in segments.
+            C(float): cubic parameter, kept in 10/BETA_SCALE (bic_scale). (constant)
+            BETA(float): multiplicative window decrease factor, cwnd is
+                            multiplied by beta/BETA_SCALE = 1 - BETA. (constant)
+            tcp_friendliness(bool), fast_convergence(bool), renderer(Renderer),
+            seed(int), tracer(Tracer): as in the Article implementation.
+
+        Other Instance Variables:
+            beta, bic_scale, beta_scale, cube_rtt_scale, cube_factor(int):
+                the integer constants (fixedpoint.cubic_constants).
+            wlast_max(int): last_max_cwnd.
+            k(int): bic_K, in 1/2^BICTCP_HZ seconds.
+            epoch_start(int): jiffies of the start of the epoch, None for none.
+            wtcp(int): tcp_cwnd, the TCP friendly window.
+            cnt(int): ACKs per cwnd increment.
+            last_cwnd(int), last_time(int): cwnd and jiffies of the last
+                                               update of cnt.
+        """
+        super().__init__(int(cwnd), C, BETA, tcp_friendliness, fast_convergence, renderer, seed, tracer)
+        constants = cubic_constants(C, BETA)
+        self.beta = constants['beta']
+        self.bic_scale = constants['bic_scale']
+        self.beta_scale = constants['beta_scale']
+        self.cube_rtt_scale = constants['cube_rtt_scale']
+        self.cube_factor = constants['cube_factor']
+        self.cnt = 0
+        self.target = 0
+        self.last_cwnd = 0
+        self.last_time = 0
+
+    def _acks(self, acks:int):
+        """
+            `acks` ACKs, one cong_avoid each as in the kernel, evenly spaced
+            over the round.
+        """
+        start = self.scheduler.now
+        for i in range(acks):
+            self._ack(1, jiffies(start + i * self.ROUND_TIME / acks, HZ))
+
+    def _ack(self, acked:int=1, now:int=None):
+        """
+            cubictcp_cong_avoid() of one ACK covering `acked` segments,
+            received at jiffies `now` (the current simulated time by default).
+        """
+        if self.cwnd < self.ssthresh:
+            if self.trace_mask & BELOW_SSTHRESH:
+                self.tracer.emit(BELOW_SSTHRESH, self.round_number, self.cwnd, self.ssthresh)
+            # tcp_slow_start(): grow up to ssthresh, the rest is left to avoidance.
+            cwnd = min(self.cwnd + acked, self.ssthresh)
+            acked -= cwnd - self.cwnd
+            self.cwnd = cwnd
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.round_number, self.cwnd)
+            if not acked:
+                return
+        if self.trace_mask & ABOVE_SSTHRESH:
+            self.tracer.emit(ABOVE_SSTHRESH, self.round_number, self.cwnd, self.ssthresh)
+        self._cubic_update(acked, now)
+        cwnd = self.cwnd
+        self.cwnd, self.cwnd_cnt = cong_avoid_ai(self.cwnd, self.cwnd_cnt, self.cnt, acked)
+        if self.cwnd != cwnd and self.trace_mask & CWND:
+            self.tracer.emit(CWND, self.round_number, self.cwnd)
+
+    def _packet_loss(self):
+        """
+            bictcp_recalc_ssthresh(); fast recovery ends with cwnd = ssthresh.
+        """
+        if self.trace_mask & PACKET_LOSS:
+            self.tracer.emit(PACKET_LOSS, self.round_number)
+        self.loss_count += 1
+        self.epoch_start = None
+        if self.trace_mask & FAST_CONVERGENCE:
+            self.tracer.emit(FAST_CONVERGENCE, self.round_number, self.fast_convergence, self.cwnd, self.wlast_max)
+        if self.cwnd < self.wlast_max and self.fast_convergence:
+            self.wlast_max = self.cwnd * (BETA_SCALE + self.beta) // (2 * BETA_SCALE)
+        else:
+            self.wlast_max = self.cwnd
+        self.ssthresh = max(self.cwnd * self.beta // BETA_SCALE, 2)
+        self.cwnd = self.ssthresh
+        if self.trace_mask & LOSS_DECREASE:
+            self.tracer.emit(LOSS_DECREASE, self.round_number, self.ssthresh, self.cwnd)
+
+    def _cubic_update(self, acked:int=1, now:int=None):
+        """
+            bictcp_update(): the ACKs per cwnd increment (cnt) towards the
+            cubic target.
+        """
+        if self.trace_mask & CUBIC_UPDATE:
+            self.tracer.emit(CUBIC_UPDATE, self.round_number)
+        cwnd = self.cwnd
+        if now is None:
+            now = jiffies(self.scheduler.now, HZ)
+        self.ack_cnt += acked
+
+        if self.last_cwnd == cwnd and now - self.last_time <= HZ // 32:
+            return
+
+        # the cubic function is computed at most once per jiffy.
+        if not (self.epoch_start is not None and now == self.last_time):
+            self.last_cwnd = cwnd
+            self.last_time = now
+
+            if self.epoch_start is None:
+                # record the beginning of an epoch.
+                self.epoch_start = now
+                if self.trace_mask & EPOCH_START:
+                    self.tracer.emit(EPOCH_START, self.round_number, self.epoch_start)
+                self.ack_cnt = acked
+                self.wtcp = cwnd
+                if self.wlast_max <= cwnd:
+                    self.k = 0
+                    self.origin_point = cwnd
+                else:
+                    # K = cbrt((wmax - cwnd) / C), in 1/2^BICTCP_HZ seconds.
+                    self.k = cubic_root(self.cube_factor * (self.wlast_max - cwnd))
+                    self.origin_point = self.wlast_max
+                if self.trace_mask & ORIGIN:
+                    self.tracer.emit(ORIGIN, self.round_number, self.k, self.origin_point)
+
+            # t is the time since the epoch start plus the minimum delay,
+            # in 1/2^BICTCP_HZ seconds.
+            t = now - self.epoch_start + usecs_to_jiffies(int(self.dMin * 1000000), HZ)
+            t = (t << BICTCP_HZ) // HZ
+            offs = self.k - t if t < self.k else t - self.k
+            # C * (t - K)^3 in segments.
+            delta = (self.cube_rtt_scale * offs * offs * offs) >> (10 + 3 * BICTCP_HZ)
+            target = self.origin_point - delta if t < self.k else self.origin_point + delta
+            self.target = target
+            if self.trace_mask & TARGET:
+                self.tracer.emit(TARGET, self.round_number, t, target, cwnd)
+
+            if target > cwnd:
+                if self.trace_mask & ABOVE_TARGET:
+                    self.tracer.emit(ABOVE_TARGET, self.round_number, target, cwnd)
+                self.cnt = cwnd // (target - cwnd)
+            else:
+                if self.trace_mask & BELOW_TARGET:
+                    self.tracer.emit(BELOW_TARGET, self.round_number, target, cwnd)
+                # very small increment.
+                self.cnt = 100 * cwnd
+
+            # the initial growth of cubic is at least as fast as slow start.
+            if self.wlast_max == 0 and self.cnt > 20:
+                self.cnt = 20
+
+        if self.tcp_friendliness:
+            self._cubic_tcp_friendliness()
+        self.cnt = max(self.cnt, 2)
+        if self.trace_mask & CNT:
+            self.tracer.emit(CNT, self.round_number, self.cnt)
+
+    def _cubic_tcp_friendliness(self):
+        if self.trace_mask & TCP_FRIENDLINESS:
+            self.tracer.emit(TCP_FRIENDLINESS, self.round_number)
+        cwnd = self.cwnd
+        delta = (cwnd * self.beta_scale) >> 3
+        # one tcp_cwnd segment every delta ACKs, the AIMD window of the same loss rate.
+        if delta > 0 and self.ack_cnt > delta:
+            increments = (self.ack_cnt - 1) // delta
+            self.ack_cnt -= increments * delta
+            self.wtcp += increments
+        if self.wtcp > cwnd:
+            max_cnt = cwnd // (self.wtcp - cwnd)
+            if self.cnt > max_cnt:
+                self.cnt = max_cnt
+            if self.trace_mask & MAX_CNT:
+                self.tracer.emit(MAX_CNT, self.round_number, max_cnt, self.cnt)
+
+    def _cubic_reset(self):
+        """
+            bictcp_reset().
+        """
+        super()._cubic_reset()
+        self.cnt = 0
+        self.last_cwnd = 0
+        self.last_time = 0
+
+
+if __name__ == '__main__':
+    cubic_tcp = CubicTCPCongestionControl(
+        cwnd=10, C=0.4, BETA=0.3, tcp_friendliness=True, fast_convergence=True,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
+    )
+    for _ in range(1000):
+        cubic_tcp.run_rtt()
+        cubic_tcp.insert_paramaters_to_dataframe()
+        cubic_tcp.tracer.end_round(cubic_tcp.round_number)
+        cubic_tcp.round_number += 1
+
+    cubic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
+    cubic_tcp.dataframe.to_csv('cubic_tcp_parameters.csv', index=False)
+    cubic_tcp.renderer.finish(block=True)
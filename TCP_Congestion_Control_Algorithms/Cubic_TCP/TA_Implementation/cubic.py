@@ -1,11 +1,39 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import random, logging, threading, time
+import math
 
+from ...core.base import CongestionControl
+from ...rendering import Renderer, make_renderer
+from ...scheduler import EventScheduler
+from ...tracing import EventTable, Tracer, decode_file
 
-class CubicTCPCongestionControl:
 
-    def __init__(self, cwnd: float, wmax:float, C:float, LOW_WINDOW:float):
+# trace events, the templates reproduce the former log lines.
+EVENTS = EventTable()
+CWND = EVENTS.add('{} -- cwnd: {}')
+K = EVENTS.add('{} -- k: {}')
+BELOW_LOW_WINDOW = EVENTS.add('t{} -- cwnd({}) < low_window({})')
+TARGET = EVENTS.add('{} -- time_since_loss: {}, target_cwnd: {}')
+BELOW_TARGET = EVENTS.add('{} -- cwnd({}): < target_cwnd({})')
+ABOVE_TARGET = EVENTS.add('{} -- cwnd: ({}) > target_cwnd: ({})')
+CUBIC_FUNCTION = EVENTS.add('{} -- Cubic Function')
+CUBIC_INCREASE = EVENTS.add('{} -- Cubic Increase')
+PACKET_LOSS = EVENTS.add('{} -- PACKET LOSS')
+
+
+class CubicTCPCongestionControl(CongestionControl):
+
+    __slots__ = ('wmax', 'C', 'LOW_WINDOW', 't', 't_last_loss', 'k', 'target_cwnd', 'scheduler')
+
+    EVENTS = EVENTS
+    COLUMNS = ('t', 'cwnd', 'wmax', 'k', 't_lastloss')
+    ROUND_COUNTER = 't'
+
+    # simulated seconds per round.
+    ROUND_TIME = 0.1
+    # packet losses are random()*LOSS_INTERVAL simulated seconds apart.
+    LOSS_INTERVAL = 2
+
+    def __init__(self, cwnd: float, wmax:float, C:float, LOW_WINDOW:float,
+                renderer:Renderer=None, seed:int=None, tracer:Tracer=None):
         """
         Args:
             cwnd(float): congestion window size.
@@ -15,13 +43,20 @@ class CubicTCPCongestionControl:
             c(float): cubic parameter. (constant)
             LOW_WINDOW(int): if the window size is larger than this threshold,
                                  BIC engages. (constant)
+            renderer(Renderer): draws the cwnd evolution, headless when None.
+            seed(int): seed of the random number generator, the same seed
+                          gives the same run.
+            tracer(Tracer): records the trace events, no tracing when None.
 
         Other Instance Variables:
-            is_running(bool): variable to stop packet loss thread when is False.
+            random(random.Random): the flow's random number generator.
+            scheduler(EventScheduler): loss events on the simulated clock.
             t(int): current time (same as round_number).
+            loss_count(int): number of packet losses so far.
             t_last_loss(int): t of last loss.
             k(float): The time period it takes to increase the cwnd from its current value
                           to the wlast_max without encountering further packet loss.
+            trace_mask(int): enabled trace events, 0 without a tracer.
         """
         self.cwnd = cwnd
         self.wmax = wmax
@@ -31,93 +66,150 @@ class CubicTCPCongestionControl:
         self.t = 1
         self.t_last_loss = 0
         self.k = 0
+        self._setup(renderer, seed, tracer)
 
-        # setting up logging 
-        logging.basicConfig(
-            level=logging.INFO, format='%(message)s',
-            filename='log.log', filemode='w',
-        )
-
-        # setting up Pandas dataFrame.
-        self.dataframe = pd.DataFrame(columns=['t', 'cwnd', 'wmax',  'k', 't_lastloss'])
-
-        # setting up plot
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.line, = self.ax.plot([], [])
-        plt.xlabel('Round Number')
-        plt.ylabel('Congestion Window (cwnd)')
-        plt.title('Congestion Window Evolution')
-        plt.grid(True)
-        plt.show()
-        self.rounds, self.cwnd_values = [], []
-
-        self.is_running = True
-        # setting up thread for packet loss.
-        packet_loss_thread = threading.Thread(target=self._packet_loss, daemon=True)
-        packet_loss_thread.start()
+        # setting up simulated-time events for packet loss.
+        self.scheduler = EventScheduler()
+        self._schedule_packet_loss()
 
     def run(self):
+        self._update()
+        self.renderer.update(self.t, self.cwnd)
+        self._fire_events()
+
+    def _update(self):
         if self.cwnd < self.LOW_WINDOW:
-            logging.info(f't{self.t} -- cwnd({self.cwnd}) < low_window({self.LOW_WINDOW})')
+            if self.trace_mask & BELOW_LOW_WINDOW:
+                self.tracer.emit(BELOW_LOW_WINDOW, self.t, self.cwnd, self.LOW_WINDOW)
             self.cwnd *= 0.5
             
         time_since_loss = self.t - self.t_last_loss
         self.target_cwnd = self._cubic_function(time_since_loss)
-        logging.info(f'{self.t} -- time_since_loss: {time_since_loss}, target_cwnd: {self.target_cwnd}')
+        if self.trace_mask & TARGET:
+            self.tracer.emit(TARGET, self.t, time_since_loss, self.target_cwnd)
 
         if self.cwnd < self.target_cwnd:
-            logging.info(f'{self.t} -- cwnd({self.cwnd}): < target_cwnd({self.target_cwnd})')
+            if self.trace_mask & BELOW_TARGET:
+                self.tracer.emit(BELOW_TARGET, self.t, self.cwnd, self.target_cwnd)
             self.cwnd += self._cubic_increase()
-            logging.info(f'{self.t} -- cwnd: {self.cwnd}')
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.t, self.cwnd)
 
         if self.cwnd > self.target_cwnd:
-            logging.info(f'{self.t} -- cwnd: ({self.cwnd}) > target_cwnd: ({self.target_cwnd})')
+            if self.trace_mask & ABOVE_TARGET:
+                self.tracer.emit(ABOVE_TARGET, self.t, self.cwnd, self.target_cwnd)
             self.cwnd = self.target_cwnd
-            logging.info(f'{self.t} -- cwnd: {self.cwnd}')
-
-        self.cwnd_values.append(self.cwnd)
-        self.rounds.append(self.t)
-
-        self.line.set_data(self.rounds, self.cwnd_values)
-        self.ax.relim()
-        self.ax.autoscale_view()
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+            if self.trace_mask & CWND:
+                self.tracer.emit(CWND, self.t, self.cwnd)
 
     def _cubic_function(self, time_since_loss):
-        logging.info(f'{self.t} -- Cubic Function')
+        if self.trace_mask & CUBIC_FUNCTION:
+            self.tracer.emit(CUBIC_FUNCTION, self.t)
         self.k = ((self.wmax -1) / self.C) ** (1/3)
 
-        logging.info(f'{self.t} -- k: {self.k}')
+        if self.trace_mask & K:
+            self.tracer.emit(K, self.t, self.k)
         return self.wmax + self.C * (time_since_loss-self.k) ** 3
 
     def _cubic_increase(self):
-        logging.info(f'{self.t} -- Cubic Increase')
+        if self.trace_mask & CUBIC_INCREASE:
+            self.tracer.emit(CUBIC_INCREASE, self.t)
         return (self.target_cwnd - self.cwnd) / self.cwnd
 
+    def _schedule_packet_loss(self):
+        self.scheduler.schedule(self.random.random() * self.LOSS_INTERVAL, '_random_packet_loss')
+
+    def _random_packet_loss(self):
+        self._packet_loss()
+        self._schedule_packet_loss()
+
     def _packet_loss(self):
-        while self.is_running:
-            number = random.random() * 2
-            time.sleep(number)
-            self.t_last_loss = self.t
-            logging.error(f'{self.t} -- PACKET LOSS')
-
-    def insert_paramaters_to_dataframe(self):
-        data = [self.t, self.cwnd, self.k, self.wmax, self.t_last_loss]
-        self.dataframe.loc[len(self.dataframe)] = data
+        self.t_last_loss = self.t
+        if self.trace_mask & PACKET_LOSS:
+            self.tracer.emit(PACKET_LOSS, self.t)
+        self.loss_count += 1
+
+    def state(self):
+        return (self.t, self.cwnd, self.wmax, self.k, self.t_last_loss)
+
+    def fast_forward(self, rounds:int, record:bool=False):
+        """
+            advances `rounds` rounds with the same result as calling step()
+            `rounds` times, one loss-free interval at a time: between losses
+            the target only depends on wmax, C and t - t_last_loss, so k is
+            computed once, the targets of the whole interval come from one
+            vectorized evaluation of the cubic function and cwnd follows them
+            in a tight loop without tracing.
+
+        Args:
+            rounds(int): number of rounds to advance.
+            record(bool): record every round and pass it to the renderer, as
+                             step() does. otherwise only the state at the end
+                             of each interval reaches the renderer.
+        """
+        import numpy as np
+
+        end = self.t + rounds
+        # wmax never changes, so neither does k.
+        self.k = ((self.wmax -1) / self.C) ** (1/3)
+        while self.t < end:
+            last = end - 1
+            next_loss = self.scheduler.next_event_time()
+            if next_loss != math.inf:
+                # the loss is handled at the end of the first round whose
+                # end time reaches it (see _fire_events).
+                loss_round = math.ceil(next_loss / self.ROUND_TIME)
+                if (loss_round - 1) * self.ROUND_TIME >= next_loss:
+                    loss_round -= 1
+                last = min(last, max(loss_round, self.t))
+
+            rounds_t = np.arange(self.t, last + 1)
+            # float_power calls pow() like the scalar ** does, so the
+            # targets are bit-identical to _cubic_function's.
+            targets = self.wmax + self.C * np.float_power(rounds_t - self.t_last_loss - self.k, 3)
+
+            cwnd, low_window = self.cwnd, self.LOW_WINDOW
+            values = []
+            for target in targets.tolist():
+                if cwnd < low_window:
+                    cwnd *= 0.5
+                if cwnd < target:
+                    cwnd += (target - cwnd) / cwnd
+                if cwnd > target:
+                    cwnd = target
+                if record:
+                    values.append(cwnd)
+            self.cwnd, self.target_cwnd = cwnd, target
+
+            t_last_loss = self.t_last_loss
+            self.t = last
+            self._fire_events()
+            if record:
+                n = len(values)
+                # the loss of the interval's last round is recorded with it.
+                self.recorder.extend(
+                    rounds_t.tolist(), values, [self.wmax] * n, [self.k] * n,
+                    [t_last_loss] * (n - 1) + [self.t_last_loss],
+                )
+                for t, cwnd in zip(rounds_t.tolist(), values):
+                    self.renderer.update(t, cwnd)
+            else:
+                self.renderer.update(self.t, self.cwnd)
+            self.t += 1
     
 
 if __name__ == '__main__':
     cubic_tcp = CubicTCPCongestionControl(
-        cwnd=10, wmax=30, C=0.4, LOW_WINDOW=4 
+        cwnd=10, wmax=30, C=0.4, LOW_WINDOW=4,
+        renderer=make_renderer('rounds', 10), tracer=Tracer('log.trace'),
     )
     for _ in range(1000):
         cubic_tcp.run()
-        logging.info('')
+        cubic_tcp.tracer.end_round(cubic_tcp.t)
         cubic_tcp.insert_paramaters_to_dataframe()
         cubic_tcp.t += 1
     
-    cubic_tcp.is_running = False
+    cubic_tcp.tracer.close()
+    decode_file('log.trace', 'log.log')
     cubic_tcp.dataframe.to_csv('cubic_tcp_parameters.csv', index=False)
-    plt.show(block=True)
+    cubic_tcp.renderer.finish(block=True)
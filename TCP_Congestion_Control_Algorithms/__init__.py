@@ -0,0 +1,6 @@
+"""
+TCP congestion control algorithms (BIC TCP and Cubic TCP).
+
+Each algorithm module can be run as a script from the repository root, e.g.
+    python -m TCP_Congestion_Control_Algorithms.BIC_TCP.Article_implementation.bic
+"""
@@ -0,0 +1,277 @@
+"""
+Closed-form processing of a whole RTT worth of ACKs.
+
+The Article implementations grow cwnd once per ACK, so one RTT of a window of
+10^5 segments costs 10^5 Python iterations. These functions apply `acks`
+ACKs at once:
+
+    bic_increase     Article BIC's cwnd += bic_increase/cwnd, integrated over
+                     the ACKs. Between the SMIN/SMAX/LOW_WINDOW breakpoints
+                     the per-ACK rule is dc/dn = s(c)/c, which has an exact
+                     solution; the result matches the per-ACK loop up to the
+                     discretisation error, about s^2/(2 cwnd^3) per ACK. It
+                     is large at small windows (20% over the RTT of a window
+                     of 2 segments), so up to EXACT_ACKS ACKs the per-ACK
+                     loop runs instead: a window's worth of ACKs then stays
+                     within BIC_TOLERANCE of the loop.
+    cnt_increase     Article Cubic's cwnd_cnt/cnt counting, with cnt following
+                     cwnd as in the per-ACK mode. exact for a target and wtcp
+                     that stay fixed during the RTT.
+
+The *_per_ack functions are the per-ACK reference loops the closed forms are
+checked against; check() runs the run_rtt() of Article BIC and Article Cubic
+flows from random states against them:
+
+    python -m TCP_Congestion_Control_Algorithms.ack_batching --trials 10000
+"""
+import argparse, math, random
+
+
+# bic_increase runs the per-ACK loop up to this many ACKs.
+EXACT_ACKS = 64
+# relative difference of bic_increase and the per-ACK loop over int(cwnd) ACKs.
+BIC_TOLERANCE = 1e-3
+
+
+def bic_increase_per_ack(cwnd:float, wmax:float, acks:int, SMIN:float, SMAX:float, LOW_WINDOW:float):
+    """
+        reference: Article BIC's per-ACK increase applied `acks` times.
+    """
+    for _ in range(acks):
+        if cwnd < LOW_WINDOW:
+            cwnd += 1 / cwnd
+            continue
+        bic_increase = (wmax - cwnd) / 2 if cwnd < wmax else cwnd - wmax
+        if bic_increase > SMAX:
+            bic_increase = SMAX
+        elif bic_increase < SMIN:
+            bic_increase = SMIN
+        cwnd += bic_increase / cwnd
+    return cwnd
+
+
+def _bic_regime(cwnd, wmax, SMIN, SMAX, LOW_WINDOW):
+    """
+        returns (increment, upper) for the branch of the per-ACK rule that
+        applies at cwnd: increment is the constant numerator s of
+        dc/dn = s/c, or 'below'/'above' for the unclamped (wmax - c)/2 and
+        c - wmax. the branch holds while cwnd < upper.
+    """
+    if cwnd < LOW_WINDOW:
+        return 1, LOW_WINDOW
+    if cwnd < wmax:
+        difference = (wmax - cwnd) / 2
+        if difference > SMAX:
+            return SMAX, wmax - 2 * SMAX
+        if difference < SMIN:
+            return SMIN, wmax
+        return 'below', wmax - 2 * SMIN
+    difference = cwnd - wmax
+    if difference > SMAX:
+        return SMAX, math.inf
+    if difference < SMIN:
+        return SMIN, wmax + SMIN
+    return 'above', wmax + SMAX
+
+
+def _bic_acks(increment, wmax, cwnd):
+    """
+        antiderivative of c/s(c): the number of ACKs it takes to grow to
+        cwnd, up to a constant.
+    """
+    if increment == 'below':
+        return -2 * cwnd - 2 * wmax * math.log(wmax - cwnd)
+    if increment == 'above':
+        return cwnd + wmax * math.log(cwnd - wmax)
+    return cwnd * cwnd / (2 * increment)
+
+
+def _cwnd_acks(increment, wmax, cwnd):
+    """
+        derivative of _bic_acks, c/s(c).
+    """
+    if increment == 'below':
+        return 2 * cwnd / (wmax - cwnd)
+    if increment == 'above':
+        return cwnd / (cwnd - wmax)
+    return cwnd / increment
+
+
+def _solve(f, derivative, target, lo, hi):
+    """
+        solves f(x) = target for an increasing f on [lo, hi] with Newton
+        steps, falling back to bisection when a step leaves the bracket.
+    """
+    x = lo
+    for _ in range(200):
+        value = f(x) - target
+        if abs(value) <= 1e-12 * max(1.0, abs(target)):
+            break
+        if value < 0:
+            lo = x
+        else:
+            hi = x
+        step = x - value / derivative(x)
+        x = step if lo < step < hi else (lo + hi) / 2
+        if hi - lo <= 1e-15 * hi:
+            break
+    return x
+
+
+def bic_increase(cwnd:float, wmax:float, acks:float, SMIN:float, SMAX:float, LOW_WINDOW:float):
+    """
+        closed form of bic_increase_per_ack: cwnd after `acks` ACKs, in
+        O(number of breakpoints crossed) instead of O(acks); the per-ACK
+        loop itself up to EXACT_ACKS ACKs.
+    """
+    if acks <= EXACT_ACKS and acks == int(acks):
+        return bic_increase_per_ack(cwnd, wmax, int(acks), SMIN, SMAX, LOW_WINDOW)
+    while acks > 0:
+        increment, upper = _bic_regime(cwnd, wmax, SMIN, SMAX, LOW_WINDOW)
+        if upper <= cwnd:
+            # sitting exactly on a breakpoint: one per-ACK step moves past it.
+            cwnd = bic_increase_per_ack(cwnd, wmax, 1, SMIN, SMAX, LOW_WINDOW)
+            acks -= 1
+            continue
+        start = _bic_acks(increment, wmax, cwnd)
+        needed = _bic_acks(increment, wmax, upper) - start if upper != math.inf else math.inf
+        if needed > acks:
+            if isinstance(increment, str):
+                cwnd = _solve(
+                    lambda c: _bic_acks(increment, wmax, c),
+                    lambda c: _cwnd_acks(increment, wmax, c),
+                    start + acks, cwnd, upper,
+                )
+            else:
+                cwnd = math.sqrt(cwnd * cwnd + 2 * increment * acks)
+            acks = 0
+        else:
+            cwnd = upper
+            acks -= needed
+    return cwnd
+
+
+def _cubic_cnt(cwnd, target, wtcp):
+    """
+        cnt as _cubic_update and _cubic_tcp_friendliness compute it.
+    """
+    cnt = cwnd / (target - cwnd) if target > cwnd else 100 * cwnd
+    if wtcp is not None and wtcp > cwnd:
+        cnt = min(cnt, cwnd / (wtcp - cwnd))
+    return cnt
+
+
+def cnt_increase_per_ack(cwnd:float, cwnd_cnt:int, acks:int, target:float, wtcp:float=None):
+    """
+        reference: Article Cubic's per-ACK counting applied `acks` times,
+        with cnt recomputed from cwnd at every ACK. wtcp is None when TCP
+        friendliness is off. returns (cwnd, cwnd_cnt, cnt), cnt being the
+        value the next ACK starts from.
+    """
+    for _ in range(acks):
+        if cwnd_cnt > _cubic_cnt(cwnd, target, wtcp):
+            cwnd += 1
+            cwnd_cnt = 0
+        else:
+            cwnd_cnt += 1
+    return cwnd, cwnd_cnt, _cubic_cnt(cwnd, target, wtcp)
+
+
+def cnt_increase(cwnd:float, cwnd_cnt:int, acks:int, target:float, wtcp:float=None):
+    """
+        closed form of cnt_increase_per_ack, in O(distinct values of
+        floor(cnt) crossed) instead of O(acks).
+
+        after a reset, cwnd_cnt needs floor(cnt) + 1 ACKs to exceed cnt and
+        one more ACK to increase cwnd. cnt = cwnd/(X - cwnd), with X the
+        larger of target and wtcp, only changes when cwnd does, so all the
+        increases that keep floor(cnt) at the same level cost the same number
+        of ACKs and are applied together.
+    """
+    while acks > 0:
+        cnt = _cubic_cnt(cwnd, target, wtcp)
+        threshold = math.floor(cnt) + 1
+        first = 1 if cwnd_cnt > cnt else threshold - cwnd_cnt + 1
+        if acks < first:
+            return cwnd, cwnd_cnt + acks, cnt
+        acks -= first
+        cwnd += 1
+        cwnd_cnt = 0
+
+        # cwnd, cwnd + 1, ... stay at this level while cwnd/(X - cwnd) < threshold.
+        ceiling = max(target, wtcp) if wtcp is not None else target
+        if ceiling <= cwnd:
+            continue
+        bound = threshold * ceiling / (threshold + 1)
+        cycles = min(max(0, math.ceil(bound - cwnd)), acks // (threshold + 1))
+        if cycles and math.floor(_cubic_cnt(cwnd + cycles - 1, target, wtcp)) + 1 == threshold \
+                and math.floor(_cubic_cnt(cwnd, target, wtcp)) + 1 == threshold:
+            cwnd += cycles
+            acks -= cycles * (threshold + 1)
+    return cwnd, cwnd_cnt, _cubic_cnt(cwnd, target, wtcp)
+
+
+def _quiet_flow(algorithm:str, seed:int):
+    """
+        a registered flow without its scheduled random events.
+    """
+    from .core.registry import create
+    flow = create(algorithm, seed=seed)
+    flow.scheduler.queue.clear()
+    return flow
+
+
+def check(trials:int=1000, seed:int=0, low:float=1, high:float=10000):
+    """
+        runs run_rtt() of `trials` Article BIC and Article Cubic flows from
+        random states (cwnd in [low, high)) against the per-ACK loops.
+
+    Returns:
+        {'bic': largest relative cwnd difference, within BIC_TOLERANCE,
+         'cubic': largest (cwnd, cwnd_cnt) difference, 0 as the count is exact}
+    """
+    rng = random.Random(seed)
+    worst = {'bic': 0.0, 'cubic': 0.0}
+    for trial in range(trials):
+        flow = _quiet_flow('bic-article', trial)
+        flow.cwnd = rng.uniform(low, high)
+        flow.wmax = rng.uniform(low, 2 * high)
+        acks = int(flow.cwnd)
+        expected = bic_increase_per_ack(flow.cwnd, flow.wmax, acks, flow.SMIN, flow.SMAX, flow.LOW_WINDOW)
+        flow.run_rtt(acks)
+        worst['bic'] = max(worst['bic'], abs(flow.cwnd - expected) / expected)
+
+        # the reference flow takes the same cubic update, then counts per ACK.
+        flows = [_quiet_flow('cubic-article', trial) for _ in range(2)]
+        cwnd, wlast_max = rng.randint(int(low), int(high)), rng.uniform(low, 2 * high)
+        rtt = rng.uniform(0.01, 1)
+        for flow in flows:
+            flow.cwnd, flow.ssthresh, flow.wlast_max = cwnd, cwnd, wlast_max
+        flow, reference = flows
+        acks = int(cwnd)
+        flow.run_rtt(acks, rtt)
+        reference._sample_rtt(rtt)
+        reference._cubic_update(acks)
+        wtcp = reference.wtcp if reference.tcp_friendliness else None
+        expected, expected_cnt, _ = cnt_increase_per_ack(reference.cwnd, reference.cwnd_cnt, acks, reference.target, wtcp)
+        worst['cubic'] = max(worst['cubic'], abs(flow.cwnd - expected), abs(flow.cwnd_cnt - expected_cnt))
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Checks the closed forms of run_rtt() against the per-ACK loops.')
+    parser.add_argument('--trials', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--low', type=float, default=1, help='smallest cwnd')
+    parser.add_argument('--high', type=float, default=10000, help='largest cwnd')
+    args = parser.parse_args(argv)
+
+    worst = check(args.trials, args.seed, args.low, args.high)
+    print(f"bic: largest relative difference {worst['bic']:.3g} (tolerance {BIC_TOLERANCE:g})")
+    print(f"cubic: largest difference {worst['cubic']:g} (exact)")
+    if worst['bic'] > BIC_TOLERANCE or worst['cubic'] != 0:
+        raise SystemExit('run_rtt() differs from the per-ACK loops')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""
+Online per-round analytics of a flow.
+
+RoundAnalytics keeps the key metrics of a run up to date while it runs, in
+memory that does not grow with the run: sliding windows of the last `window`
+rounds (or `loss_window` losses) and exponentially decayed averages with a
+half-life of `halflife` rounds (or `loss_halflife` losses).
+
+    cwnd           mean over the run, EWMA, window mean and peak, peak.
+    throughput     cwnd / RTT in segments per second, the RTT being the
+                   sampled dMin where the flow has one, ROUND_TIME otherwise.
+    loss_interval  rounds between losses: count, mean, std, min, max, EWMA,
+                   window mean and a histogram of power of two buckets.
+    oscillation    peak cwnd of a loss cycle minus cwnd after its loss.
+    wmax           wmax (wlast_max) after every loss, its EWMA relative change
+                   per loss and the contraction, the exponentially weighted
+                   geometric mean of the ratio of successive changes (below 1
+                   while wmax converges).
+
+attach(flow) wraps the flow's recorder, so the analytics see every round the
+flow records whichever way it is driven (step, iter_rounds, the __main__
+loops, runtime, replay). With store=False the rounds are not kept at all:
+
+    analytics = attach(flow, store=False)
+    for _ in range(10**7):
+        flow.step()
+        ...
+        analytics.summary()                  # at any round
+    detach(flow)
+
+    python -m TCP_Congestion_Control_Algorithms.analytics cubic-ta --rounds 1000000 --every 100000
+"""
+import argparse, math
+from collections import deque
+
+from .core.registry import create, names
+from .recording import StateRecorder
+
+
+HISTOGRAM_BUCKETS = 24
+# seconds per round of the flows without a clock (TA BIC), as the others'.
+ROUND_TIME = 0.1
+
+
+class Ewma:
+
+    def __init__(self, halflife:float):
+        """
+            exponentially weighted mean and variance, the weight of a value
+            halves every `halflife` updates.
+        """
+        if halflife <= 0:
+            raise ValueError(f'halflife must be positive, got {halflife}')
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.mean = math.nan
+        self.variance = 0.0
+
+    def update(self, value:float):
+        if self.mean != self.mean:
+            self.mean = value
+            return
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+
+
+class Window:
+
+    def __init__(self, size:int):
+        """
+            mean and peak of the last `size` values; the peak comes from a
+            monotonic deque, O(1) amortized per value.
+        """
+        if size <= 0:
+            raise ValueError(f'size must be positive, got {size}')
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self._index = 0
+        self._peaks = deque()
+
+    def update(self, value:float):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        peaks = self._peaks
+        while peaks and peaks[-1][1] <= value:
+            peaks.pop()
+        peaks.append((self._index, value))
+        if peaks[0][0] <= self._index - self.size:
+            peaks.popleft()
+        self._index += 1
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else math.nan
+
+    @property
+    def peak(self):
+        return self._peaks[0][1] if self._peaks else math.nan
+
+
+class RoundAnalytics:
+
+    def __init__(self, window:int=100, halflife:float=100, loss_window:int=32, loss_halflife:float=8):
+        """
+        Args:
+            window(int): rounds of the sliding window statistics.
+            halflife(float): half-life of the per-round EWMAs, in rounds.
+            loss_window(int): losses of the sliding window of loss intervals.
+            loss_halflife(float): half-life of the per-loss EWMAs, in losses.
+
+        Other Instance Variables:
+            rounds(int): rounds seen.
+            round(int): round counter of the last round.
+            losses(int): losses seen.
+        """
+        self.window = window
+        self.halflife = halflife
+        self.loss_window = loss_window
+        self.loss_halflife = loss_halflife
+        self.flow = None
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.round = None
+        self.losses = 0
+        self._cwnd_total = 0.0
+        self._cwnd_peak = -math.inf
+        self._cwnd_ewma = Ewma(self.halflife)
+        self._cwnd_window = Window(self.window)
+        self._throughput_total = 0.0
+        self._throughput_ewma = Ewma(self.halflife)
+        self._throughput_window = Window(self.window)
+        # Welford's mean and sum of squared deviations of the loss intervals.
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+        self._interval_min = math.inf
+        self._interval_max = -math.inf
+        self._interval_ewma = Ewma(self.loss_halflife)
+        self._interval_window = Window(self.loss_window)
+        self._histogram = [0] * HISTOGRAM_BUCKETS
+        self._last_loss_round = None
+        self._cycle_peak = -math.inf
+        self._oscillation = math.nan
+        self._oscillation_ewma = Ewma(self.loss_halflife)
+        self._wmax = math.nan
+        self._wmax_change = math.nan
+        self._wmax_change_ewma = Ewma(self.loss_halflife)
+        self._wmax_contraction_ewma = Ewma(self.loss_halflife)
+
+    def bind(self, flow):
+        """
+            reads the flow's columns, RTT and loss counter; called by attach().
+        """
+        columns = flow.COLUMNS
+        self.flow = flow
+        self._cwnd = columns.index('cwnd')
+        self._wmax_field = next((name for name in ('wlast_max', 'wmax') if name in columns), None)
+        self._wmax_index = columns.index(self._wmax_field) if self._wmax_field else None
+        self._rtt = columns.index('dMin') if 'dMin' in columns else None
+        self._round_time = getattr(flow, 'ROUND_TIME', ROUND_TIME)
+        self._loss_count = flow.loss_count
+
+    def update(self, values):
+        """
+            takes one recorded round, values in the order of flow.COLUMNS.
+        """
+        cwnd = values[self._cwnd]
+        self.rounds += 1
+        self.round = values[0]
+
+        self._cwnd_total += cwnd
+        if cwnd > self._cwnd_peak:
+            self._cwnd_peak = cwnd
+        self._cwnd_ewma.update(cwnd)
+        self._cwnd_window.update(cwnd)
+
+        rtt = values[self._rtt] if self._rtt is not None else 0
+        throughput = cwnd / (rtt if rtt > 0 else self._round_time)
+        self._throughput_total += throughput
+        self._throughput_ewma.update(throughput)
+        self._throughput_window.update(throughput)
+
+        # the loss of a round is handled before the round is recorded.
+        losses = self.flow.loss_count - self._loss_count
+        if losses:
+            self._loss_count = self.flow.loss_count
+            for i in range(losses):
+                self._loss(0 if i else self.round, cwnd, values)
+        elif cwnd > self._cycle_peak:
+            self._cycle_peak = cwnd
+
+    def _loss(self, round, cwnd:float, values):
+        """
+            one loss in `round`, later losses of the same round have round 0.
+        """
+        self.losses += 1
+        if self._last_loss_round is not None:
+            interval = round - self._last_loss_round if round else 0
+            n = self.losses - 1
+            delta = interval - self._interval_mean
+            self._interval_mean += delta / n
+            self._interval_m2 += delta * (interval - self._interval_mean)
+            self._interval_min = min(self._interval_min, interval)
+            self._interval_max = max(self._interval_max, interval)
+            self._interval_ewma.update(interval)
+            self._interval_window.update(interval)
+            self._histogram[min(int(interval).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        if round:
+            self._last_loss_round = round
+
+        if self._cycle_peak > -math.inf:
+            self._oscillation = self._cycle_peak - cwnd
+            self._oscillation_ewma.update(self._oscillation)
+        self._cycle_peak = cwnd
+
+        if self._wmax_index is not None:
+            wmax = values[self._wmax_index]
+            if self._wmax == self._wmax:
+                change = wmax - self._wmax
+                if wmax:
+                    self._wmax_change_ewma.update(abs(change) / abs(wmax))
+                if change and self._wmax_change == self._wmax_change and self._wmax_change:
+                    self._wmax_contraction_ewma.update(math.log(abs(change) / abs(self._wmax_change)))
+                self._wmax_change = change
+            self._wmax = wmax
+
+    def summary(self):
+        """
+            the current metrics, {group: {metric: value}}; NaN until known.
+        """
+        rounds, intervals = self.rounds, self.losses - 1
+        histogram = {}
+        for i, count in enumerate(self._histogram):
+            if count:
+                histogram[f'<{2**i}' if i < HISTOGRAM_BUCKETS - 1 else f'>={2**(i - 1)}'] = count
+        summary = {
+            'round': self.round,
+            'rounds': rounds,
+            'cwnd': {
+                'mean': self._cwnd_total / rounds if rounds else math.nan,
+                'ewma': self._cwnd_ewma.mean,
+                'window_mean': self._cwnd_window.mean,
+                'window_peak': self._cwnd_window.peak,
+                'peak': self._cwnd_peak if rounds else math.nan,
+            },
+            'throughput': {
+                'mean': self._throughput_total / rounds if rounds else math.nan,
+                'ewma': self._throughput_ewma.mean,
+                'window_mean': self._throughput_window.mean,
+            },
+            'loss_interval': {
+                'losses': self.losses,
+                'mean': self._interval_mean if intervals > 0 else math.nan,
+                'std': math.sqrt(self._interval_m2 / (intervals - 1)) if intervals > 1 else math.nan,
+                'min': self._interval_min if intervals > 0 else math.nan,
+                'max': self._interval_max if intervals > 0 else math.nan,
+                'ewma': self._interval_ewma.mean,
+                'window_mean': self._interval_window.mean,
+                'histogram': histogram,
+            },
+            'oscillation': {
+                'last': self._oscillation,
+                'ewma': self._oscillation_ewma.mean,
+            },
+        }
+        if self._wmax_field is not None:
+            summary['wmax'] = {
+                'field': self._wmax_field,
+                'last': self._wmax,
+                'change_ewma': self._wmax_change_ewma.mean,
+                'contraction': math.exp(self._wmax_contraction_ewma.mean),
+            }
+        return summary
+
+    def row(self):
+        """
+            summary() flattened to {group_metric: value}, without the histogram.
+        """
+        row = {}
+        for group, value in self.summary().items():
+            if isinstance(value, dict):
+                row.update((f'{group}_{name}', item) for name, item in value.items() if name not in ('histogram', 'field'))
+            else:
+                row[group] = value
+        return row
+
+
+class ObservedRecorder(StateRecorder):
+
+    def __init__(self, recorder:StateRecorder, analytics:RoundAnalytics, store:bool=True):
+        """
+            passes every recorded round to `analytics`, then to `recorder`
+            unless store is False (nothing is kept then).
+        """
+        super().__init__(recorder.columns)
+        self.inner = recorder
+        self.store = store
+        self.analytics = analytics
+
+    def record(self, *values):
+        if self.store:
+            self.inner.record(*values)
+        self.analytics.update(values)
+
+    def extend(self, *columns):
+        if self.store:
+            self.inner.extend(*columns)
+        # rounds recorded together share their losses, counted at the first.
+        update = self.analytics.update
+        for values in zip(*columns):
+            update(values)
+
+    def __len__(self):
+        return len(self.inner) if self.store else 0
+
+    def column(self, name):
+        return self.inner.column(name) if self.store else super().column(name)
+
+    def to_numpy(self):
+        return self.inner.to_numpy() if self.store else super().to_numpy()
+
+    def to_dataframe(self):
+        return self.inner.to_dataframe() if self.store else super().to_dataframe()
+
+    def clear(self):
+        self.inner.clear()
+
+
+def attach(flow, analytics:RoundAnalytics=None, store:bool=True):
+    """
+        feeds every round the flow records to `analytics` (a new
+        RoundAnalytics by default) and returns it; store=False drops the
+        rounds instead of recording them.
+    """
+    if isinstance(flow.recorder, ObservedRecorder):
+        raise ValueError('the flow already has analytics attached')
+    analytics = analytics if analytics is not None else RoundAnalytics()
+    analytics.bind(flow)
+    flow.recorder = ObservedRecorder(flow.recorder, analytics, store)
+    return analytics
+
+
+def detach(flow):
+    """
+        gives the flow its own recorder back, returns the analytics.
+    """
+    recorder = flow.recorder
+    if not isinstance(recorder, ObservedRecorder):
+        raise ValueError('the flow has no analytics attached')
+    flow.recorder = recorder.inner
+    return recorder.analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Key metrics of a run, computed while it runs.')
+    parser.add_argument('algorithm', choices=names())
+    parser.add_argument('--rounds', type=int, default=100000)
+    parser.add_argument('--every', type=int, default=None, help='print the metrics every N rounds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--halflife', type=float, default=100)
+    parser.add_argument('--output', default=None, help='CSV file of the printed rows')
+    args = parser.parse_args(argv)
+
+    flow = create(args.algorithm, seed=args.seed)
+    analytics = attach(flow, RoundAnalytics(args.window, args.halflife), store=False)
+    every = args.every or args.rounds
+    rows = []
+    for _ in flow.iter_rounds(args.rounds):
+        if analytics.rounds % every == 0:
+            rows.append(analytics.row())
+    if not rows or rows[-1]['rounds'] != analytics.rounds:
+        rows.append(analytics.row())
+
+    import pandas as pd
+    table = pd.DataFrame(rows)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
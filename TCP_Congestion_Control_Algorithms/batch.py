@@ -0,0 +1,307 @@
+"""
+Vectorized multi-flow engines.
+
+Each engine holds the state of N independent flows of one implementation as
+NumPy arrays and advances all of them one round per run(), with masked
+np.where updates that follow the branches of the per-flow class:
+
+    ArticleBICBatch    BIC_TCP/Article_implementation/bic.py
+    TABICBatch         BIC_TCP/TA_Implementation/bic.py
+    ArticleCubicBatch  Cubic_TCP/Article_Implementation/cubic.py
+    TACubicBatch       Cubic_TCP/TA_Implementation/cubic.py
+
+Algorithm constants (SMAX, C, BETA, ...) may be scalars or length-N arrays, so
+one batch can hold a whole parameter study. Losses follow the same simulated
+clock as the per-flow classes: every flow gets a loss random()*LOSS_INTERVAL
+simulated seconds after the previous one, handled at the end of the round in
+which it falls. Random numbers come from one numpy Generator per batch, so a
+batch is reproducible from its seed but does not replay a per-flow run.
+"""
+import numpy as np
+
+
+class FlowBatch:
+
+    # simulated seconds per round.
+    ROUND_TIME = 0.1
+    # packet losses are random()*LOSS_INTERVAL simulated seconds apart,
+    # None when the implementation decides losses inside the round.
+    LOSS_INTERVAL = None
+    # state fields, in the order of the per-flow recorder columns.
+    STATE = ()
+
+    def __init__(self, n:int, seed:int=None):
+        """
+        Args:
+            n(int): number of flows.
+            seed(int): seed of the batch's numpy Generator.
+
+        Other Instance Variables:
+            round_number(int): The round number, shared by all flows.
+            now(float): simulated time at the end of the last round.
+            loss_count(np.ndarray): losses seen by every flow.
+            next_loss(np.ndarray): simulated time of every flow's next loss.
+        """
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.round_number = 1
+        self.now = 0.0
+        self.loss_count = np.zeros(n, dtype=np.int64)
+        if self.LOSS_INTERVAL is not None:
+            self.next_loss = self.rng.random(n) * self.LOSS_INTERVAL
+
+    def _array(self, value):
+        """
+            broadcasts a scalar or per-flow value to a float array of length n.
+        """
+        return np.array(np.broadcast_to(np.asarray(value, dtype=np.float64), (self.n,)))
+
+    def run(self):
+        self._update()
+        self._fire_losses()
+
+    def _update(self):
+        raise NotImplementedError
+
+    def _packet_loss(self, mask):
+        raise NotImplementedError
+
+    def _fire_losses(self):
+        """
+            handles every loss that fell into this round, flows with several
+            losses in one round handle them one after another.
+        """
+        end = self.round_number * self.ROUND_TIME
+        if self.LOSS_INTERVAL is not None:
+            due = self.next_loss <= end
+            while due.any():
+                self._packet_loss(due)
+                self.loss_count += due
+                self.next_loss[due] += self.rng.random(int(due.sum())) * self.LOSS_INTERVAL
+                due = self.next_loss <= end
+        self.now = end
+
+    def state(self):
+        """
+            returns {field: array} views of the current state.
+        """
+        return {field: getattr(self, field) for field in self.STATE}
+
+    def simulate(self, rounds:int, fields=('cwnd',)):
+        """
+            runs `rounds` rounds and returns {field: (rounds, n) array} with
+            the value of every requested field at the end of each round.
+            pass fields=() for 10^5+ flows to keep only the final state.
+        """
+        history = {field: np.empty((rounds, self.n)) for field in fields}
+        for i in range(rounds):
+            self.run()
+            for field in fields:
+                history[field][i] = getattr(self, field)
+            self.round_number += 1
+        return history
+
+
+class ArticleBICBatch(FlowBatch):
+
+    LOSS_INTERVAL = 5
+    STATE = ('cwnd', 'wmax', 'wmin')
+
+    def __init__(self, n:int, cwnd, wmax, wmin, SMAX, SMIN, BETA, LOW_WINDOW, seed:int=None):
+        super().__init__(n, seed)
+        self.cwnd = self._array(cwnd)
+        self.wmax = self._array(wmax)
+        self.wmin = self._array(wmin)
+        self.SMAX = self._array(SMAX)
+        self.SMIN = self._array(SMIN)
+        self.BETA = self._array(BETA)
+        self.LOW_WINDOW = self._array(LOW_WINDOW)
+
+    def _update(self):
+        cwnd, wmax = self.cwnd, self.wmax
+        bic_increase = np.where(cwnd < wmax, (wmax - cwnd) / 2, cwnd - wmax)
+        bic_increase = np.where(
+            bic_increase > self.SMAX, self.SMAX,
+            np.where(bic_increase < self.SMIN, self.SMIN, bic_increase),
+        )
+        increase = np.where(cwnd < self.LOW_WINDOW, 1, bic_increase)
+        self.cwnd = cwnd + increase / cwnd
+
+    def _packet_loss(self, mask):
+        # fast recovery.
+        cwnd = self.cwnd
+        low = mask & (cwnd < self.LOW_WINDOW)
+        bic = mask & ~low
+        self.wmax = np.where(
+            bic, np.where(cwnd < self.wmax, cwnd * ((2 - self.BETA) / 2), cwnd), self.wmax,
+        )
+        self.cwnd = np.where(low, cwnd * 0.5, np.where(bic, cwnd * (1 - self.BETA), cwnd))
+
+
+class TABICBatch(FlowBatch):
+
+    STATE = ('cwnd', 'wmax', 'wmin')
+    # probability of a loss during a binary search increase (random() > 0.7).
+    LOSS_THRESHOLD = 0.7
+
+    def __init__(self, n:int, cwnd, wmax, wmin, SMAX, SMIN, LOW_WINDOW, seed:int=None):
+        super().__init__(n, seed)
+        self.cwnd = self._array(cwnd)
+        self.wmax = self._array(wmax)
+        self.wmin = self._array(wmin)
+        self.SMAX = self._array(SMAX)
+        self.SMIN = self._array(SMIN)
+        self.LOW_WINDOW = self._array(LOW_WINDOW)
+
+    def _update(self):
+        cwnd, wmax, wmin = self.cwnd, self.wmax, self.wmin
+        low = cwnd < self.LOW_WINDOW
+        bic = ~low
+
+        # binary search increase.
+        midpoint = (wmax + wmin) / 2
+        converged = bic & (wmax - wmin < self.SMIN)
+        searching = bic & ~converged
+        loss = searching & (self.rng.random(self.n) > self.LOSS_THRESHOLD)
+        cwnd = np.where(converged, midpoint, np.where(low, cwnd * 0.5, cwnd))
+        wmax = np.where(loss, midpoint, wmax)
+        wmin = np.where(searching & ~loss, midpoint, wmin)
+        self.loss_count += loss
+
+        # additive increase.
+        cwnd = np.where(bic & (wmax - cwnd > self.SMAX), cwnd + self.SMAX, cwnd)
+
+        # slow start, the while loop adds SMAX at most once since cwnd > wmax.
+        cwnd = np.where(bic & (cwnd > wmax) & (cwnd < wmax + self.SMAX), cwnd + self.SMAX, cwnd)
+
+        self.cwnd, self.wmax, self.wmin = cwnd, wmax, wmin
+
+
+class ArticleCubicBatch(FlowBatch):
+
+    LOSS_INTERVAL = 3
+    # timeouts are random()*TIMEOUT_INTERVAL simulated seconds apart.
+    TIMEOUT_INTERVAL = 6
+    STATE = ('cwnd', 'wlast_max', 'wtcp', 'epoch_start', 'origin_point', 'dMin', 'ack_cnt')
+
+    def __init__(self, n:int, cwnd, C, BETA, tcp_friendliness, fast_convergence, seed:int=None):
+        """
+            timeouts reset the cubic state (_cubic_reset of the per-flow
+            class); the timeouts of a round are handled after its losses.
+        """
+        super().__init__(n, seed)
+        self.next_timeout = self.rng.random(n) * self.TIMEOUT_INTERVAL
+        self.cwnd = self._array(cwnd)
+        self.C = self._array(C)
+        self.BETA = self._array(BETA)
+        self.tcp_friendliness = np.broadcast_to(np.asarray(tcp_friendliness, dtype=bool), (n,))
+        self.fast_convergence = np.broadcast_to(np.asarray(fast_convergence, dtype=bool), (n,))
+
+        self.wlast_max = self._array(30)
+        self.k = np.zeros(n)
+        self.origin_point = np.zeros(n)
+        self.ack_cnt = np.zeros(n)
+        self.cwnd_cnt = np.zeros(n)
+        self.wtcp = np.zeros(n)
+        self.ssthresh = self._array(30)
+        # NaN marks no epoch, as None does in the per-flow class.
+        self.epoch_start = np.full(n, np.nan)
+        self.dMin = np.zeros(n)
+
+    def _update(self):
+        rtt = self.rng.uniform(0, 1, self.n)
+        self.dMin = np.where(self.dMin != 0, np.minimum(self.dMin, rtt), rtt)
+        cwnd = self.cwnd
+        slow_start = cwnd < self.ssthresh
+        cubic = ~slow_start
+
+        # cubic update.
+        ack_cnt = np.where(cubic, self.ack_cnt + 1, self.ack_cnt)
+        new_epoch = cubic & np.isnan(self.epoch_start)
+        below = cwnd < self.wlast_max
+        self.epoch_start = np.where(new_epoch, self.now, self.epoch_start)
+        with np.errstate(invalid='ignore'):
+            k = np.where(below, ((self.wlast_max - cwnd) / self.C) ** (1/3), 0)
+        self.k = np.where(new_epoch, k, self.k)
+        self.origin_point = np.where(
+            new_epoch, np.where(below, self.wlast_max, cwnd), self.origin_point,
+        )
+        ack_cnt = np.where(new_epoch, 1, ack_cnt)
+        wtcp = np.where(new_epoch, cwnd, self.wtcp)
+
+        t = self.now + self.dMin - self.epoch_start
+        target = self.origin_point + self.C * (t - self.k) ** 3
+        grow = target > cwnd
+        cnt = np.where(grow, cwnd / np.where(grow, target - cwnd, 1), 100 * cwnd)
+
+        # tcp friendliness.
+        friendly = cubic & self.tcp_friendliness
+        wtcp = np.where(friendly, wtcp + (3*self.BETA)/(2-self.BETA) * (ack_cnt/cwnd), wtcp)
+        ack_cnt = np.where(friendly, 0, ack_cnt)
+        ahead = friendly & (wtcp > cwnd)
+        max_cnt = cwnd / np.where(ahead, wtcp - cwnd, 1)
+        cnt = np.where(ahead & (cnt > max_cnt), max_cnt, cnt)
+
+        increase = cubic & (self.cwnd_cnt > cnt)
+        self.cwnd = np.where(slow_start | increase, cwnd + 1, cwnd)
+        self.cwnd_cnt = np.where(increase, 0, np.where(cubic, self.cwnd_cnt + 1, self.cwnd_cnt))
+        self.ack_cnt, self.wtcp = ack_cnt, wtcp
+
+    def _packet_loss(self, mask):
+        cwnd = self.cwnd
+        self.epoch_start = np.where(mask, np.nan, self.epoch_start)
+        converge = self.fast_convergence & (cwnd < self.wlast_max)
+        self.wlast_max = np.where(
+            mask, np.where(converge, cwnd * (2-self.BETA)/2, cwnd), self.wlast_max,
+        )
+        self.ssthresh = np.where(mask, cwnd, self.ssthresh)
+        self.cwnd = np.where(mask, cwnd * (1-self.BETA), cwnd)
+
+    def _fire_losses(self):
+        super()._fire_losses()
+        due = self.next_timeout <= self.now
+        while due.any():
+            self._cubic_reset(due)
+            self.next_timeout[due] += self.rng.random(int(due.sum())) * self.TIMEOUT_INTERVAL
+            due = self.next_timeout <= self.now
+
+    def _cubic_reset(self, mask):
+        for field in ('wlast_max', 'origin_point', 'dMin', 'wtcp', 'k', 'ack_cnt'):
+            setattr(self, field, np.where(mask, 0, getattr(self, field)))
+        self.epoch_start = np.where(mask, np.nan, self.epoch_start)
+
+    def state(self):
+        """
+            returns {field: array} of the current state, epoch_start 0
+            where there is no epoch as the per-flow recorder has it.
+        """
+        state = super().state()
+        state['epoch_start'] = np.nan_to_num(self.epoch_start, nan=0.0)
+        return state
+
+
+class TACubicBatch(FlowBatch):
+
+    LOSS_INTERVAL = 2
+    STATE = ('cwnd', 'wmax', 'k', 't_last_loss')
+
+    def __init__(self, n:int, cwnd, wmax, C, LOW_WINDOW, seed:int=None):
+        super().__init__(n, seed)
+        self.cwnd = self._array(cwnd)
+        self.wmax = self._array(wmax)
+        self.C = self._array(C)
+        self.LOW_WINDOW = self._array(LOW_WINDOW)
+        self.t_last_loss = np.zeros(n)
+        self.k = np.zeros(n)
+
+    def _update(self):
+        cwnd = np.where(self.cwnd < self.LOW_WINDOW, self.cwnd * 0.5, self.cwnd)
+        time_since_loss = self.round_number - self.t_last_loss
+        self.k = ((self.wmax - 1) / self.C) ** (1/3)
+        target_cwnd = self.wmax + self.C * (time_since_loss - self.k) ** 3
+        # cubic increase, then clamp to the target.
+        cwnd = np.where(cwnd < target_cwnd, cwnd + (target_cwnd - cwnd) / cwnd, cwnd)
+        self.cwnd = np.where(cwnd > target_cwnd, target_cwnd, cwnd)
+
+    def _packet_loss(self, mask):
+        self.t_last_loss = np.where(mask, self.round_number, self.t_last_loss)
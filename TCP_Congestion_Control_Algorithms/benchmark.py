@@ -0,0 +1,219 @@
+"""
+Benchmarks of the four implementations.
+
+For every algorithm of sweep.ALGORITHMS it measures:
+
+    rounds_per_second        headless run() without recording or tracing.
+    round_us_plain           microseconds per round, recording and tracing off,
+    round_us_record          ... recording on (insert_paramaters_to_dataframe),
+    round_us_trace           ... tracing on (a Tracer writing to a file),
+    round_us_record_trace    ... both on.
+    peak_bytes_per_flow      peak traced memory of one flow constructed and run
+                             with recording, over `memory_flows` flows.
+    import_seconds           importing the module in a fresh interpreter.
+    construct_us             constructing one flow.
+
+Times are the best of `repeat` runs, with the garbage collector off. Results
+are written as JSON, and compare flags the metrics that got worse than a stored
+baseline by more than a tolerance (exit status 1):
+
+    python -m TCP_Congestion_Control_Algorithms.benchmark run --output baseline.json
+    python -m TCP_Congestion_Control_Algorithms.benchmark run --output current.json
+    python -m TCP_Congestion_Control_Algorithms.benchmark compare baseline.json current.json
+"""
+import argparse, gc, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+
+from .sweep import ALGORITHMS, load_algorithm
+from .tracing import Tracer
+
+
+HIGHER, LOWER = 'higher', 'lower'
+# metric: which direction is better.
+METRICS = {
+    'rounds_per_second': HIGHER,
+    'round_us_plain': LOWER,
+    'round_us_record': LOWER,
+    'round_us_trace': LOWER,
+    'round_us_record_trace': LOWER,
+    'peak_bytes_per_flow': LOWER,
+    'import_seconds': LOWER,
+    'construct_us': LOWER,
+}
+
+
+def _time_rounds(algorithm:str, rounds:int, record:bool, trace:bool):
+    """
+        seconds it takes one fresh flow to run `rounds` rounds.
+    """
+    cls, params = load_algorithm(algorithm)
+    counter = cls.ROUND_COUNTER
+    with tempfile.TemporaryDirectory() as directory:
+        tracer = Tracer(os.path.join(directory, 'benchmark.trace')) if trace else None
+        flow = cls(**params, seed=0, tracer=tracer)
+        run, insert = flow.run, flow.insert_paramaters_to_dataframe
+        # as timeit does, keep the collector out of the measurement.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                run()
+                if record:
+                    insert()
+                setattr(flow, counter, getattr(flow, counter) + 1)
+            if tracer is not None:
+                tracer.close()
+            return time.perf_counter() - started
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+
+def _peak_bytes_per_flow(algorithm:str, rounds:int, flows:int):
+    cls, params = load_algorithm(algorithm)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        alive = []
+        for seed in range(flows):
+            flow = cls(**params, seed=seed)
+            for _ in range(rounds):
+                flow.step()
+            alive.append(flow)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (peak - baseline) / flows
+
+
+def _import_seconds(algorithm:str):
+    """
+        import time of the algorithm's module in a fresh interpreter.
+    """
+    module = ALGORITHMS[algorithm][0]
+    code = f'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=root, check=True, capture_output=True, text=True,
+    )
+    return float(output.stdout)
+
+
+def _construct_us(algorithm:str, number:int=200):
+    cls, params = load_algorithm(algorithm)
+    started = time.perf_counter()
+    for seed in range(number):
+        cls(**params, seed=seed)
+    return (time.perf_counter() - started) / number * 1e6
+
+
+def benchmark(algorithm:str, rounds:int=10000, repeat:int=3, memory_flows:int=20):
+    """
+        returns {metric: value} for one algorithm, see module docs.
+    """
+    best = lambda measure: min(measure() for _ in range(repeat))
+    result = {}
+    for name, record, trace in (
+        ('plain', False, False), ('record', True, False),
+        ('trace', False, True), ('record_trace', True, True),
+    ):
+        seconds = best(lambda: _time_rounds(algorithm, rounds, record, trace))
+        result[f'round_us_{name}'] = seconds / rounds * 1e6
+    result['rounds_per_second'] = 1e6 / result['round_us_plain']
+    result['peak_bytes_per_flow'] = _peak_bytes_per_flow(algorithm, min(rounds, 1000), memory_flows)
+    result['import_seconds'] = best(lambda: _import_seconds(algorithm))
+    result['construct_us'] = best(lambda: _construct_us(algorithm))
+    return {metric: result[metric] for metric in METRICS}
+
+
+def run_benchmarks(algorithms=None, rounds:int=10000, repeat:int=3, memory_flows:int=20):
+    """
+        benchmarks the given algorithms (all by default) and returns the
+        JSON-ready result with the machine it ran on.
+    """
+    algorithms = algorithms or list(ALGORITHMS)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rounds': rounds,
+        'repeat': repeat,
+        'results': {
+            algorithm: benchmark(algorithm, rounds, repeat, memory_flows)
+            for algorithm in algorithms
+        },
+    }
+
+
+def compare(baseline:dict, current:dict, tolerance:float=0.1):
+    """
+        returns [(algorithm, metric, baseline value, current value, change)]
+        for every metric that got worse by more than `tolerance` (relative).
+        change is positive when worse.
+    """
+    regressions = []
+    for algorithm, metrics in current['results'].items():
+        reference = baseline['results'].get(algorithm)
+        if reference is None:
+            continue
+        for metric, value in metrics.items():
+            before = reference.get(metric)
+            if before is None or metric not in METRICS or before == 0:
+                continue
+            change = (value - before) / before
+            if METRICS[metric] == HIGHER:
+                change = -change
+            if change > tolerance:
+                regressions.append((algorithm, metric, before, value, change))
+    return regressions
+
+
+def format_results(results:dict):
+    algorithms = list(results['results'])
+    lines = [f"{'metric':<24}" + ''.join(f'{algorithm:>16}' for algorithm in algorithms)]
+    for metric in METRICS:
+        lines.append(f'{metric:<24}' + ''.join(
+            f"{results['results'][algorithm][metric]:>16.6g}" for algorithm in algorithms
+        ))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the congestion control implementations.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks')
+    run.add_argument('--algorithms', nargs='+', choices=sorted(ALGORITHMS), default=None)
+    run.add_argument('--rounds', type=int, default=10000)
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--memory-flows', type=int, default=20)
+    run.add_argument('--output', default=None, help='JSON file')
+
+    check = commands.add_parser('compare', help='flag regressions against a baseline')
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--tolerance', type=float, default=0.1,
+                       help='relative change tolerated before flagging (default 0.1)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.algorithms, args.rounds, args.repeat, args.memory_flows)
+        print(format_results(results))
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    regressions = compare(baseline, current, args.tolerance)
+    for algorithm, metric, before, value, change in regressions:
+        print(f'REGRESSION {algorithm} {metric}: {before:.6g} -> {value:.6g} ({change:+.1%} worse)')
+    if not regressions:
+        print(f'no regressions beyond {args.tolerance:.0%}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Content-addressed on-disk cache of experiment results.
+
+Seeded runs are deterministic, so a result is fully determined by what
+produced it. The key of a result is the SHA-256 of:
+
+    kind         the function computing the result (e.g. sweep.run_configuration).
+    variant      the registered algorithm name, its module and class.
+    code         the hash of the source of the implementation's module, the
+                 modules of the package it uses, and the module of the function.
+    parameters   the defaults updated with the given parameters.
+    seed, rounds
+
+Editing an implementation, or the function computing the result, changes the
+key, so a stale result is never returned. Entries are pickles under
+DIRECTORY/ab/abcdef....pkl. A hit refreshes the entry's mtime, and once the
+cache grows past max_bytes the least recently used entries are removed.
+
+    cache = ResultCache()                    # CC_CACHE_DIR or ~/.cache/...
+    columns = cached_run(cache, 'cubic-ta', dict(C=0.4), seed=1, rounds=10000)
+    table = sweep('bic-article', space, seeds, cache=cache)
+
+    python -m TCP_Congestion_Control_Algorithms.cache info
+    python -m TCP_Congestion_Control_Algorithms.cache clear
+"""
+import argparse, hashlib, json, os, pickle, sys, tempfile
+
+from .core.registry import VARIANTS, load
+
+
+PACKAGE = __name__.rpartition('.')[0]
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'tcp_congestion_control')
+DEFAULT_MAX_BYTES = 512 * 2**20
+SUFFIX = '.pkl'
+
+# (path, mtime, size): digest, so unchanged files are hashed once.
+_file_digests = {}
+# get() default telling a miss from a stored None.
+_MISSING = object()
+
+
+def _file_digest(path:str):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _file_digests:
+        with open(path, 'rb') as file:
+            _file_digests[key] = hashlib.sha256(file.read()).hexdigest()
+    return _file_digests[key]
+
+
+def code_version(*objects):
+    """
+        hash of the source of the modules defining `objects` (classes or
+        functions) and of the package modules those modules use.
+    """
+    modules = set()
+    for obj in objects:
+        for cls in getattr(obj, '__mro__', (obj,)):
+            module = sys.modules.get(cls.__module__)
+            if module is None or not cls.__module__.startswith(PACKAGE):
+                continue
+            modules.add(module)
+            # package modules the module takes names from (ack_batching, core, ...).
+            for value in vars(module).values():
+                origin = getattr(value, '__module__', None)
+                if isinstance(origin, str) and origin.startswith(PACKAGE) and origin in sys.modules:
+                    modules.add(sys.modules[origin])
+    digest = hashlib.sha256()
+    for path in sorted(module.__file__ for module in modules if getattr(module, '__file__', None)):
+        digest.update(os.path.relpath(path, os.path.dirname(__file__)).encode())
+        digest.update(_file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def result_key(function, algorithm:str, params:dict, seed:int, rounds:int):
+    """
+        content address of function(algorithm, params, seed, rounds).
+    """
+    cls, defaults = load(algorithm)
+    defaults.update(params)
+    module, class_name, _ = VARIANTS[algorithm]
+    description = {
+        'kind': f'{function.__module__}.{function.__qualname__}',
+        'variant': [algorithm, module, class_name],
+        'code': code_version(cls, function),
+        'parameters': defaults,
+        'seed': seed,
+        'rounds': rounds,
+    }
+    # repr keeps 4 and 4.0 apart, as they can give different runs.
+    text = json.dumps(description, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory:str=None, max_bytes:int=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory(str): cache directory, CC_CACHE_DIR or
+                               ~/.cache/tcp_congestion_control by default.
+            max_bytes(int): size above which the least recently used
+                               entries are evicted.
+
+        Other Instance Variables:
+            hits(int): lookups answered from the cache.
+            misses(int): lookups that had to compute.
+        """
+        if max_bytes <= 0:
+            raise ValueError(f'max_bytes must be positive, got {max_bytes}')
+        self.directory = directory or os.environ.get('CC_CACHE_DIR') or DEFAULT_DIRECTORY
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # bytes in the directory, scanned on first use.
+        self._usage = None
+
+    @classmethod
+    def of(cls, cache):
+        """
+            a ResultCache from a ResultCache, a directory or None (no cache).
+        """
+        if cache is None or isinstance(cache, ResultCache):
+            return cache
+        return cls(cache)
+
+    def _path(self, key:str):
+        return os.path.join(self.directory, key[:2], key + SUFFIX)
+
+    def _entries(self):
+        """
+            [(mtime, size, path)] of every entry.
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def __contains__(self, key:str):
+        return os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def size(self):
+        """
+            bytes used by the entries.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key:str, default=None):
+        """
+            the stored result of `key`, `default` when there is none.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        # the mtime orders the entries for the LRU eviction.
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key:str, value):
+        """
+            stores a result, then evicts down to max_bytes.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        # written next to the entry and renamed, readers never see half an entry.
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        if self._usage is None:
+            self._usage = self.size()
+        else:
+            self._usage += os.path.getsize(path) - old
+        if self._usage > self.max_bytes:
+            self.evict(keep=path)
+
+    def evict(self, keep:str=None):
+        """
+            removes least recently used entries until the cache fits in
+            max_bytes; `keep` (the entry just written) is removed last.
+        """
+        entries = sorted(self._entries(), key=lambda entry: (entry[2] == keep, entry[0]))
+        usage = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if usage <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            usage -= size
+        self._usage = usage
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+        self._usage = 0
+
+    def call(self, function, algorithm:str, params:dict, seed:int, rounds:int, force:bool=False):
+        """
+            function(algorithm, params, seed, rounds) through the cache;
+            force recomputes and replaces the stored result.
+        """
+        key = result_key(function, algorithm, params, seed, rounds)
+        if not force:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        value = function(algorithm, params, seed, rounds)
+        self.put(key, value)
+        return value
+
+
+def run_columns(algorithm:str, params:dict, seed:int, rounds:int):
+    """
+        runs one headless flow for `rounds` rounds and returns its recorded
+        columns, {name: np.ndarray}.
+    """
+    cls, defaults = load(algorithm)
+    defaults.update(params)
+    flow = cls(**defaults, seed=seed)
+    for _ in range(rounds):
+        flow.step()
+    return flow.recorder.to_numpy()
+
+
+def cached_run(cache, algorithm:str, params:dict=None, seed:int=0, rounds:int=1000, force:bool=False):
+    """
+        the recorded columns of a run (see run_columns), from the cache when
+        it already ran. `cache` is a ResultCache, a directory or None.
+    """
+    cache = ResultCache.of(cache)
+    params = dict(params or {})
+    if cache is None:
+        return run_columns(algorithm, params, seed, rounds)
+    return cache.call(run_columns, algorithm, params, seed, rounds, force)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Result cache of the experiments.')
+    parser.add_argument('command', choices=('info', 'clear', 'evict'))
+    parser.add_argument('--directory', default=None)
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.directory, args.max_bytes)
+    if args.command == 'clear':
+        cache.clear()
+    elif args.command == 'evict':
+        cache.evict()
+    print(f'{cache.directory}: {len(cache)} entries, {cache.size() / 2**20:.1f} MiB of {cache.max_bytes / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
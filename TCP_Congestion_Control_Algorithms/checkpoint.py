@@ -0,0 +1,221 @@
+"""
+Snapshot, restore and fork of a flow's state.
+
+A snapshot holds everything a flow needs to continue exactly where it was:
+the algorithm state (cwnd, wmax / wlast_max, k, epoch_start, origin_point,
+ack_cnt, dMin, ...), the recorded rounds, the state of its random number
+generator and its pending scheduler events. A flow restored from a snapshot
+makes the same rounds the original would have made.
+
+The renderer and the tracer are not part of a snapshot, they are given again
+to restore(). A streamed recorder (streaming.py) comes back as an in-memory
+StateRecorder with all its rounds.
+
+    data = snapshot(flow)                   # bytes
+    flow = restore(data)
+    branches = fork(flow, seeds=range(100))  # 100 what-if continuations
+
+Format: MAGIC, VERSION (uint16, little endian), then zlib-compressed
+
+    header   uint32 (little endian) length, then the JSON of the algorithm's
+             registry name, the state fields (numbers, booleans, None), the
+             random number generator state, the scheduler and the recorded
+             columns and rounds.
+    columns  every recorded column as raw little endian float64 bytes.
+
+Nothing in a snapshot is executed: the class is looked up among the
+registered variants (core.registry) and only scalar state fields of it are
+set, so a snapshot file from anywhere is safe to load. A flow of a class
+that is not registered is snapshotted as the registered variant it derives
+from.
+"""
+import json, random, struct, sys, zlib
+from array import array
+
+from .core.base import state_fields
+from .core.registry import load as load_variant, name_of
+from .recording import StateRecorder
+from .rendering import Renderer
+from .scheduler import EventScheduler
+
+
+MAGIC = b'CCSNAP'
+VERSION = 2
+# types of the state fields a snapshot holds.
+_SCALARS = (bool, int, float, type(None))
+
+# attributes rebuilt by restore() instead of being stored.
+_TRANSIENT = ('renderer', 'tracer', 'trace_mask', 'recorder', 'random', 'scheduler')
+
+
+def _state_of(flow):
+    # flows keep their state in __slots__, unset slots (e.g. cnt before the
+    # first cubic update) are left out.
+    return {
+        name: getattr(flow, name) for name in state_fields(type(flow))
+        if name not in _TRANSIENT and hasattr(flow, name)
+    }
+
+
+def capture(flow):
+    """
+        returns the snapshot of a flow as a dict of plain values.
+    """
+    # instrumented flows (instrumentation.py) run a subclass of their own
+    # class, name_of resolves them to the flow's registered variant.
+    algorithm = name_of(flow)
+    if algorithm is None:
+        raise ValueError(f'{type(flow).__name__} is not a registered variant (core.registry)')
+    state = _state_of(flow)
+    for name, value in state.items():
+        if not isinstance(value, _SCALARS):
+            raise ValueError(f'state field {name} holds a {type(value).__name__}, a snapshot holds numbers')
+    recorder = flow.recorder
+    columns = recorder.to_numpy()
+    version, internal, gauss = flow.random.getstate()
+    payload = {
+        'algorithm': algorithm,
+        'state': state,
+        'random': [version, list(internal), gauss],
+        'recorder': {
+            'columns': list(recorder.columns),
+            'data': [memoryview(columns[name].astype('<f8', copy=False)).tobytes() for name in recorder.columns],
+        },
+    }
+    scheduler = getattr(flow, 'scheduler', None)
+    if scheduler is not None:
+        payload['scheduler'] = {
+            'now': scheduler.now, 'queue': [list(event) for event in scheduler.queue], 'sequence': scheduler._sequence,
+        }
+    return payload
+
+
+def snapshot(flow):
+    """
+        returns the compact binary snapshot of a flow.
+    """
+    payload = capture(flow)
+    data = payload['recorder']['data']
+    header = dict(payload, recorder={
+        'columns': payload['recorder']['columns'],
+        'rounds': len(data[0]) // 8 if data else 0,
+    })
+    header = json.dumps(header, separators=(',', ':')).encode()
+    body = zlib.compress(struct.pack('<I', len(header)) + header + b''.join(data))
+    return MAGIC + struct.pack('<H', VERSION) + body
+
+
+def decode(data:bytes):
+    """
+        returns the payload dict of a binary snapshot.
+    """
+    start = len(MAGIC) + 2
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a flow snapshot')
+    (version,) = struct.unpack('<H', data[len(MAGIC):start])
+    if version != VERSION:
+        raise ValueError(f'snapshot version {version} is not the supported version {VERSION}')
+    body = zlib.decompress(data[start:])
+    (length,) = struct.unpack_from('<I', body)
+    payload = json.loads(body[4:4 + length])
+    recorded = payload['recorder']
+    size = 8 * recorded['rounds']
+    columns = body[4 + length:]
+    if len(columns) != size * len(recorded['columns']):
+        raise ValueError(f'snapshot holds {len(columns)} bytes of columns, expected {size * len(recorded["columns"])}')
+    recorded['data'] = [columns[i * size:(i + 1) * size] for i in range(len(recorded['columns']))]
+    return payload
+
+
+def build(payload:dict, renderer:Renderer=None, tracer=None, seed:int=None):
+    """
+        creates a flow from a snapshot payload; the payload is not modified,
+        so one payload can build any number of flows.
+
+    Args:
+        renderer(Renderer): renderer of the new flow, headless when None.
+        tracer(Tracer): tracer of the new flow, no tracing when None.
+        seed(int): reseeds the random number generator instead of restoring
+                      its state, so flows built from one payload diverge.
+    """
+    cls, _ = load_variant(payload['algorithm'])
+    fields = state_fields(cls)
+    flow = cls.__new__(cls)
+    for attribute, value in payload['state'].items():
+        if attribute not in fields or attribute in _TRANSIENT or not isinstance(value, _SCALARS):
+            raise ValueError(f'{attribute!r} is not a state field of {payload["algorithm"]}')
+        setattr(flow, attribute, value)
+
+    flow.random = random.Random(seed)
+    if seed is None:
+        version, internal, gauss = payload['random']
+        flow.random.setstate((version, tuple(internal), gauss))
+
+    recorded = payload['recorder']
+    flow.recorder = StateRecorder(recorded['columns'])
+    for column, data in zip(flow.recorder._arrays, recorded['data']):
+        values = array('d')
+        values.frombytes(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        column.extend(values)
+
+    if 'scheduler' in payload:
+        saved = payload['scheduler']
+        flow.scheduler = EventScheduler()
+        flow.scheduler.now = saved['now']
+        queue = [(time, sequence, event) for time, sequence, event in saved['queue']]
+        for _, _, event in queue:
+            # events are methods of the flow called by name.
+            if not isinstance(event, str) or event.startswith('__') or not callable(getattr(cls, event, None)):
+                raise ValueError(f'{event!r} is not an event of {payload["algorithm"]}')
+        flow.scheduler.queue = queue
+        flow.scheduler._sequence = saved['sequence']
+
+    flow.renderer = renderer if renderer is not None else Renderer()
+    flow.tracer = tracer
+    flow.trace_mask = tracer.bind(cls.EVENTS) if tracer is not None else 0
+    return flow
+
+
+def restore(data:bytes, renderer:Renderer=None, tracer=None, seed:int=None):
+    """
+        creates a flow from a binary snapshot, see build.
+    """
+    return build(decode(data), renderer, tracer, seed)
+
+
+def save(flow, path:str):
+    with open(path, 'wb') as file:
+        file.write(snapshot(flow))
+
+
+def load(path:str, renderer:Renderer=None, tracer=None, seed:int=None):
+    with open(path, 'rb') as file:
+        return restore(file.read(), renderer, tracer, seed)
+
+
+def fork(source, n:int=None, seeds=None):
+    """
+        branches continuations from one checkpoint without replaying its
+        rounds: `source` is a flow, a binary snapshot or a payload, and the
+        branches are built from one decoded payload.
+
+    Args:
+        n(int): number of identical branches (same RNG state).
+        seeds: one branch per seed, each with its RNG reseeded.
+
+    Returns:
+        list of flows.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        payload = decode(source)
+    elif isinstance(source, dict):
+        payload = source
+    else:
+        payload = capture(source)
+    if seeds is not None:
+        return [build(payload, seed=seed) for seed in seeds]
+    if n is None:
+        raise ValueError('fork needs n or seeds')
+    return [build(payload) for _ in range(n)]
@@ -0,0 +1,211 @@
+"""
+Online detection of the end of the transient of a run.
+
+A SteadyStateDetector is fed the records of flow.iter_rounds() one round at a
+time and tells when one state field (cwnd by default) stopped drifting, so a
+run can stop there instead of after a fixed number of rounds:
+
+    detector = SteadyStateDetector('cwnd')
+    for record in flow.iter_rounds(100000, stop=detector):
+        pass
+    detector.kind, detector.round, detector.mean
+
+Two tests run at the end of every block of rounds:
+
+    periodic  the last `repeats` periods of some length P <= max_period, and
+              at least the last blocks/2 blocks of `block` rounds, repeat within
+              period_tolerance (P = 1 is a fixed point); the deterministic
+              sawtooth of a flow without random loss ends here, a plateau
+              between two random losses is shorter than that and does not.
+    steady    batch means: the means of the last `blocks` blocks are nearly
+              uncorrelated (lag-1 autocorrelation below max_correlation), an
+              older and a newer half of them agree within z standard errors,
+              and the standard error of their mean is below `tolerance` of
+              it; a flow with random loss ends here once its average settled.
+              A loss cycle longer than a block correlates neighbouring block
+              means, so once 2 * blocks means are kept, pairs of them are
+              merged and the blocks are twice as long from then on.
+
+Pure python, it imports nothing heavy and costs O(1) per round between block
+ends.
+"""
+import argparse, math
+from collections import deque
+
+from .core.registry import create, names
+
+
+class SteadyStateDetector:
+
+    def __init__(self, field:str='cwnd', block:int=50, blocks:int=20, tolerance:float=0.02, z:float=3.0,
+                 max_correlation:float=0.15, max_period:int=64, repeats:int=3, period_tolerance:float=1e-6,
+                 min_rounds:int=0):
+        """
+        Args:
+            field(str): state field watched, a COLUMNS name of the flow.
+            block(int): rounds of the first batch means, doubled while
+                           the flow's loss cycle correlates them.
+            blocks(int): batch means compared by the steady test (even).
+            tolerance(float): relative standard error of the mean below
+                                 which the average counts as settled.
+            z(float): standard errors the two halves may differ by.
+            max_correlation(float): lag-1 autocorrelation of the batch
+                                       means above which they are too
+                                       short to test.
+            max_period(int): longest period the periodic test looks for.
+            repeats(int): identical periods required by the periodic test.
+            period_tolerance(float): relative difference of two values
+                                        still counted as equal.
+            min_rounds(int): rounds always run before testing (warm-up).
+
+        Other Instance Variables:
+            converged(bool): a test passed, later records are ignored.
+            kind(str): 'periodic' or 'steady' once converged, else None.
+            period(int): length of the cycle when periodic.
+            round(int): round counter of the record that ended the run.
+            mean(float): mean of the field over the detection window.
+            rounds(int): records seen.
+            total(float): sum of the field over the records seen.
+            batch(int): rounds per batch mean now.
+        """
+        if block <= 0 or blocks < 2 or blocks % 2:
+            raise ValueError(f'block must be positive and blocks even and >= 2, got block={block}, blocks={blocks}')
+        if max_period < 0 or repeats < 2:
+            raise ValueError(f'max_period must be >= 0 and repeats >= 2, got max_period={max_period}, repeats={repeats}')
+        self.field = field
+        self.block = block
+        self.blocks = blocks
+        self.tolerance = tolerance
+        self.z = z
+        self.max_correlation = max_correlation
+        self.max_period = max_period
+        self.repeats = repeats
+        self.period_tolerance = period_tolerance
+        self.min_rounds = min_rounds
+        self.reset()
+
+    def reset(self):
+        self.converged = False
+        self.kind = None
+        self.period = None
+        self.round = None
+        self.mean = None
+        self.rounds = 0
+        self.total = 0.0
+        self.batch = self.block
+        self._index = None
+        self._sum = 0.0
+        self._count = 0
+        self._means = []
+        self._recent = deque(maxlen=max(self.max_period * self.repeats, self.blocks // 2 * self.block))
+
+    def __call__(self, record):
+        return self.update(record)
+
+    def update(self, record):
+        """
+            takes the record of one round, returns True once converged.
+        """
+        if self.converged:
+            return True
+        if self._index is None:
+            self._index = record._fields.index(self.field)
+        value = record[self._index]
+        self.rounds += 1
+        self.total += value
+        self._recent.append(value)
+        self._sum += value
+        self._count += 1
+        if self._count < self.batch:
+            return False
+
+        means = self._means
+        means.append(self._sum / self._count)
+        self._sum, self._count = 0.0, 0
+        if len(means) == 2 * self.blocks:
+            means[:] = [(means[i] + means[i + 1]) / 2 for i in range(0, len(means), 2)]
+            self.batch *= 2
+        if self.rounds < self.min_rounds:
+            return False
+        if self._periodic() or self._steady():
+            self.converged = True
+            self.round = record[0]
+        return self.converged
+
+    def _same(self, a:float, b:float):
+        return abs(a - b) <= self.period_tolerance * max(abs(a), abs(b), 1.0)
+
+    def _periodic(self):
+        recent, end = self._recent, len(self._recent)
+        for period in range(1, self.max_period + 1):
+            span = max(period * self.repeats, self.blocks // 2 * self.block)
+            if span > end:
+                break
+            # recent[i] == recent[i + period] over the span, newest first.
+            if all(self._same(recent[i], recent[i + period]) for i in range(end - period - 1, end - span - 1, -1)):
+                self.kind, self.period = 'periodic', period
+                self.mean = sum(recent[i] for i in range(len(recent) - period, len(recent))) / period
+                return True
+        return False
+
+    def _steady(self):
+        if len(self._means) < self.blocks:
+            return False
+        means, n = self._means[-self.blocks:], self.blocks
+        half = n // 2
+        mean = sum(means) / n
+        deviations = [m - mean for m in means]
+        square = sum(d * d for d in deviations)
+        if square == 0.0:
+            self.kind, self.mean = 'steady', mean
+            return True
+        correlation = sum(deviations[i] * deviations[i + 1] for i in range(n - 1)) / square
+        error = math.sqrt(square / (n - 1) / n)
+        older = sum(means[:half]) / half
+        newer = sum(means[half:]) / half
+        # the difference of the halves has twice the error of the mean.
+        if (correlation > self.max_correlation or abs(newer - older) > self.z * 2 * error
+                or error > self.tolerance * abs(mean)):
+            return False
+        self.kind, self.mean = 'steady', mean
+        return True
+
+
+def run_until_steady(flow, rounds:int, detector:SteadyStateDetector=None, record:bool=True):
+    """
+        runs a flow until `detector` (a SteadyStateDetector on cwnd by
+        default) detects convergence or `rounds` rounds ran; returns the
+        detector.
+    """
+    detector = detector if detector is not None else SteadyStateDetector()
+    for _ in flow.iter_rounds(rounds, record=record, stop=detector):
+        pass
+    return detector
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs a flow until its state settles.')
+    parser.add_argument('algorithm', choices=names())
+    parser.add_argument('--rounds', type=int, default=100000, help='rounds run at most')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--field', default='cwnd')
+    parser.add_argument('--block', type=int, default=50)
+    parser.add_argument('--blocks', type=int, default=20)
+    parser.add_argument('--tolerance', type=float, default=0.02)
+    parser.add_argument('--max-period', type=int, default=64)
+    args = parser.parse_args(argv)
+
+    flow = create(args.algorithm, seed=args.seed)
+    detector = SteadyStateDetector(
+        args.field, block=args.block, blocks=args.blocks, tolerance=args.tolerance, max_period=args.max_period,
+    )
+    run_until_steady(flow, args.rounds, detector, record=False)
+    if detector.converged:
+        period = f', period {detector.period}' if detector.kind == 'periodic' else ''
+        print(f'{args.algorithm}: {detector.kind} after {detector.rounds} rounds{period}, mean {args.field} {detector.mean:.4g}')
+    else:
+        print(f'{args.algorithm}: not converged after {detector.rounds} rounds')
+
+
+if __name__ == '__main__':
+    main()
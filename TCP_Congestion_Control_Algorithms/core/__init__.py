@@ -0,0 +1,11 @@
+"""
+Import-light core: the base class of the implementations and the registry of
+the variants. Nothing here imports numpy, pandas or matplotlib; plotting
+(rendering.py), the pandas export (StateRecorder.to_dataframe) and tracing
+import what they need when they are used.
+
+    from TCP_Congestion_Control_Algorithms.core import create
+    flow = create('cubic-article', seed=1)
+"""
+from .base import CongestionControl, state_fields
+from .registry import VARIANTS, create, load, name_of, names, register
@@ -0,0 +1,130 @@
+"""
+Base class of the four implementations.
+
+It holds what every flow has (cwnd, the loss counter, the random number
+generator, the recorder, the renderer and the tracer) and the round loop
+around the implementation's run(). State lives in __slots__: a flow has no
+__dict__, so it is smaller and its attributes are faster to reach; every
+state field an implementation sets must be listed in its __slots__.
+"""
+import random
+from collections import namedtuple
+
+from ..recording import StateRecorder
+from ..rendering import Renderer
+from ..tracing import ROUND_END
+
+
+class CongestionControl:
+
+    __slots__ = ('cwnd', 'loss_count', 'random', 'recorder', 'renderer', 'tracer', 'trace_mask')
+
+    # trace events of the implementation (tracing.EventTable).
+    EVENTS = None
+    # recorded state fields, the round counter first.
+    COLUMNS = ()
+    # attribute counting the rounds.
+    ROUND_COUNTER = 'round_number'
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # the record type of iter_rounds(), one field per column.
+        if 'COLUMNS' in cls.__dict__:
+            cls.Record = namedtuple(f'{cls.__name__}Record', cls.COLUMNS, module=cls.__module__)
+            cls.Record.__qualname__ = f'{cls.__qualname__}.Record'
+
+    def _setup(self, renderer=None, seed:int=None, tracer=None):
+        """
+            sets up what every flow has, called by the implementations'
+            __init__ once their own state is set.
+
+        Args:
+            renderer(Renderer): draws the cwnd evolution, headless when None.
+            seed(int): seed of the random number generator, the same seed
+                          gives the same run.
+            tracer(Tracer): records the trace events, no tracing when None.
+        """
+        self.loss_count = 0
+        self.random = random.Random(seed)
+
+        # setting up tracing.
+        self.tracer = tracer
+        self.trace_mask = tracer.bind(self.EVENTS) if tracer is not None else 0
+
+        # setting up the state recorder (the pandas DataFrame is built on request).
+        self.recorder = StateRecorder(self.COLUMNS)
+
+        # setting up plot (headless unless a drawing renderer is given).
+        self.renderer = renderer if renderer is not None else Renderer()
+
+    def run(self):
+        raise NotImplementedError
+
+    def state(self):
+        """
+            the recorded state fields, in COLUMNS order.
+        """
+        raise NotImplementedError
+
+    def insert_paramaters_to_dataframe(self):
+        self.recorder.record(*self.state())
+
+    def _fire_events(self):
+        """
+            advances the simulated clock to the end of this round and
+            handles the events that became due in the meantime.
+        """
+        for event in self.scheduler.advance(getattr(self, self.ROUND_COUNTER) * self.ROUND_TIME):
+            getattr(self, event)()
+
+    @property
+    def dataframe(self):
+        return self.recorder.to_dataframe()
+
+    def step(self):
+        """
+            one whole round: run, record the state and move to the next round.
+        """
+        self.run()
+        self.insert_paramaters_to_dataframe()
+        counter = self.ROUND_COUNTER
+        setattr(self, counter, getattr(self, counter) + 1)
+
+    def iter_rounds(self, rounds:int=None, record:bool=True, stop=None):
+        """
+            runs round after round and yields the state of each one as a
+            Record (a namedtuple of COLUMNS); the loop is driven by the
+            caller, which can stop pulling at any round.
+
+        Args:
+            rounds(int): number of rounds, endless when None.
+            record(bool): keep the rounds in the recorder as well.
+            stop(callable): called with each record after it is yielded,
+                               the iteration ends once it returns True
+                               (e.g. a convergence.SteadyStateDetector).
+        """
+        counter, make = self.ROUND_COUNTER, self.Record._make
+        remaining = -1 if rounds is None else rounds
+        while remaining:
+            remaining -= 1
+            self.run()
+            values = self.state()
+            if self.trace_mask & ROUND_END:
+                self.tracer.end_round(values[0])
+            if record:
+                self.recorder.record(*values)
+            setattr(self, counter, getattr(self, counter) + 1)
+            item = make(values)
+            yield item
+            if stop is not None and stop(item):
+                return
+
+
+def state_fields(cls):
+    """
+        names of the slots of an implementation, base class slots first.
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        names.extend(name for name in klass.__dict__.get('__slots__', ()) if name not in names)
+    return tuple(names)
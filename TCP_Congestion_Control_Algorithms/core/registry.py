@@ -0,0 +1,79 @@
+"""
+Registry of the BIC / CUBIC variants.
+
+A variant is found by name without importing anything: its module is only
+imported by load(), so listing the variants (e.g. for a command line) costs
+nothing and a worker process imports the one implementation it runs.
+"""
+import importlib
+
+
+# name: (module, class, default parameters of the module's __main__ block)
+VARIANTS = {
+    'bic-article': (
+        'TCP_Congestion_Control_Algorithms.BIC_TCP.Article_implementation.bic', 'BICTCPCongestionControl',
+        dict(cwnd=10, wmax=30, wmin=5, SMIN=1, SMAX=5, LOW_WINDOW=4, BETA=0.125),
+    ),
+    'bic-ta': (
+        'TCP_Congestion_Control_Algorithms.BIC_TCP.TA_Implementation.bic', 'BICTCPCongestionControl',
+        dict(cwnd=10, wmax=30, wmin=5, SMIN=1, SMAX=5, LOW_WINDOW=4),
+    ),
+    'cubic-article': (
+        'TCP_Congestion_Control_Algorithms.Cubic_TCP.Article_Implementation.cubic', 'CubicTCPCongestionControl',
+        dict(cwnd=10, C=0.4, BETA=0.2, tcp_friendliness=True, fast_convergence=True),
+    ),
+    'bic-kernel': (
+        'TCP_Congestion_Control_Algorithms.BIC_TCP.Kernel_Implementation.bic', 'BICTCPCongestionControl',
+        dict(cwnd=10, wmax=30, wmin=5, SMIN=1, SMAX=16, LOW_WINDOW=14, BETA=0.2),
+    ),
+    'cubic-kernel': (
+        'TCP_Congestion_Control_Algorithms.Cubic_TCP.Kernel_Implementation.cubic', 'CubicTCPCongestionControl',
+        dict(cwnd=10, C=0.4, BETA=0.3, tcp_friendliness=True, fast_convergence=True),
+    ),
+    'cubic-ta': (
+        'TCP_Congestion_Control_Algorithms.Cubic_TCP.TA_Implementation.cubic', 'CubicTCPCongestionControl',
+        dict(cwnd=10, wmax=30, C=0.4, LOW_WINDOW=4),
+    ),
+}
+
+
+def register(name:str, module:str, class_name:str, defaults:dict=None):
+    """
+        adds (or replaces) a variant; `module` is imported on first use.
+    """
+    VARIANTS[name] = (module, class_name, dict(defaults or {}))
+
+
+def names():
+    return sorted(VARIANTS)
+
+
+def load(name:str):
+    """
+        returns (class, default parameters) of a registered variant.
+    """
+    if name not in VARIANTS:
+        raise KeyError(f'unknown algorithm {name!r}, expected one of {sorted(VARIANTS)}')
+    module, class_name, defaults = VARIANTS[name]
+    return getattr(importlib.import_module(module), class_name), dict(defaults)
+
+
+def create(name:str, **params):
+    """
+        builds a flow of a registered variant, `params` over its defaults
+        (seed, renderer and tracer included).
+    """
+    cls, defaults = load(name)
+    defaults.update(params)
+    return cls(**defaults)
+
+
+def name_of(flow):
+    """
+        registered name of a flow's variant, None when it is not registered.
+    """
+    for cls in type(flow).__mro__:
+        for name, (module, class_name, _) in VARIANTS.items():
+            if cls.__module__ == module and cls.__name__ == class_name:
+                return name
+    return None
@@ -0,0 +1,179 @@
+"""
+Integer arithmetic of the Linux tcp_cubic / tcp_bic modules.
+
+The kernel keeps cwnd in whole segments, counts ACKs in snd_cwnd_cnt and
+grows cwnd by one segment every `cnt` ACKs; time is in jiffies and the cubic
+function is evaluated in a 2^BICTCP_HZ fixed-point time scale, with the cube
+root taken from a 64-entry table refined by one Newton-Raphson step. The
+functions here follow tcp_cubic.c / tcp_bic.c / tcp_cong.c line by line, so
+the Kernel_Implementation classes can be compared with kernel traces.
+
+    cubic_root(a)              tcp_cubic.c cubic_root(), 0.195% mean error.
+    cubic_root_array(a)        the same on a numpy array (batch engines).
+    cubic_constants(C, BETA)   beta, bic_scale, beta_scale, cube_rtt_scale,
+                               cube_factor of the float parameters.
+    bic_cnt(...)               the ACKs per increment of tcp_bic's update.
+    cong_avoid_ai(...)         tcp_cong_avoid_ai().
+"""
+import math
+
+
+# beta (and the other ratios) are in 1/BETA_SCALE.
+BETA_SCALE = 1024
+# time of the cubic function is in 1/2^BICTCP_HZ seconds.
+BICTCP_HZ = 10
+# jiffies per second.
+HZ = 1000
+# tcp_bic's delayed ACK ratio is kept in 1/2^ACK_RATIO_SHIFT.
+ACK_RATIO_SHIFT = 4
+# tcp_bic's binary search goes to (max + min) / BICTCP_B.
+BICTCP_B = 4
+# tcp_bic's increment around wmax is BICTCP_B / SMOOTH_PART per RTT.
+SMOOTH_PART = 20
+
+# cbrt(x) MSB values for x MSB values in [0..63], from tcp_cubic.c
+# (v = cbrt(x << 18) - 1, refined by hand); cbrt(x) = (v[x] + 10) >> 6.
+CBRT_TABLE = (
+    0, 54, 54, 54, 118, 118, 118, 118,
+    123, 129, 134, 138, 143, 147, 151, 156,
+    157, 161, 164, 168, 170, 173, 176, 179,
+    181, 185, 187, 190, 192, 194, 197, 199,
+    200, 202, 204, 206, 209, 211, 213, 215,
+    217, 219, 221, 222, 224, 225, 227, 229,
+    231, 232, 234, 236, 237, 239, 240, 242,
+    244, 245, 246, 248, 250, 251, 252, 254,
+)
+
+U32 = 0xFFFFFFFF
+
+
+def cubic_root(a:int):
+    """
+        integer cube root of a 64-bit `a` as tcp_cubic computes it: the
+        table gives the first 6 bits, one Newton-Raphson step the rest.
+    """
+    b = a.bit_length()
+    if b < 7:
+        # a in [0..63]
+        return (CBRT_TABLE[a] + 35) >> 6
+    b = ((b * 84) >> 8) - 1
+    shift = a >> (b * 3)
+    x = (((CBRT_TABLE[shift] + 10) << b) & U32) >> 6
+    # x_{1} = (2 * x_{0} + a / (x_{0} * (x_{0} - 1))) / 3, with 341/1024 ~ 1/3.
+    x = 2 * x + a // (x * (x - 1))
+    return ((x * 341) >> 10) & U32
+
+
+def cubic_root_array(a):
+    """
+        cubic_root() of every element of an integer numpy array.
+    """
+    import numpy as np
+    a = np.asarray(a, dtype=np.uint64)
+    table = np.array(CBRT_TABLE, dtype=np.uint64)
+    # bit length, exact on uint64 unlike log2 of a float.
+    bits = np.zeros(a.shape, dtype=np.int64)
+    rest = a.copy()
+    for step in (32, 16, 8, 4, 2, 1):
+        high = rest >= np.uint64(1 << step)
+        bits += np.where(high, step, 0)
+        rest = np.where(high, rest >> np.uint64(step), rest)
+    bits += (rest > 0)
+    small = bits < 7
+    b = np.maximum(((bits * 84) >> 8) - 1, 0).astype(np.uint64)
+    shift = np.where(small, 0, a >> (b * np.uint64(3))).astype(np.int64)
+    x = (((table[shift] + np.uint64(10)) << b) & np.uint64(U32)) >> np.uint64(6)
+    x = np.maximum(x, np.uint64(2))
+    x = np.uint64(2) * x + a // (x * (x - np.uint64(1)))
+    x = ((x * np.uint64(341)) >> np.uint64(10)) & np.uint64(U32)
+    return np.where(small, (table[np.where(small, a, 0).astype(np.int64)] + np.uint64(35)) >> np.uint64(6), x)
+
+
+def cubic_constants(C:float, BETA:float):
+    """
+        the integer constants of tcp_cubic for the float parameters of the
+        implementations: cwnd is multiplied by 1 - BETA on a loss, the
+        cubic function is C * (t - K)^3 with t in seconds.
+
+    Returns:
+        {'beta': (1 - BETA) in 1/BETA_SCALE (717 for Linux' 0.7),
+         'bic_scale': C in 10/BETA_SCALE (41 for Linux' 0.4),
+         'beta_scale': the TCP friendly ACK count factor,
+         'cube_rtt_scale', 'cube_factor': scales of the cubic function}
+    """
+    beta = round((1 - BETA) * BETA_SCALE)
+    bic_scale = round(C * BETA_SCALE / 10)
+    if not 0 < beta < BETA_SCALE or bic_scale <= 0:
+        raise ValueError(f'BETA must be in (0, 1) and C positive, got BETA={BETA}, C={C}')
+    cube_rtt_scale = bic_scale * 10
+    return {
+        'beta': beta,
+        'bic_scale': bic_scale,
+        'beta_scale': 8 * (BETA_SCALE + beta) // 3 // (BETA_SCALE - beta),
+        'cube_rtt_scale': cube_rtt_scale,
+        # 1/C in the time scale of the cubic function.
+        'cube_factor': (1 << (10 + 3 * BICTCP_HZ)) // cube_rtt_scale,
+    }
+
+
+def jiffies(seconds:float, hz:int=HZ):
+    """
+        jiffies at `seconds` of simulated time; they start at 1, as in the
+        kernel, where 0 marks "no epoch".
+    """
+    return int(seconds * hz) + 1
+
+
+def usecs_to_jiffies(usecs:int, hz:int=HZ):
+    return math.ceil(usecs * hz / 1000000)
+
+
+def bic_cnt(cwnd:int, last_max_cwnd:int, max_increment:int, low_window:int, delayed_ack:int):
+    """
+        bictcp_update() past its once-per-HZ/32 check: the ACKs per cwnd
+        increment, binary search below last_max_cwnd and max probing above.
+    """
+    # start off normal.
+    if cwnd <= low_window:
+        return cwnd
+    if cwnd < last_max_cwnd:
+        # binary increase.
+        dist = (last_max_cwnd - cwnd) // BICTCP_B
+        if dist > max_increment:
+            # linear increase.
+            cnt = cwnd // max_increment
+        elif dist <= 1:
+            # binary search increase.
+            cnt = (cwnd * SMOOTH_PART) // BICTCP_B
+        else:
+            cnt = cwnd // dist
+    else:
+        # slow start and linear increase.
+        if cwnd < last_max_cwnd + BICTCP_B:
+            cnt = (cwnd * SMOOTH_PART) // BICTCP_B
+        elif cwnd < last_max_cwnd + max_increment * (BICTCP_B - 1):
+            cnt = (cwnd * (BICTCP_B - 1)) // (cwnd - last_max_cwnd)
+        else:
+            cnt = cwnd // max_increment
+    # if in slow start or link utilization is very low.
+    if last_max_cwnd == 0 and cnt > 20:
+        cnt = 20
+    cnt = (cnt << ACK_RATIO_SHIFT) // delayed_ack
+    return cnt or 1
+
+
+def cong_avoid_ai(cwnd:int, cwnd_cnt:int, w:int, acked:int=1):
+    """
+        tcp_cong_avoid_ai(): `acked` ACKs in congestion avoidance, cwnd
+        grows by one segment every w ACKs. returns (cwnd, cwnd_cnt).
+    """
+    # if credits accumulated at a higher w, apply them gently now.
+    if cwnd_cnt >= w:
+        cwnd_cnt = 0
+        cwnd += 1
+    cwnd_cnt += acked
+    if cwnd_cnt >= w:
+        delta = cwnd_cnt // w
+        cwnd_cnt -= delta * w
+        cwnd += delta
+    return cwnd, cwnd_cnt
@@ -0,0 +1,446 @@
+"""
+Mean-field fluid model of large flow populations sharing one link.
+
+Per-flow and vectorized (batch.py) runs cost O(flows) per round. The fluid
+model follows the density of the population instead, so a million flows
+cost the same as ten. Flows only meet through the link: the aggregate window
+sets the queue and the drop probability p of every packet, and a flow
+sending cwnd packets in a round sees a loss with probability
+1 - (1 - p)^cwnd.
+
+Between two losses a flow grows along the law of its implementation, and
+that law only depends on the window c at the last loss and on the time since
+then (the age). The density is therefore kept over (label, age), where the
+label is c and whether the loss came below the previous maximum (the fast
+recovery / fast convergence branch). Its cwnd is the table G[label, age]:
+
+    bic-article    run_rtt(): the binary search / additive increase in
+                   closed form, BETA reductions in _fast_recovery.
+    cubic-article  run_rtt(): slow start back to ssthresh, then the cubic
+                   target origin_point + C*(t - k)^3 of _cubic_update.
+    cubic-ta       run(): the cubic function wmax + C*(t - k)^3.
+
+The tables are built by running the per-flow class itself from every label.
+A round of the solver is one step of the transport equation
+
+    dn/da = -h(G) n,    n(label', 0) = sum of the lost mass h(G) n landing on label'.
+
+Survivors age by one round and the lost mass goes to age 0 of the label of
+the window it was lost at. Labels are bins, and the lost mass is split
+between the two nearest ones, so the total mass and the mean label are kept.
+The last age bin keeps its mass with a frozen cwnd. Losses outside the label
+range go to the first or last bin and are reported as `clipped`; simulate()
+warns when they are more than CLIPPED of the lost mass. The labels start at
+LOW_WINDOW (or 1), so the per-flow share of bdp + buffer must not be below
+them: the model is for populations whose flows keep windows of a few packets
+or more.
+
+bic-ta is not supported: it draws its losses inside the binary search, so it
+has no loss-free growth law.
+
+simulate_flows() runs the same model with per-flow objects and sampled
+losses. It is the reference the fluid solution is checked against. The fluid
+solution is the limit of many flows: BIC and Article Cubic agree with a few
+hundred flows to within a few percent. TA Cubic populations synchronize,
+because a loss only cuts cwnd in the next round, so they approach the limit
+slowly as the number of flows grows:
+
+    python -m TCP_Congestion_Control_Algorithms.fluid cubic-article --flows 1000000 \\
+        --bandwidth 1e8 --rtt 0.1 --buffer 2e6 --rounds 2000 --reference 500
+"""
+import argparse, math, warnings
+
+import numpy as np
+
+from .core.registry import load
+
+
+QUEUES = ('droptail', 'red')
+# cwnd tables stop growing at CEILING times the largest label.
+CEILING = 4
+# fraction of the lost mass outside the labels above which simulate() warns.
+CLIPPED = 1e-3
+
+# registered algorithm: (field holding the window of the previous loss, round
+# method, whether the round method takes the RTT sample).
+LAWS = {
+    'bic-article': ('wmax', 'run_rtt', False),
+    'cubic-article': ('wlast_max', 'run_rtt', True),
+    'cubic-ta': (None, 'run', False),
+}
+
+
+class Link:
+
+    def __init__(self, bandwidth:float, rtt:float, buffer:float, queue:str='droptail',
+                 loss:float=0.0, red_min:float=0.25, red_max:float=0.75, red_p:float=0.1):
+        """
+        Args:
+            bandwidth(float): packets per second.
+            rtt(float): round-trip propagation delay in seconds, one round.
+            buffer(float): bottleneck buffer in packets.
+            queue(str): 'droptail' or 'red'.
+            loss(float): random loss probability of every packet.
+            red_min(float), red_max(float): RED thresholds, fractions of the buffer.
+            red_p(float): RED drop probability at red_max; it grows to 1 at
+                             a full buffer (gentle RED).
+
+        Other Instance Variables:
+            bdp(float): packets in flight that fill the link, bandwidth * rtt.
+        """
+        if queue not in QUEUES:
+            raise ValueError(f'unknown queue {queue!r}, expected one of {QUEUES}')
+        if bandwidth <= 0 or rtt <= 0 or buffer < 0:
+            raise ValueError(f'expected positive bandwidth and rtt, got bandwidth={bandwidth}, rtt={rtt}, buffer={buffer}')
+        self.bandwidth = bandwidth
+        self.rtt = rtt
+        self.buffer = buffer
+        self.queue = queue
+        self.loss = loss
+        self.red_min = red_min * buffer
+        self.red_max = red_max * buffer
+        self.red_p = red_p
+        self.bdp = bandwidth * rtt
+
+    def round(self, window:float):
+        """
+            returns (drop probability, queue, throughput in packets/s) of a
+            round in which the flows send `window` packets.
+        """
+        queue = min(max(window - self.bdp, 0.0), self.buffer)
+        overflow = max(window - self.bdp - self.buffer, 0.0) / window if window > 0 else 0.0
+        p = overflow
+        if self.queue == 'red' and queue > self.red_min:
+            if queue < self.red_max:
+                red = self.red_p * (queue - self.red_min) / (self.red_max - self.red_min)
+            else:
+                red = self.red_p + (1 - self.red_p) * (queue - self.red_max) / max(self.buffer - self.red_max, 1e-12)
+            p = max(p, min(red, 1.0))
+        p = 1 - (1 - self.loss) * (1 - p)
+        return p, queue, min(window, self.bdp) / self.rtt
+
+
+def _hazard(cwnd, p:float):
+    """
+        probability that a flow sending cwnd packets sees a loss.
+    """
+    if p <= 0:
+        return np.zeros_like(cwnd)
+    if p >= 1:
+        return np.ones_like(cwnd)
+    return -np.expm1(cwnd * math.log1p(-p))
+
+
+def _reference_class(algorithm:str, rtt:float):
+    """
+        the algorithm's class, with `rtt` simulated seconds per round.
+    """
+    if algorithm not in LAWS:
+        raise ValueError(f'no fluid model for {algorithm!r}, expected one of {sorted(LAWS)}')
+    cls, defaults = load(algorithm)
+    timed = type(cls.__name__, (cls,), {'__slots__': (), '__module__': cls.__module__, 'ROUND_TIME': rtt})
+    return timed, defaults
+
+
+def _new_flow(cls, params:dict, seed:int=0):
+    """
+        a flow without random events: the link decides its losses.
+        its clock is one round ahead, so a loss never starts an epoch at 0.
+    """
+    flow = cls(**params, seed=seed)
+    scheduler = getattr(flow, 'scheduler', None)
+    if scheduler is not None:
+        scheduler.queue.clear()
+        flow._fire_events()
+    counter = flow.ROUND_COUNTER
+    setattr(flow, counter, getattr(flow, counter) + 1)
+    return flow
+
+
+def _lose(flow):
+    flow._packet_loss()
+    counter = flow.ROUND_COUNTER
+    setattr(flow, counter, getattr(flow, counter) + 1)
+
+
+def _round(flow, method:str, rtt:float=None):
+    if rtt is None:
+        getattr(flow, method)()
+    else:
+        getattr(flow, method)(rtt=rtt)
+    counter = flow.ROUND_COUNTER
+    setattr(flow, counter, getattr(flow, counter) + 1)
+
+
+class FluidModel:
+
+    def __init__(self, algorithm:str, flows:float, link:Link, params:dict=None,
+                 windows=None, labels:int=64, max_age:int=1000, bins:int=64):
+        """
+        Args:
+            algorithm(str): registered algorithm, see LAWS.
+            flows(float): number of flows.
+            link(Link): the shared link.
+            params(dict): parameters over the algorithm's defaults; the
+                             initial cwnd is the window of a first loss.
+            windows(tuple): (lo, hi) windows at a loss covered by the labels;
+                               by default from LOW_WINDOW (or 1) to four
+                               times the per-flow share of bdp + buffer.
+            labels(int): label bins per branch.
+            max_age(int): rounds since the last loss followed one by one.
+            bins(int): bins of the cwnd histograms, from 0 to 1.5 * hi.
+
+        Other Instance Variables:
+            cwnd(np.ndarray): (branches, labels, max_age) table of the cwnd
+                                 of every cell.
+            density(np.ndarray): fraction of the flows in every cell.
+            round_number(int): rounds solved so far.
+            lost(float): lost mass, summed over the rounds.
+            clipped(float): lost mass that fell outside the labels.
+        """
+        cls, defaults = _reference_class(algorithm, link.rtt)
+        defaults.update(params or {})
+        previous, method, sampled = LAWS[algorithm]
+        rtt = link.rtt if sampled else None
+        self.algorithm = algorithm
+        self.flows = flows
+        self.link = link
+        self.params = defaults
+        share = (link.bdp + link.buffer) / flows
+        if windows is None:
+            lo = max(float(defaults.get('LOW_WINDOW', 1)), 1.0)
+            windows = (lo, max(4 * share, 2 * defaults['cwnd'], lo + labels))
+        lo, hi = windows
+        if not 0 < lo < hi:
+            raise ValueError(f'expected 0 < lo < hi windows, got {windows}')
+        if share < lo:
+            # every loss would land on the lowest label.
+            raise ValueError(
+                f'the per-flow share of bdp + buffer ({share:.3g} packets) is below the lowest '
+                f'label ({lo:g}); use fewer flows or a larger link'
+            )
+        self.windows = np.linspace(lo, hi, labels)
+        branches = 1 if previous is None else 2
+
+        # cwnd of every (branch, label, age), from the per-flow class.
+        self.cwnd = np.empty((branches, labels, max_age))
+        maximum = np.empty((branches, labels))
+        for b in range(branches):
+            for j, window in enumerate(self.windows):
+                flow = _new_flow(cls, defaults)
+                flow.cwnd = window
+                if previous is not None:
+                    # a previous maximum above (below) the window picks the branch.
+                    setattr(flow, previous, math.inf if b else 0.0)
+                _lose(flow)
+                maximum[b, j] = getattr(flow, previous) if previous else 0.0
+                row = self.cwnd[b, j]
+                for a in range(max_age):
+                    row[a] = flow.cwnd
+                    if flow.cwnd > CEILING * hi:
+                        # far above any window a loss leaves, the hazard is
+                        # ~1 and the growth does not matter any more.
+                        row[a:] = flow.cwnd
+                        break
+                    _round(flow, method, rtt)
+
+        # where the mass lost in every cell lands: the branch of the loss and
+        # the two labels around its window.
+        cwnd = self.cwnd
+        below = cwnd < maximum[:, :, None] if previous else np.zeros(cwnd.shape, dtype=bool)
+        position = (cwnd - lo) / (self.windows[1] - lo)
+        self._outside = (position < 0) | (position > labels - 1)
+        position = np.clip(position, 0, labels - 1)
+        left = np.minimum(position.astype(np.int64), labels - 2)
+        self._right_weight = (position - left).ravel()
+        self._left = (below * labels + left).ravel()
+        self._right = self._left + 1
+
+        self.edges = np.linspace(0, 1.5 * hi, bins + 1)
+        self._bin = np.clip(np.searchsorted(self.edges, cwnd.ravel(), side='right') - 1, 0, bins - 1)
+
+        self.density = np.zeros(cwnd.shape)
+        self.density[:, :, 0] = self._landing(np.array([float(defaults['cwnd'])]), 0).reshape(branches, labels)
+        self.round_number = 1
+        self.lost = 0.0
+        self.clipped = 0.0
+
+    def _landing(self, windows, branch:int):
+        """
+            mass of a loss at each of `windows` spread over the labels.
+        """
+        labels = len(self.windows)
+        position = np.clip((windows - self.windows[0]) / (self.windows[1] - self.windows[0]), 0, labels - 1)
+        left = np.minimum(position.astype(np.int64), labels - 2)
+        weight = position - left
+        landing = np.zeros(self.cwnd.shape[0] * labels)
+        np.add.at(landing, branch * labels + left, 1 - weight)
+        np.add.at(landing, branch * labels + left + 1, weight)
+        return landing / len(windows)
+
+    def run(self):
+        """
+            one round; returns the round's aggregates.
+        """
+        n, cwnd = self.density, self.cwnd
+        window = self.flows * float((n * cwnd).sum())
+        p, queue, throughput = self.link.round(window)
+
+        lost = n * _hazard(cwnd, p)
+        survivors = n - lost
+        flat = lost.ravel()
+        size = self.cwnd.shape[0] * self.cwnd.shape[1]
+        landing = (
+            np.bincount(self._left, flat * (1 - self._right_weight), minlength=size)
+            + np.bincount(self._right, flat * self._right_weight, minlength=size)
+        )
+        self.lost += float(flat.sum())
+        self.clipped += float(flat[self._outside.ravel()].sum())
+
+        density = np.empty_like(n)
+        density[:, :, 1:] = survivors[:, :, :-1]
+        density[:, :, -1] += survivors[:, :, -1]
+        density[:, :, 0] = landing.reshape(n.shape[:2])
+
+        histogram = np.bincount(self._bin, n.ravel(), minlength=len(self.edges) - 1)
+        mean = window / self.flows
+        stats = {
+            'round': self.round_number,
+            'time': self.round_number * self.link.rtt,
+            'window': window,
+            'throughput': throughput,
+            'utilization': throughput / self.link.bandwidth,
+            'queue': queue,
+            'drop_probability': p,
+            'losses': self.flows * float(flat.sum()),
+            'mean_cwnd': mean,
+            'std_cwnd': math.sqrt(max(float((n * cwnd * cwnd).sum()) - mean * mean, 0.0)),
+            'histogram': histogram,
+        }
+        self.density = density
+        self.round_number += 1
+        return stats
+
+    def simulate(self, rounds:int):
+        """
+            solves `rounds` rounds and returns {name: array} of the round
+            aggregates (see run), with 'histogram' a (rounds, bins) array of
+            the cwnd distribution over `edges`. warns when more than CLIPPED
+            of the lost mass fell outside the labels.
+        """
+        rows = [self.run() for _ in range(rounds)]
+        if self.clipped > CLIPPED * self.lost:
+            warnings.warn(
+                f'{self.clipped / self.lost:.3g} of the lost mass fell outside the labels '
+                f'{self.windows[0]:g}..{self.windows[-1]:g}, pass wider windows',
+                RuntimeWarning, stacklevel=2,
+            )
+        result = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+        result['edges'] = self.edges
+        return result
+
+
+def simulate_flows(algorithm:str, flows:int, link:Link, rounds:int, params:dict=None,
+                   seed:int=None, edges=None):
+    """
+        runs `flows` per-flow objects on the link of the fluid model, with
+        the losses of each round sampled from the drop probability. takes the
+        same arguments and returns the same aggregates as FluidModel.
+    """
+    cls, defaults = _reference_class(algorithm, link.rtt)
+    defaults.update(params or {})
+    previous, method, sampled = LAWS[algorithm]
+    rtt = link.rtt if sampled else None
+    rng = np.random.default_rng(seed)
+    population = []
+    for i in range(flows):
+        flow = _new_flow(cls, defaults, seed=i)
+        if previous is not None:
+            setattr(flow, previous, 0.0)
+        _lose(flow)
+        population.append(flow)
+
+    rows = []
+    for r in range(1, rounds + 1):
+        cwnd = np.array([flow.cwnd for flow in population])
+        window = float(cwnd.sum())
+        p, queue, throughput = link.round(window)
+        lost = rng.random(flows) < _hazard(cwnd, p)
+        for flow, loss in zip(population, lost):
+            if loss:
+                _lose(flow)
+            else:
+                _round(flow, method, rtt)
+        row = {
+            'round': r, 'time': r * link.rtt, 'window': window, 'throughput': throughput,
+            'utilization': throughput / link.bandwidth, 'queue': queue, 'drop_probability': p,
+            'losses': float(lost.sum()), 'mean_cwnd': float(cwnd.mean()), 'std_cwnd': float(cwnd.std()),
+        }
+        if edges is not None:
+            histogram, _ = np.histogram(np.clip(cwnd, edges[0], edges[-1]), edges)
+            row['histogram'] = histogram / flows
+        rows.append(row)
+    result = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+    if edges is not None:
+        result['edges'] = edges
+    return result
+
+
+def main(argv=None):
+    from .sweep import parse_spec
+    parser = argparse.ArgumentParser(description='Mean-field fluid model of a flow population on one link.')
+    parser.add_argument('algorithm', choices=sorted(LAWS))
+    parser.add_argument('--flows', type=float, default=1e6)
+    parser.add_argument('--bandwidth', type=float, required=True, help='packets per second')
+    parser.add_argument('--rtt', type=float, default=0.1, help='seconds')
+    parser.add_argument('--buffer', type=float, required=True, help='packets')
+    parser.add_argument('--queue', choices=QUEUES, default='droptail')
+    parser.add_argument('--loss', type=float, default=0.0, help='random loss probability per packet')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='parameter over the defaults, repeatable')
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--windows', type=float, nargs=2, default=None, metavar=('LO', 'HI'))
+    parser.add_argument('--labels', type=int, default=64)
+    parser.add_argument('--max-age', type=int, default=1000)
+    parser.add_argument('--output', default=None, help='CSV file of the round aggregates')
+    parser.add_argument('--histogram', default=None, help='.npz file of the cwnd distributions')
+    parser.add_argument('--reference', type=int, default=None, metavar='FLOWS',
+                        help='also run this many per-flow objects on a link scaled down to them')
+    args = parser.parse_args(argv)
+
+    params = {}
+    for spec in args.param:
+        name, values = parse_spec(spec)
+        if not isinstance(values, list) or len(values) != 1:
+            raise ValueError(f'expected one value for {name}, got {spec!r}')
+        params[name] = values[0]
+    link = Link(args.bandwidth, args.rtt, args.buffer, args.queue, args.loss)
+    model = FluidModel(
+        args.algorithm, args.flows, link, params,
+        tuple(args.windows) if args.windows else None, args.labels, args.max_age,
+    )
+    result = model.simulate(args.rounds)
+
+    half = slice(args.rounds // 2, None)
+    columns = [name for name in result if name not in ('histogram', 'edges')]
+    print(f'{args.algorithm}: {args.flows:g} flows, rounds {args.rounds // 2 + 1}..{args.rounds}, clipped {model.clipped:.3g}')
+    reference = None
+    if args.reference:
+        scale = args.reference / args.flows
+        scaled = Link(args.bandwidth * scale, args.rtt, args.buffer * scale, args.queue, args.loss)
+        reference = simulate_flows(args.algorithm, args.reference, scaled, args.rounds, params, seed=0)
+    for name in ('mean_cwnd', 'std_cwnd', 'utilization', 'drop_probability'):
+        line = f'    {name:18s} {result[name][half].mean():12.6g}'
+        if reference is not None:
+            line += f'   per-flow {reference[name][half].mean():12.6g}'
+        print(line)
+
+    if args.output:
+        import pandas as pd
+        pd.DataFrame({name: result[name] for name in columns}).to_csv(args.output, index=False)
+    if args.histogram:
+        np.savez_compressed(args.histogram, round=result['round'], edges=result['edges'], histogram=result['histogram'])
+
+
+if __name__ == '__main__':
+    main()
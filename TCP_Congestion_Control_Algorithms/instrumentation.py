@@ -0,0 +1,247 @@
+"""
+Opt-in per-phase instrumentation of the four implementations.
+
+Instrumentation.attach(flow) switches the flow to a subclass of its class
+whose phase methods are wrapped: every entry to a phase is counted and its
+wall time goes into a log-scale histogram, and loss and timeout events are
+counted. detach(flow) switches the flow back. The classes themselves are
+never changed, so flows that are not attached run exactly the code they ran
+before: disabled instrumentation costs nothing.
+
+Phases (PHASES) are timed inclusively, run includes the phases it calls.
+
+    instrumentation = Instrumentation()
+    instrumentation.attach(flow)
+    for _ in range(10000):
+        flow.step()
+    instrumentation.stats()['phases']['bic-ta', '_slow_start']['count']
+    instrumentation.write_prometheus('metrics.prom')
+
+Histogram buckets are powers of two of nanoseconds, from 2**MIN_EXPONENT ns
+(64 ns) to 2**MAX_EXPONENT ns (about 67 ms), plus +Inf.
+"""
+import functools, time
+
+from .BIC_TCP.Article_implementation.bic import BICTCPCongestionControl as ArticleBIC
+from .BIC_TCP.TA_Implementation.bic import BICTCPCongestionControl as TABIC
+from .Cubic_TCP.Article_Implementation.cubic import CubicTCPCongestionControl as ArticleCubic
+from .Cubic_TCP.TA_Implementation.cubic import CubicTCPCongestionControl as TACubic
+from .core.registry import name_of
+
+
+MIN_EXPONENT = 6
+MAX_EXPONENT = 26
+
+# class: (algorithm label, timed phases, {event: method}); subclasses use the
+# phases of their base and are labelled by their registry name if they have one.
+PHASES = {
+    ArticleBIC: (
+        'bic-article',
+        ('run', 'run_rtt', '_ack', '_low_window_increase', '_fast_recovery'),
+        {'loss': '_packet_loss'},
+    ),
+    TABIC: (
+        'bic-ta',
+        ('run', '_low_window_decrease', '_binary_search_increase', '_additive_increase', '_slow_start'),
+        # TA BIC decides its losses in the binary search.
+        {'loss': '_is_packet_loss'},
+    ),
+    ArticleCubic: (
+        'cubic-article',
+        ('run', 'run_rtt', '_ack', '_acks', '_cubic_update', '_cubic_tcp_friendliness', '_cubic_reset'),
+        {'loss': '_packet_loss', 'timeout': '_timeout'},
+    ),
+    TACubic: (
+        'cubic-ta',
+        ('run', '_update', '_cubic_function', '_cubic_increase'),
+        {'loss': '_packet_loss'},
+    ),
+}
+
+
+class Histogram:
+
+    def __init__(self):
+        """
+        Instance Variables:
+            buckets(list[int]): entries per bucket; bucket i holds the times
+                                   below 2**(MIN_EXPONENT + i) ns, the last one
+                                   the times above 2**MAX_EXPONENT ns.
+            count(int): number of entries.
+            total_ns(int): sum of the times, in nanoseconds.
+        """
+        self.buckets = [0] * (MAX_EXPONENT - MIN_EXPONENT + 2)
+        self.count = 0
+        self.total_ns = 0
+
+    def add(self, ns:int):
+        i = ns.bit_length() - MIN_EXPONENT
+        self.buckets[0 if i < 0 else min(i, len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+
+    def bounds(self):
+        """
+            upper bound of every bucket in seconds, inf for the last one.
+        """
+        return [2 ** exponent / 1e9 for exponent in range(MIN_EXPONENT, MAX_EXPONENT + 1)] + [float('inf')]
+
+    def quantile(self, q:float):
+        """
+            upper bound (seconds) of the bucket holding the q quantile,
+            NaN without entries.
+        """
+        if not self.count:
+            return float('nan')
+        rank, seen = q * self.count, 0
+        for bound, entries in zip(self.bounds(), self.buckets):
+            seen += entries
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'seconds': self.total_ns / 1e9,
+            'mean_seconds': self.total_ns / 1e9 / self.count if self.count else float('nan'),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': list(self.buckets),
+        }
+
+
+def _timed(method, histogram:Histogram):
+    clock = time.perf_counter_ns
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = clock()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            histogram.add(clock() - started)
+    return wrapper
+
+
+def _counted(method, counts:dict, event:str):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        # a loss decision (_is_packet_loss) only counts when it is a loss.
+        if result is None or result:
+            counts[event] += 1
+        return result
+    return wrapper
+
+
+class Instrumentation:
+
+    def __init__(self):
+        """
+        Instance Variables:
+            histograms(dict): {(algorithm, phase): Histogram}.
+            events(dict): {(algorithm, event): count}.
+        """
+        self.histograms = {}
+        self.events = {}
+        self._classes = {}
+
+    def _lookup(self, cls):
+        for base, spec in PHASES.items():
+            if issubclass(cls, base):
+                return base, spec
+        raise ValueError(f'no instrumentation phases for {cls.__name__}')
+
+    def _instrumented_class(self, cls, algorithm:str=None):
+        """
+            the subclass of `cls` with the wrapped methods, one per class;
+            its stats are labelled `algorithm`, the PHASES label by default.
+        """
+        if cls not in self._classes:
+            _, (label, phases, events) = self._lookup(cls)
+            algorithm = algorithm or label
+            namespace = {'__slots__': (), '__module__': cls.__module__, '__qualname__': cls.__qualname__}
+            counts = self.events
+            for event, name in events.items():
+                counts.setdefault((algorithm, event), 0)
+                namespace[name] = _counted(getattr(cls, name), counts, (algorithm, event))
+            for phase in phases:
+                if hasattr(cls, phase):
+                    histogram = self.histograms.setdefault((algorithm, phase), Histogram())
+                    namespace[phase] = _timed(namespace.get(phase, getattr(cls, phase)), histogram)
+            self._classes[cls] = type(cls.__name__, (cls,), namespace)
+        return self._classes[cls]
+
+    def attach(self, flow):
+        """
+            instruments `flow` and returns it.
+        """
+        if not self.is_attached(flow):
+            flow.__class__ = self._instrumented_class(type(flow), name_of(flow))
+        return flow
+
+    def detach(self, flow):
+        """
+            restores the flow's own class; its counts stay in the stats.
+        """
+        if self.is_attached(flow):
+            flow.__class__ = type(flow).__base__
+        return flow
+
+    def is_attached(self, flow):
+        return type(flow) in self._classes.values()
+
+    def reset(self):
+        """
+            zeroes every counter and histogram.
+        """
+        for histogram in self.histograms.values():
+            histogram.__init__()
+        for key in self.events:
+            self.events[key] = 0
+
+    def stats(self):
+        """
+            returns {'phases': {(algorithm, phase): Histogram.snapshot()},
+            'events': {(algorithm, event): count}}.
+        """
+        return {
+            'phases': {key: histogram.snapshot() for key, histogram in self.histograms.items()},
+            'events': dict(self.events),
+        }
+
+    def to_prometheus(self, prefix:str='cc'):
+        """
+            the stats in the Prometheus text exposition format.
+        """
+        lines = [
+            f'# HELP {prefix}_phase_calls_total Entries to each phase.',
+            f'# TYPE {prefix}_phase_calls_total counter',
+        ]
+        for (algorithm, phase), histogram in sorted(self.histograms.items()):
+            lines.append(f'{prefix}_phase_calls_total{{algorithm="{algorithm}",phase="{phase}"}} {histogram.count}')
+        lines += [
+            f'# HELP {prefix}_phase_seconds Wall time of each phase entry.',
+            f'# TYPE {prefix}_phase_seconds histogram',
+        ]
+        for (algorithm, phase), histogram in sorted(self.histograms.items()):
+            labels = f'algorithm="{algorithm}",phase="{phase}"'
+            cumulative = 0
+            for bound, entries in zip(histogram.bounds(), histogram.buckets):
+                cumulative += entries
+                le = '+Inf' if bound == float('inf') else f'{bound:.6g}'
+                lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_phase_seconds_sum{{{labels}}} {histogram.total_ns / 1e9:.9g}')
+            lines.append(f'{prefix}_phase_seconds_count{{{labels}}} {histogram.count}')
+        lines += [
+            f'# HELP {prefix}_events_total Loss and timeout events.',
+            f'# TYPE {prefix}_events_total counter',
+        ]
+        for (algorithm, event), count in sorted(self.events.items()):
+            lines.append(f'{prefix}_events_total{{algorithm="{algorithm}",event="{event}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path:str, prefix:str='cc'):
+        with open(path, 'w') as file:
+            file.write(self.to_prometheus(prefix))
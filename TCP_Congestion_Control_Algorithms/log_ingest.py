@@ -0,0 +1,225 @@
+"""
+Indexed parsing of the text logs ("{round} -- cwnd(10) < wmax(30)").
+
+Every line is tokenized in one pass into typed columns:
+
+    round   int64, the number before " -- " ("t12" in some TA Cubic lines).
+    kind    int32 code into `kinds`, the message with its values replaced by
+            {} (the templates of tracing.py, e.g. "cwnd({}) < wmax({})").
+    v0..v2  float64 values of the message in order, NaN when absent.
+            True/False are 1/0, None is NaN.
+
+Blank lines (the separators between rounds) are skipped. A LogFile also keeps
+a round -> byte offset index, so load(start, stop) only memory-maps and
+tokenizes the lines of those rounds. The index and the full parse are cached
+next to the log (LOG.ingest.npz) and rebuilt when the log's mtime or size
+changes.
+
+    log = LogFile('reports/log1.log')
+    frame = log.to_dataframe(100, 200)      # rounds 100..199
+    losses = frame[frame.kind == 'PACKET LOSS']
+"""
+import mmap, os, re
+
+import numpy as np
+
+FIELDS = 3
+CACHE_SUFFIX = '.ingest.npz'
+
+# values inside a message: numbers (ints, floats, exponents, inf/nan) and the
+# True/False/None of f-string formatted flags.
+_VALUE = re.compile(
+    r'(?<![\w.])(-?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|inf|nan)|True|False|None)(?![\w.])'
+)
+_CONSTANTS = {'True': 1.0, 'False': 0.0, 'None': float('nan')}
+
+
+def _round_of(head:bytes):
+    return int(head.strip().lstrip(b't'))
+
+
+def tokenize(data:bytes, kinds:list, codes:dict):
+    """
+        tokenizes the log lines in `data` and returns (rounds, kind codes,
+        values) arrays. new kinds are appended to `kinds` and `codes`
+        ({kind: code}).
+    """
+    rounds, kind_codes = [], []
+    values = [[] for _ in range(FIELDS)]
+    nan = float('nan')
+    split, constants = _VALUE.split, _CONSTANTS
+    for line in data.decode().splitlines():
+        head, separator, message = line.partition(' -- ')
+        if not separator:
+            continue
+        parts = split(message)
+        # split keeps the captured values at the odd positions.
+        kind = '{}'.join(parts[0::2])
+        code = codes.get(kind)
+        if code is None:
+            code = codes[kind] = len(kinds)
+            kinds.append(kind)
+        rounds.append(int(head.strip().lstrip('t')))
+        kind_codes.append(code)
+        tokens = parts[1::2]
+        if len(tokens) > FIELDS:
+            raise ValueError(f'more than {FIELDS} values in {line!r}')
+        for n in range(FIELDS):
+            if n < len(tokens):
+                token = tokens[n]
+                values[n].append(constants[token] if token in constants else float(token))
+            else:
+                values[n].append(nan)
+    return (
+        np.array(rounds, dtype=np.int64),
+        np.array(kind_codes, dtype=np.int32),
+        np.array(values, dtype=np.float64).reshape(FIELDS, len(rounds)),
+    )
+
+
+class LogFile:
+
+    def __init__(self, path:str, cache:bool=True):
+        """
+        Args:
+            path(str): the log file.
+            cache(bool): read and write LOG.ingest.npz next to the log.
+
+        Other Instance Variables:
+            kinds(list[str]): message templates, indexed by the kind codes.
+        """
+        self.path = path
+        self.cache = cache
+        self.cache_path = path + CACHE_SUFFIX
+        self.kinds = []
+        self._codes = {}
+        self._index = None
+        self._parsed = None
+        self._stamp = None
+        if cache:
+            self._read_cache()
+
+    def _source_stamp(self):
+        stat = os.stat(self.path)
+        return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    def _read_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with np.load(self.cache_path) as cache:
+            if not np.array_equal(cache['stamp'], self._source_stamp()):
+                return
+            self._stamp = cache['stamp']
+            self._index = (cache['index_rounds'], cache['index_offsets'], bool(cache['monotonic']))
+            self.kinds = [str(kind) for kind in cache['kinds']]
+            self._codes = {kind: code for code, kind in enumerate(self.kinds)}
+            if 'rounds' in cache:
+                self._parsed = (cache['rounds'], cache['codes'], cache['values'])
+
+    def _write_cache(self):
+        if not self.cache:
+            return
+        index_rounds, index_offsets, monotonic = self._index
+        arrays = dict(
+            stamp=self._stamp, index_rounds=index_rounds, index_offsets=index_offsets,
+            monotonic=np.array(monotonic), kinds=np.array(self.kinds, dtype=str),
+        )
+        if self._parsed is not None:
+            rounds, codes, values = self._parsed
+            arrays.update(rounds=rounds, codes=codes, values=values)
+        with open(self.cache_path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    def _check_source(self):
+        """
+            drops the cached state when the log changed since it was read.
+        """
+        stamp = self._source_stamp()
+        if self._stamp is None or not np.array_equal(stamp, self._stamp):
+            self._stamp = stamp
+            self._index = self._parsed = None
+            self.kinds, self._codes = [], {}
+
+    @property
+    def index(self):
+        """
+            (rounds, offsets, monotonic): the byte offset of the first line
+            of every round, in file order.
+        """
+        self._check_source()
+        if self._index is None:
+            rounds, offsets = [], []
+            previous, monotonic, offset = None, True, 0
+            with open(self.path, 'rb') as file:
+                for line in file:
+                    head, separator, _ = line.partition(b' -- ')
+                    if separator:
+                        round_number = _round_of(head)
+                        if round_number != previous:
+                            if previous is not None and round_number < previous:
+                                monotonic = False
+                            rounds.append(round_number)
+                            offsets.append(offset)
+                            previous = round_number
+                    offset += len(line)
+            self._index = (np.array(rounds, dtype=np.int64), np.array(offsets, dtype=np.int64), monotonic)
+            self._write_cache()
+        return self._index
+
+    def _parse_all(self):
+        self.index
+        if self._parsed is None:
+            with open(self.path, 'rb') as file:
+                self._parsed = tokenize(file.read(), self.kinds, self._codes)
+            self._write_cache()
+        return self._parsed
+
+    def load(self, start:int=None, stop:int=None):
+        """
+            returns (rounds, kind codes, values) of rounds start <= round < stop,
+            the whole log by default. with a valid parse in the cache the
+            range is sliced from it, otherwise only its bytes are mapped and
+            tokenized.
+        """
+        if start is None and stop is None:
+            return self._parse_all()
+        index_rounds, index_offsets, monotonic = self.index
+        lo = -np.inf if start is None else start
+        hi = np.inf if stop is None else stop
+        if self._parsed is not None or not monotonic:
+            rounds, codes, values = self._parse_all()
+            mask = (rounds >= lo) & (rounds < hi)
+            return rounds[mask], codes[mask], values[:, mask]
+
+        first = np.searchsorted(index_rounds, lo, side='left')
+        last = np.searchsorted(index_rounds, hi, side='left')
+        size = os.path.getsize(self.path)
+        begin = int(index_offsets[first]) if first < len(index_offsets) else size
+        end = int(index_offsets[last]) if last < len(index_offsets) else size
+        if begin >= end:
+            return tokenize(b'', self.kinds, self._codes)
+        with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk = data[begin:end]
+        return tokenize(chunk, self.kinds, self._codes)
+
+    def to_dataframe(self, start:int=None, stop:int=None):
+        """
+            load() as a pandas DataFrame with round, kind (categorical) and
+            v0..v2 columns.
+        """
+        import pandas as pd
+        rounds, codes, values = self.load(start, stop)
+        frame = pd.DataFrame({
+            'round': rounds,
+            'kind': pd.Categorical.from_codes(codes, categories=self.kinds),
+        })
+        for n in range(FIELDS):
+            frame[f'v{n}'] = values[n]
+        return frame
+
+
+def load_log(path:str, start:int=None, stop:int=None, cache:bool=True):
+    """
+        shortcut for LogFile(path, cache).to_dataframe(start, stop).
+    """
+    return LogFile(path, cache).to_dataframe(start, stop)
@@ -0,0 +1,273 @@
+"""
+Monte Carlo replicas with streaming per-round aggregates.
+
+Runs many seeded replicas of one algorithm in a ProcessPoolExecutor and folds
+every replica's trajectories (cwnd and wmax / wlast_max by default) into
+per-round aggregates as soon as it arrives. At most 2 * workers batches are
+in flight, so memory is O(rounds * batch * workers) whatever the number of
+replicas, and no trajectory is kept once folded:
+
+    mean, variance   Welford's online algorithm.
+    quantiles        the P^2 estimator (Jain & Chlamtac, 1985), five markers
+                     per round and quantile, p5 / p50 / p95 by default.
+
+Replicas are folded in seed order, so the summary does not depend on the
+number of workers. The summary has one row per round with, for every field,
+the mean, the standard deviation, the confidence interval of the mean and
+the quantiles:
+
+    python -m TCP_Congestion_Control_Algorithms.montecarlo cubic-article \\
+        --replicas 1000 --rounds 10000 --output summary.csv
+"""
+import argparse, itertools, os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from .sweep import ALGORITHMS, load_algorithm, parse_spec
+
+
+QUANTILES = (0.05, 0.5, 0.95)
+# bytes of trajectories per batch the default batch size stays under.
+BATCH_BYTES = 16 * 2**20
+
+
+class P2Quantile:
+
+    def __init__(self, size:int, p:float):
+        """
+            P^2 estimate of the p quantile of `size` streams at once, one
+            value of every stream per add().
+
+        Instance Variables:
+            count(int): values added to every stream.
+            heights(np.ndarray): (size, 5) marker heights.
+            positions(np.ndarray): (size, 5) marker positions, 1-based.
+        """
+        self.p = p
+        self.count = 0
+        self.heights = np.empty((size, 5))
+        self.positions = np.tile(np.arange(1.0, 6.0), (size, 1))
+        # desired positions and their increments, the same for every stream.
+        self.desired = np.array([1, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5])
+        self.increments = np.array([0, p/2, p, (1+p)/2, 1])
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        q, n = self.heights, self.positions
+        if self.count < 5:
+            q[:, self.count] = values
+            self.count += 1
+            if self.count == 5:
+                q.sort(axis=1)
+            return
+        self.count += 1
+
+        q[:, 0] = np.minimum(q[:, 0], values)
+        q[:, 4] = np.maximum(q[:, 4], values)
+        # cell k of every value: q[k] <= x < q[k+1], clamped to 0..3.
+        k = (values[:, None] >= q[:, 1:4]).sum(axis=1)
+        n += np.arange(5) > k[:, None]
+        self.desired += self.increments
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[:, i]
+            up = (d >= 1) & (n[:, i+1] - n[:, i] > 1)
+            down = (d <= -1) & (n[:, i-1] - n[:, i] < -1)
+            move = up | down
+            if not move.any():
+                continue
+            d = np.where(up, 1.0, -1.0)[move]
+            qm, qi, qp = q[move, i-1], q[move, i], q[move, i+1]
+            nm, ni, np_ = n[move, i-1], n[move, i], n[move, i+1]
+            parabolic = qi + d / (np_ - nm) * (
+                (ni - nm + d) * (qp - qi) / (np_ - ni) + (np_ - ni - d) * (qi - qm) / (ni - nm)
+            )
+            neighbour_q = np.where(d > 0, qp, qm)
+            neighbour_n = np.where(d > 0, np_, nm)
+            linear = qi + d * (neighbour_q - qi) / (neighbour_n - ni)
+            q[move, i] = np.where((qm < parabolic) & (parabolic < qp), parabolic, linear)
+            n[move, i] = ni + d
+
+    def estimate(self):
+        """
+            the current estimate of every stream, exact below five values.
+        """
+        if self.count == 0:
+            return np.full(len(self.heights), np.nan)
+        if self.count < 5:
+            return np.quantile(self.heights[:, :self.count], self.p, axis=1)
+        return self.heights[:, 2].copy()
+
+
+class RoundAggregate:
+
+    def __init__(self, rounds:int, quantiles=QUANTILES):
+        """
+            per-round aggregates of one field over replicas.
+
+        Instance Variables:
+            count(int): replicas folded so far.
+            mean(np.ndarray): mean of every round.
+            m2(np.ndarray): sum of squared deviations of every round.
+        """
+        self.count = 0
+        self.mean = np.zeros(rounds)
+        self.m2 = np.zeros(rounds)
+        self.quantiles = {p: P2Quantile(rounds, p) for p in quantiles}
+
+    def add(self, trajectory):
+        """
+            folds one replica's values, one per round.
+        """
+        x = np.asarray(trajectory, dtype=np.float64)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+
+    @property
+    def variance(self):
+        """
+            sample variance of every round, NaN below two replicas.
+        """
+        if self.count < 2:
+            return np.full(len(self.mean), np.nan)
+        return self.m2 / (self.count - 1)
+
+    def summary(self, name:str, confidence:float=0.95):
+        """
+            returns {column: array}: NAME_mean, NAME_std, NAME_ci_low,
+            NAME_ci_high (confidence interval of the mean) and NAME_pXX.
+        """
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        std = np.sqrt(self.variance)
+        half = z * std / np.sqrt(max(self.count, 1))
+        columns = {
+            f'{name}_mean': self.mean.copy(),
+            f'{name}_std': std,
+            f'{name}_ci_low': self.mean - half,
+            f'{name}_ci_high': self.mean + half,
+        }
+        for p, estimator in self.quantiles.items():
+            columns[f'{name}_p{p * 100:g}'] = estimator.estimate()
+        return columns
+
+
+def default_fields(algorithm:str):
+    """
+        cwnd and the window of the last loss, wlast_max or wmax as the
+        class names it.
+    """
+    cls, _ = load_algorithm(algorithm)
+    return ('cwnd', 'wlast_max' if 'wlast_max' in cls.COLUMNS else 'wmax')
+
+
+def run_replicas(algorithm:str, params:dict, seeds, rounds:int, fields):
+    """
+        runs one headless flow per seed and returns their trajectories as a
+        (len(seeds), len(fields), rounds) array; nothing is recorded.
+    """
+    cls, defaults = load_algorithm(algorithm)
+    defaults.update(params)
+    counter = cls.ROUND_COUNTER
+    result = np.empty((len(seeds), len(fields), rounds))
+    for r, seed in enumerate(seeds):
+        flow = cls(**defaults, seed=seed)
+        run = flow.run
+        for i in range(rounds):
+            run()
+            for f, field in enumerate(fields):
+                result[r, f, i] = getattr(flow, field)
+            setattr(flow, counter, getattr(flow, counter) + 1)
+    return result
+
+
+def _run(job):
+    return run_replicas(*job)
+
+
+def monte_carlo(algorithm:str, params:dict=None, replicas:int=100, rounds:int=1000,
+                fields=None, seed:int=0, quantiles=QUANTILES, confidence:float=0.95,
+                workers:int=None, batch:int=None):
+    """
+        runs `replicas` replicas (seeds seed, seed + 1, ...) and returns the
+        per-round summary as a pandas DataFrame, see module docs.
+
+    Args:
+        params(dict): parameters over the algorithm's defaults.
+        fields(tuple): state fields to aggregate, cwnd and wmax / wlast_max
+                          by default.
+        workers(int): worker processes, defaults to os.cpu_count().
+        batch(int): replicas per job, bounds the trajectories in flight;
+                       by default at most 64 and BATCH_BYTES of trajectories.
+    """
+    import pandas as pd
+    fields = tuple(fields or default_fields(algorithm))
+    workers = workers or os.cpu_count() or 1
+    if batch is None:
+        fit = BATCH_BYTES // (8 * len(fields) * max(rounds, 1))
+        batch = max(1, min(64, fit, replicas // (workers * 4)))
+    seeds = list(range(seed, seed + replicas))
+    jobs = (
+        (algorithm, dict(params or {}), seeds[i:i + batch], rounds, fields)
+        for i in range(0, replicas, batch)
+    )
+    aggregates = {field: RoundAggregate(rounds, quantiles) for field in fields}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # a sliding window of 2 * workers jobs: a job is submitted only when
+        # the oldest one is folded, so finished batches cannot pile up when
+        # folding is slower than the workers.
+        pending = deque(executor.submit(_run, job) for job in itertools.islice(jobs, 2 * workers))
+        while pending:
+            trajectories = pending.popleft().result()
+            for job in itertools.islice(jobs, 1):
+                pending.append(executor.submit(_run, job))
+            # batches are folded in job (seed) order and dropped.
+            for replica in trajectories:
+                for field, values in zip(fields, replica):
+                    aggregates[field].add(values)
+            del trajectories
+
+    table = {'round': np.arange(1, rounds + 1)}
+    for field, aggregate in aggregates.items():
+        table.update(aggregate.summary(field, confidence))
+    return pd.DataFrame(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo replicas with per-round aggregates.')
+    parser.add_argument('algorithm', choices=sorted(ALGORITHMS))
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='parameter over the defaults, repeatable')
+    parser.add_argument('--replicas', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--fields', nargs='+', default=None)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first replica')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help='CSV file, printed when omitted')
+    args = parser.parse_args(argv)
+
+    params = {}
+    for spec in args.param:
+        name, values = parse_spec(spec)
+        if not isinstance(values, list) or len(values) != 1:
+            raise ValueError(f'expected one value for {name}, got {spec!r}')
+        params[name] = values[0]
+    table = monte_carlo(
+        args.algorithm, params, args.replicas, args.rounds, args.fields,
+        args.seed, confidence=args.confidence, workers=args.workers,
+    )
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,537 @@
+"""
+Packet-level discrete-event simulation of flows sharing one bottleneck.
+
+The classes draw their own losses, so on their own they cannot compete for a
+link. Here every flow sends packets into one bottleneck queue (drop-tail or
+RED) drained at the link bandwidth; ACKs come back one round-trip propagation
+delay after a packet leaves the link and clock out new packets while the
+flow's in-flight count is below int(cwnd). Losses only come from the queue:
+
+    - a dropped packet is detected when a later packet of the same flow is
+      ACKed (the duplicate ACKs), or by a retransmission timeout when none is.
+    - a flow reacts (_packet_loss) at most once per window, as TCP does.
+    - lost packets are not retransmitted, the sender moves on to new data,
+      so throughput counts delivered packets.
+
+The four implementations are driven through adapters, picked by adapter_for:
+the Article implementations grow cwnd per ACK (_ack) and the TA ones once per
+round trip (run / _update). Rounds end when the last packet sent in the
+previous round is ACKed. Attaching a flow removes its synthetic loss events.
+
+    python -m TCP_Congestion_Control_Algorithms.netsim \\
+        --flow bic-article:2 --flow cubic-article:2 --bandwidth 10 --duration 60
+"""
+import argparse, heapq, math, random, time
+from collections import deque
+
+from .BIC_TCP.Article_implementation.bic import BICTCPCongestionControl as ArticleBIC
+from .BIC_TCP.TA_Implementation.bic import BICTCPCongestionControl as TABIC
+from .Cubic_TCP.Article_Implementation.cubic import CubicTCPCongestionControl as ArticleCubic
+from .Cubic_TCP.TA_Implementation.cubic import CubicTCPCongestionControl as TACubic
+
+
+# event kinds.
+START, DEPARTURE, ACK, TIMEOUT = 0, 1, 2, 3
+EVENT_NAMES = ('start', 'departure', 'ack', 'timeout')
+
+QUEUES = ('droptail', 'red')
+
+
+class Packet:
+
+    __slots__ = ('flow', 'seq', 'sent')
+
+    def __init__(self, flow, seq:int, sent:float):
+        self.flow = flow
+        self.seq = seq
+        self.sent = sent
+
+
+class FlowAdapter:
+
+    def __init__(self, flow, record:bool=False):
+        """
+            drives one congestion control object from the network.
+
+        Args:
+            flow: an instance of one of the four implementations.
+            record(bool): record the flow's state at the end of every round,
+                             as step() does.
+        """
+        self.flow = flow
+        self.record = record
+        scheduler = getattr(flow, 'scheduler', None)
+        if scheduler is not None:
+            # losses come from the queue now.
+            scheduler.queue.clear()
+
+    @property
+    def cwnd(self):
+        return self.flow.cwnd
+
+    def on_ack(self, now:float, rtt:float):
+        pass
+
+    def on_round(self, now:float):
+        flow = self.flow
+        flow.renderer.update(flow.round_number, flow.cwnd)
+        if self.record:
+            flow.insert_paramaters_to_dataframe()
+        flow.round_number += 1
+
+    def on_loss(self, now:float):
+        self.flow._packet_loss()
+
+    def on_timeout(self, now:float):
+        self.on_loss(now)
+
+
+class ArticleBICAdapter(FlowAdapter):
+
+    def on_ack(self, now, rtt):
+        self.flow._ack()
+
+
+class TABICAdapter(FlowAdapter):
+
+    def __init__(self, flow, record=False):
+        super().__init__(flow, record)
+        # the binary search asks the network instead of drawing the loss.
+        flow.pending_loss = False
+
+    def on_round(self, now):
+        flow = self.flow
+        flow.run()
+        if self.record:
+            flow.insert_paramaters_to_dataframe()
+        flow.round_number += 1
+
+    def on_loss(self, now):
+        self.flow.pending_loss = True
+
+
+class ArticleCubicAdapter(FlowAdapter):
+
+    def on_ack(self, now, rtt):
+        flow = self.flow
+        # the cubic function runs on the network clock with measured RTTs.
+        flow.scheduler.now = now
+        flow.dMin = min(flow.dMin, rtt) if flow.dMin != 0 else rtt
+        flow._ack()
+
+    def on_loss(self, now):
+        self.flow.scheduler.now = now
+        self.flow._packet_loss()
+
+    def on_timeout(self, now):
+        self.on_loss(now)
+        self.flow._timeout()
+
+
+class TACubicAdapter(FlowAdapter):
+
+    def on_round(self, now):
+        flow = self.flow
+        flow._update()
+        flow.renderer.update(flow.t, flow.cwnd)
+        if self.record:
+            flow.insert_paramaters_to_dataframe()
+        flow.t += 1
+
+
+ADAPTERS = {
+    ArticleBIC: ArticleBICAdapter,
+    TABIC: TABICAdapter,
+    ArticleCubic: ArticleCubicAdapter,
+    TACubic: TACubicAdapter,
+}
+
+
+def adapter_for(flow, record:bool=False):
+    for cls, adapter in ADAPTERS.items():
+        if isinstance(flow, cls):
+            return adapter(flow, record)
+    raise ValueError(f'no network adapter for {type(flow).__name__}')
+
+
+class _FlowState:
+
+    __slots__ = (
+        'adapter', 'name', 'start', 'rtt', 'next_seq', 'inflight', 'dropped',
+        'recovery', 'round_end', 'timer_seq', 'delivered', 'drops',
+        'loss_events', 'timeouts', 'rounds', 'rtt_sum', 'rtt_min',
+    )
+
+    def __init__(self, adapter, name, start, rtt):
+        self.adapter = adapter
+        self.name = name
+        self.start = start
+        self.rtt = rtt
+        self.next_seq = 0
+        self.inflight = 0
+        # sequence numbers of dropped packets the sender has not noticed yet.
+        self.dropped = deque()
+        self.recovery = 0
+        self.round_end = 0
+        # head of `dropped` the pending timeout waits for, None without one.
+        self.timer_seq = None
+        self.delivered = 0
+        self.drops = 0
+        self.loss_events = 0
+        self.timeouts = 0
+        self.rounds = 0
+        self.rtt_sum = 0.0
+        self.rtt_min = math.inf
+
+
+class Simulator:
+
+    def __init__(self, bandwidth:float=10.0, delay:float=0.02, buffer:int=100,
+                packet_size:int=1500, queue:str='droptail', red:dict=None,
+                rto:float=0.2, seed:int=None,
+        ):
+        """
+        Args:
+            bandwidth(float): bottleneck bandwidth in Mbit/s.
+            delay(float): one-way propagation delay in seconds, the base RTT
+                             is twice that plus the flow's extra delay.
+            buffer(int): bottleneck buffer in packets.
+            packet_size(int): bytes per packet.
+            queue(str): 'droptail' or 'red'.
+            red(dict): RED parameters: min_th and max_th (packets, a quarter
+                          and three quarters of the buffer by default), max_p
+                          (0.1) and weight (0.002) of the average queue.
+            rto(float): minimum retransmission timeout in seconds, the
+                           timeout is max(rto, 4 * base RTT).
+            seed(int): seed of the RED drop decisions.
+
+        Other Instance Variables:
+            now(float): simulated time in seconds.
+            events(list): heap of (time, sequence, kind, object) tuples.
+            flows(list): per-flow network state, in the order of add_flow.
+        """
+        if queue not in QUEUES:
+            raise ValueError(f'unknown queue {queue!r}, expected one of {QUEUES}')
+        self.bandwidth = bandwidth
+        self.delay = delay
+        self.buffer = buffer
+        self.packet_size = packet_size
+        self.queue_kind = queue
+        self.rto = rto
+        self.random = random.Random(seed)
+        self.service_time = packet_size * 8 / (bandwidth * 1e6)
+
+        red = dict(red or {})
+        self.min_th = red.pop('min_th', buffer / 4)
+        self.max_th = red.pop('max_th', buffer * 3 / 4)
+        self.max_p = red.pop('max_p', 0.1)
+        self.red_weight = red.pop('weight', 0.002)
+        if red:
+            raise ValueError(f'unknown RED parameters {sorted(red)}')
+
+        self.now = 0.0
+        self.events = []
+        self._sequence = 0
+        self.flows = []
+
+        # bottleneck.
+        self.queue = deque()
+        self.in_service = None
+        self.red_average = 0.0
+        self.red_count = -1
+        self._idle_since = 0.0
+
+        # statistics.
+        self.event_counts = [0] * len(EVENT_NAMES)
+        self.queue_area = 0.0
+        self.queue_max = 0
+        self.busy_time = 0.0
+        self.wall_time = 0.0
+        self._queue_changed = 0.0
+        self._pool = []
+
+    def add_flow(self, flow, start:float=0.0, extra_delay:float=0.0,
+                name:str=None, record:bool=False):
+        """
+            attaches a congestion control object (or a FlowAdapter) and
+            returns its index in self.flows.
+
+        Args:
+            start(float): simulated time the flow starts sending.
+            extra_delay(float): propagation delay added to this flow's RTT.
+            record(bool): record the flow's state every round.
+        """
+        adapter = flow if isinstance(flow, FlowAdapter) else adapter_for(flow, record)
+        name = name or f'{len(self.flows)}:{type(adapter).__name__[:-len("Adapter")]}'
+        state = _FlowState(adapter, name, start, 2 * self.delay + extra_delay)
+        self.flows.append(state)
+        self._schedule(max(start, self.now), START, state)
+        return len(self.flows) - 1
+
+    def _schedule(self, at, kind, obj):
+        self._sequence += 1
+        heapq.heappush(self.events, (at, self._sequence, kind, obj))
+
+    # bottleneck queue.
+
+    def _queue_changed_at(self, now):
+        self.queue_area += len(self.queue) * (now - self._queue_changed)
+        self._queue_changed = now
+
+    def _red_drop(self, now):
+        """
+            RED decision for an arriving packet, with the idle-time
+            correction of the average queue.
+        """
+        weight = self.red_weight
+        if self.in_service is None and not self.queue:
+            idle = (now - self._idle_since) / self.service_time
+            self.red_average *= (1 - weight) ** idle
+        else:
+            self.red_average += weight * (len(self.queue) - self.red_average)
+
+        average = self.red_average
+        if average < self.min_th:
+            self.red_count = -1
+            return False
+        if average >= self.max_th:
+            self.red_count = 0
+            return True
+        self.red_count += 1
+        pb = self.max_p * (average - self.min_th) / (self.max_th - self.min_th)
+        pa = pb / max(1e-12, 1 - self.red_count * pb)
+        if self.red_count * pb >= 1 or self.random.random() < pa:
+            self.red_count = 0
+            return True
+        return False
+
+    def _enqueue(self, packet, now):
+        """
+            returns False when the packet is dropped.
+        """
+        if self.queue_kind == 'red' and self._red_drop(now):
+            return False
+        if self.in_service is None:
+            self.in_service = packet
+            self._schedule(now + self.service_time, DEPARTURE, packet)
+            return True
+        if len(self.queue) >= self.buffer:
+            return False
+        self._queue_changed_at(now)
+        self.queue.append(packet)
+        if len(self.queue) > self.queue_max:
+            self.queue_max = len(self.queue)
+        return True
+
+    def _departure(self, packet, now):
+        self.busy_time += self.service_time
+        self._schedule(now + packet.flow.rtt, ACK, packet)
+        if self.queue:
+            self._queue_changed_at(now)
+            self.in_service = self.queue.popleft()
+            self._schedule(now + self.service_time, DEPARTURE, self.in_service)
+        else:
+            self.in_service = None
+            self._idle_since = now
+
+    # senders.
+
+    def _send(self, state, now):
+        window = max(1, int(state.adapter.cwnd))
+        pool = self._pool
+        while state.inflight < window:
+            if pool:
+                packet = pool.pop()
+                packet.flow, packet.seq, packet.sent = state, state.next_seq, now
+            else:
+                packet = Packet(state, state.next_seq, now)
+            state.next_seq += 1
+            state.inflight += 1
+            if not self._enqueue(packet, now):
+                state.drops += 1
+                state.dropped.append(packet.seq)
+                if state.timer_seq is None:
+                    state.timer_seq = packet.seq
+                    self._schedule(now + max(self.rto, 4 * state.rtt), TIMEOUT, state)
+                pool.append(packet)
+
+    def _end_round(self, state, now):
+        state.rounds += 1
+        state.round_end = state.next_seq
+        state.adapter.on_round(now)
+
+    def _ack(self, packet, now):
+        state = packet.flow
+        seq = packet.seq
+        rtt = now - packet.sent
+        self._pool.append(packet)
+        state.delivered += 1
+        state.inflight -= 1
+        state.rtt_sum += rtt
+        if rtt < state.rtt_min:
+            state.rtt_min = rtt
+
+        # packets sent before this one and dropped are noticed now.
+        dropped = state.dropped
+        if dropped and dropped[0] < seq:
+            first = dropped[0]
+            while dropped and dropped[0] < seq:
+                dropped.popleft()
+                state.inflight -= 1
+            if first >= state.recovery:
+                state.loss_events += 1
+                state.recovery = state.next_seq
+                state.adapter.on_loss(now)
+
+        state.adapter.on_ack(now, rtt)
+        if seq >= state.round_end:
+            self._end_round(state, now)
+        self._send(state, now)
+
+    def _timeout(self, state, now):
+        dropped = state.dropped
+        if not dropped:
+            state.timer_seq = None
+            return
+        if dropped[0] != state.timer_seq:
+            # the awaited drop was noticed in time, wait for the next one.
+            state.timer_seq = dropped[0]
+            self._schedule(now + max(self.rto, 4 * state.rtt), TIMEOUT, state)
+            return
+        state.timer_seq = None
+        state.inflight -= len(dropped)
+        dropped.clear()
+        state.timeouts += 1
+        state.loss_events += 1
+        state.recovery = state.next_seq
+        state.adapter.on_timeout(now)
+        self._end_round(state, now)
+        self._send(state, now)
+
+    def run(self, duration:float):
+        """
+            simulates `duration` more seconds and returns report().
+        """
+        until = self.now + duration
+        events, counts = self.events, self.event_counts
+        started = time.perf_counter()
+        while events and events[0][0] <= until:
+            now, _, kind, obj = heapq.heappop(events)
+            self.now = now
+            counts[kind] += 1
+            if kind == ACK:
+                self._ack(obj, now)
+            elif kind == DEPARTURE:
+                self._departure(obj, now)
+            elif kind == TIMEOUT:
+                self._timeout(obj, now)
+            else:
+                self._send(obj, now)
+        self._queue_changed_at(until)
+        self.now = until
+        self.wall_time += time.perf_counter() - started
+        return self.report()
+
+    def report(self):
+        """
+            returns {'flows': [per-flow dict], 'fairness', 'queue', 'events'}.
+            throughput is in Mbit/s over the time each flow was active.
+        """
+        flows = []
+        for state in self.flows:
+            active = max(self.now - state.start, 1e-12)
+            flows.append({
+                'name': state.name,
+                'throughput': state.delivered * self.packet_size * 8 / active / 1e6,
+                'delivered': state.delivered,
+                'drops': state.drops,
+                'loss_events': state.loss_events,
+                'timeouts': state.timeouts,
+                'rounds': state.rounds,
+                'cwnd': state.adapter.cwnd,
+                'mean_rtt': state.rtt_sum / state.delivered if state.delivered else math.nan,
+                'min_rtt': state.rtt_min,
+            })
+        total = sum(self.event_counts)
+        return {
+            'flows': flows,
+            'fairness': jain_fairness([flow['throughput'] for flow in flows]),
+            'queue': {
+                'kind': self.queue_kind,
+                'mean': self.queue_area / self.now if self.now else 0.0,
+                'max': self.queue_max,
+                'utilization': self.busy_time / self.now if self.now else 0.0,
+            },
+            'events': {
+                'total': total,
+                **dict(zip(EVENT_NAMES, self.event_counts)),
+                'per_simulated_second': total / self.now if self.now else 0.0,
+                'per_wall_second': total / self.wall_time if self.wall_time else 0.0,
+                'wall_time': self.wall_time,
+            },
+        }
+
+
+def jain_fairness(values):
+    """
+        (sum x)^2 / (n * sum x^2), 1 when all flows get the same share.
+    """
+    values = list(values)
+    square_sum = sum(value * value for value in values)
+    if not values or square_sum == 0:
+        return math.nan
+    return sum(values) ** 2 / (len(values) * square_sum)
+
+
+def format_report(report:dict):
+    lines = [f"{'flow':<24}{'Mbit/s':>10}{'delivered':>12}{'drops':>8}{'losses':>8}{'timeouts':>10}{'cwnd':>10}{'mean rtt':>10}"]
+    for flow in report['flows']:
+        lines.append(
+            f"{flow['name']:<24}{flow['throughput']:>10.3f}{flow['delivered']:>12}{flow['drops']:>8}"
+            f"{flow['loss_events']:>8}{flow['timeouts']:>10}{flow['cwnd']:>10.2f}{flow['mean_rtt']:>10.4f}"
+        )
+    queue, events = report['queue'], report['events']
+    lines.append(f"jain fairness: {report['fairness']:.4f}")
+    lines.append(
+        f"queue ({queue['kind']}): mean {queue['mean']:.2f}, max {queue['max']}, "
+        f"utilization {queue['utilization']:.3f}"
+    )
+    lines.append(
+        f"events: {events['total']} ({events['per_simulated_second']:.0f}/simulated s, "
+        f"{events['per_wall_second']:.0f}/wall s, {events['wall_time']:.2f} s)"
+    )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    from .core.registry import names
+    from .sweep import load_algorithm
+
+    parser = argparse.ArgumentParser(description='Flows sharing one bottleneck link.')
+    parser.add_argument('--flow', action='append', required=True, metavar='ALGORITHM[:COUNT]',
+                        help=f"{', '.join(names())}, repeatable")
+    parser.add_argument('--bandwidth', type=float, default=10.0, help='Mbit/s')
+    parser.add_argument('--delay', type=float, default=0.02, help='one-way propagation delay, s')
+    parser.add_argument('--buffer', type=int, default=100, help='packets')
+    parser.add_argument('--packet-size', type=int, default=1500, help='bytes')
+    parser.add_argument('--queue', choices=QUEUES, default='droptail')
+    parser.add_argument('--duration', type=float, default=60.0, help='simulated seconds')
+    parser.add_argument('--stagger', type=float, default=0.0, help='start flows this many seconds apart')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulator = Simulator(
+        args.bandwidth, args.delay, args.buffer, args.packet_size, args.queue, seed=args.seed,
+    )
+    for spec in args.flow:
+        algorithm, _, count = spec.partition(':')
+        cls, params = load_algorithm(algorithm)
+        for _ in range(int(count or 1)):
+            index = len(simulator.flows)
+            flow = cls(**params, seed=args.seed + index)
+            simulator.add_flow(flow, start=index * args.stagger, name=f'{index}:{algorithm}')
+    print(format_report(simulator.run(args.duration)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Offline figures of stored runs, downsampled to the output resolution.
+
+Plotting every round of a multi-million-round run is slow and the lines melt
+into each other. A run is first reduced to about one bucket per pixel
+column of its panel, so matplotlib only draws what the PNG can show:
+
+    lttb     Largest-Triangle-Three-Buckets: one representative point per
+             bucket, keeps the shape of the line.
+    minmax   min/max envelope per bucket, drawn as a band, never hides a
+             peak or a drop.
+
+Loss events (inferred from the state as replay.py does, or the loss column of
+a replay trace) are drawn as a rug at the bottom of each panel, at most one
+tick per bucket. Runs are drawn side by side, one panel each, or overlaid in
+one panel.
+
+Runs are streaming.py directories (memory-mapped) or CSV files such as the
+reports *_parameters*.csv:
+
+    python -m TCP_Congestion_Control_Algorithms.plotting run1 run2 \\
+        reports/cubic_tcp_parameters1.csv -o figure.png --method minmax
+"""
+import argparse, os
+
+import numpy as np
+
+from .replay import loss_mask
+from .streaming import MANIFEST, read_columns
+
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(x, y, threshold:int):
+    """
+        returns the indices of the `threshold` points Largest-Triangle-
+        Three-Buckets keeps, first and last point included.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # threshold - 2 buckets between the first and the last point.
+    every = (size - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        # the average point of the next bucket closes the triangle.
+        next_stop = min(int((i + 2) * every) + 1, size)
+        cx = x[stop:next_stop].mean()
+        cy = y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax(x, y, buckets:int):
+    """
+        returns (bucket centres, minimum, maximum) of `buckets` equal
+        buckets of the points.
+    """
+    size = len(x)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if buckets >= size:
+        return x, y, y
+    starts = np.linspace(0, size, buckets + 1).astype(np.int64)[:-1]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    ends = np.append(starts[1:], size) - 1
+    return (x[starts] + x[ends]) / 2, lows, highs
+
+
+def read_run(path:str, field:str='cwnd'):
+    """
+        returns (rounds, values of `field`, loss mask) of a stored run.
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, MANIFEST)):
+            raise ValueError(f'{path} has no {MANIFEST}')
+        columns = read_columns(path)
+    else:
+        import pandas as pd
+        frame = pd.read_csv(path)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+    if field not in columns:
+        raise ValueError(f'{path} has no {field} column, got {list(columns)}')
+    values = columns[field]
+    counter = next((name for name in ('round', 't') if name in columns), None)
+    rounds = columns[counter] if counter else np.arange(1, len(values) + 1)
+    if 'loss' in columns:
+        losses = np.asarray(columns['loss']) > 0
+    elif 'cwnd' in columns and ('t_lastloss' in columns or 'wmax' in columns or 'wlast_max' in columns):
+        losses, _ = loss_mask(columns)
+    else:
+        losses = np.zeros(len(values), dtype=bool)
+    return rounds, values, losses
+
+
+def _draw(ax, rounds, values, losses, buckets:int, method:str, label:str, color):
+    if method == 'lttb':
+        kept = lttb(rounds, values, buckets)
+        ax.plot(np.asarray(rounds)[kept], np.asarray(values)[kept], color=color, linewidth=0.8, label=label)
+    else:
+        centres, lows, highs = minmax(rounds, values, buckets)
+        ax.fill_between(centres, lows, highs, color=color, alpha=0.5, linewidth=0, label=label)
+        ax.plot(centres, (lows + highs) / 2, color=color, linewidth=0.5)
+
+    loss_rounds = np.asarray(rounds)[np.flatnonzero(losses)]
+    if len(loss_rounds):
+        # one tick per bucket with at least one loss.
+        lo, hi = float(rounds[0]), float(rounds[-1])
+        width = (hi - lo) / buckets or 1.0
+        ticks = lo + (np.unique(((loss_rounds - lo) // width)) + 0.5) * width
+        ax.vlines(ticks, 0, 0.04, transform=ax.get_xaxis_transform(), color=color, linewidth=0.6)
+
+
+def plot_runs(paths, output:str, field:str='cwnd', method:str='lttb', labels=None,
+              overlay:bool=False, width:int=1600, height:int=500, dpi:int=100, losses:bool=True):
+    """
+        draws the runs into `output` (any format matplotlib writes), side by
+        side or overlaid, see module docs. each panel gets about as many
+        buckets as it has pixel columns.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if method not in METHODS:
+        raise ValueError(f'unknown method {method!r}, expected one of {METHODS}')
+    labels = list(labels or [os.path.basename(os.path.normpath(path)) for path in paths])
+    if len(labels) != len(paths):
+        raise ValueError(f'expected {len(paths)} labels, got {len(labels)}')
+
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(figure)
+    panels = 1 if overlay else len(paths)
+    axes = figure.subplots(1, panels, squeeze=False, sharey=True)[0]
+    buckets = max(3, int(width * 0.8 / panels))
+    colors = [f'C{i}' for i in range(len(paths))]
+    for i, (path, label) in enumerate(zip(paths, labels)):
+        rounds, values, loss = read_run(path, field)
+        ax = axes[0 if overlay else i]
+        if not losses:
+            loss = np.zeros(0, dtype=bool)
+        _draw(ax, rounds, values, loss, buckets, method, label, colors[i])
+        ax.set_xlabel('Round Number')
+        ax.grid(True)
+        if overlay:
+            ax.legend(loc='upper right')
+        else:
+            ax.set_title(label)
+    axes[0].set_ylabel(field)
+    figure.tight_layout()
+    figure.savefig(output)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Downsampled figures of stored runs.')
+    parser.add_argument('runs', nargs='+', help='streaming directories or CSV files')
+    parser.add_argument('-o', '--output', required=True, help='image file, e.g. figure.png')
+    parser.add_argument('--field', default='cwnd')
+    parser.add_argument('--method', choices=METHODS, default='lttb')
+    parser.add_argument('--labels', nargs='+', default=None)
+    parser.add_argument('--overlay', action='store_true', help='all runs in one panel')
+    parser.add_argument('--width', type=int, default=1600, help='pixels')
+    parser.add_argument('--height', type=int, default=500, help='pixels')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--no-losses', action='store_true', help='no loss overlay')
+    args = parser.parse_args(argv)
+
+    plot_runs(
+        args.runs, args.output, args.field, args.method, args.labels,
+        args.overlay, args.width, args.height, args.dpi, not args.no_losses,
+    )
+
+
+if __name__ == '__main__':
+    main()
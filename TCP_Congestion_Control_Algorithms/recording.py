@@ -0,0 +1,77 @@
+"""
+Columnar per-round state recorder.
+
+Every state field gets its own growable array.array('d'), so recording a round
+is amortized O(1) instead of the O(len) DataFrame.loc append. The pandas
+DataFrame is only built (and pandas only imported) when it is asked for.
+"""
+from array import array
+
+
+class StateRecorder:
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns(list[str]): names of the recorded state fields, in the
+                                   order record() receives their values.
+        """
+        self.columns = tuple(columns)
+        self._arrays = tuple(array('d') for _ in self.columns)
+        self._dataframe = None
+
+    def record(self, *values):
+        """
+            appends one round; values are given in the order of self.columns.
+        """
+        if len(values) != len(self.columns):
+            raise ValueError(f'expected {len(self.columns)} values {self.columns}, got {len(values)}')
+        for column, value in zip(self._arrays, values):
+            column.append(value)
+
+    def extend(self, *columns):
+        """
+            appends several rounds at once, one sequence of values per column.
+        """
+        if len(columns) != len(self.columns):
+            raise ValueError(f'expected {len(self.columns)} columns {self.columns}, got {len(columns)}')
+        if len({len(values) for values in columns}) > 1:
+            raise ValueError('all columns must have the same length')
+        for column, values in zip(self._arrays, columns):
+            column.extend(values)
+
+    def __len__(self):
+        return len(self._arrays[0])
+
+    def column(self, name):
+        """
+            returns the recorded values of one field as array.array('d').
+        """
+        return self._arrays[self.columns.index(name)]
+
+    def to_numpy(self):
+        """
+            returns {column: numpy array}; the arrays share memory with
+            the recorder, so copy them before recording more rounds.
+        """
+        import numpy as np
+        return {
+            name: np.frombuffer(column, dtype=np.float64)
+            for name, column in zip(self.columns, self._arrays)
+        }
+
+    def to_dataframe(self):
+        """
+            builds (and caches until the next record) a pandas DataFrame.
+        """
+        if self._dataframe is None or len(self._dataframe) != len(self):
+            import pandas as pd
+            # copies, so the DataFrame stays valid while the arrays grow.
+            columns = {name: values.copy() for name, values in self.to_numpy().items()}
+            self._dataframe = pd.DataFrame(columns, columns=list(self.columns))
+        return self._dataframe
+
+    def clear(self):
+        for column in self._arrays:
+            del column[:]
+        self._dataframe = None
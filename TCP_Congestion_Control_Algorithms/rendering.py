@@ -0,0 +1,133 @@
+"""
+cwnd renderers used by the congestion control classes.
+
+A renderer receives (round, cwnd) once per round and decides when (if ever)
+to draw. matplotlib is only imported by renderers that actually draw, so
+headless runs never pay for it.
+"""
+import time
+
+
+class Renderer:
+    """
+    Headless renderer: ignores every update and never touches matplotlib.
+    It is also the interface every other renderer implements.
+    """
+
+    def update(self, round_number, cwnd):
+        pass
+
+    def finish(self, block=False):
+        pass
+
+
+class MatplotlibRenderer(Renderer):
+
+    def __init__(self, every_rounds:int=None, every_ms:float=None, at_end:bool=False):
+        """
+        Args:
+            every_rounds(int): redraw after every `every_rounds` rounds.
+            every_ms(float): redraw when at least `every_ms` milliseconds
+                                passed since the last redraw.
+            at_end(bool): draw once, when finish() is called.
+
+        Other Instance Variables:
+            rounds, cwnd_values(list): the cwnd history being plotted.
+            cwnd_min, cwnd_max(float): running limits of the y axis, so the
+                                          axes never have to rescan the history.
+        """
+        if not (every_rounds or every_ms or at_end):
+            raise ValueError('one of every_rounds, every_ms or at_end is required')
+        if every_rounds is not None and every_rounds < 1:
+            raise ValueError(f'every_rounds must be >= 1, got {every_rounds}')
+
+        self.every_rounds = every_rounds
+        self.every_s = every_ms / 1000 if every_ms else None
+        self.at_end = at_end
+        self.rounds, self.cwnd_values = [], []
+        self.cwnd_min, self.cwnd_max = float('inf'), float('-inf')
+        self.fig = None
+        self._pending = 0
+        self._last_draw = time.perf_counter()
+
+    def _setup(self):
+        # matplotlib is imported here and only here.
+        import matplotlib.pyplot as plt
+        self.plt = plt
+
+        # setting up plot
+        if not self.at_end:
+            plt.ion()
+        self.fig, self.ax = plt.subplots()
+        self.line, = self.ax.plot([], [])
+        plt.xlabel('Round Number')
+        plt.ylabel('Congestion Window (cwnd)')
+        plt.title('Congestion Window Evolution')
+        plt.grid(True)
+        if not self.at_end:
+            plt.show()
+
+    def update(self, round_number, cwnd):
+        self.rounds.append(round_number)
+        self.cwnd_values.append(cwnd)
+        if cwnd < self.cwnd_min:
+            self.cwnd_min = cwnd
+        if cwnd > self.cwnd_max:
+            self.cwnd_max = cwnd
+
+        if self.at_end:
+            return
+        self._pending += 1
+        if self.every_rounds and self._pending >= self.every_rounds:
+            self.draw()
+        elif self.every_s and time.perf_counter() - self._last_draw >= self.every_s:
+            self.draw()
+
+    def draw(self):
+        if self.fig is None:
+            self._setup()
+        self.line.set_data(self.rounds, self.cwnd_values)
+        if self.rounds:
+            # limits come from the running min/max instead of ax.relim(),
+            # which would walk the whole history on every redraw.
+            self.ax.set_xlim(self.rounds[0], max(self.rounds[-1], self.rounds[0] + 1))
+            margin = (self.cwnd_max - self.cwnd_min) * 0.05 or 1
+            self.ax.set_ylim(self.cwnd_min - margin, self.cwnd_max + margin)
+        self.fig.canvas.draw()
+        self.fig.canvas.flush_events()
+        self._pending = 0
+        self._last_draw = time.perf_counter()
+
+    def finish(self, block=False):
+        """
+            draws whatever has not been drawn yet and optionally blocks
+            on the figure window (like plt.show(block=True) did).
+        """
+        if self._pending or self.at_end or self.fig is None:
+            self.draw()
+        if block:
+            self.plt.show(block=True)
+
+
+RENDER_MODES = ('none', 'rounds', 'time', 'end')
+
+
+def make_renderer(mode:str='none', every:float=None):
+    """
+    Args:
+        mode(str): one of RENDER_MODES.
+                      none: headless, nothing is drawn or imported.
+                      rounds: redraw every `every` rounds (default 10).
+                      time: redraw every `every` milliseconds (default 100).
+                      end: draw once at the end of the run.
+        every(float): redraw period for the 'rounds' and 'time' modes.
+    """
+    if mode == 'none':
+        return Renderer()
+    if mode == 'rounds':
+        return MatplotlibRenderer(every_rounds=int(every or 10))
+    if mode == 'time':
+        return MatplotlibRenderer(every_ms=every or 100)
+    if mode == 'end':
+        return MatplotlibRenderer(at_end=True)
+    raise ValueError(f'unknown render mode {mode!r}, expected one of {RENDER_MODES}')
@@ -0,0 +1,418 @@
+"""
+Trace-driven replay: recorded losses and RTT samples instead of synthetic ones.
+
+A trace gives, for every round, the number of losses, an RTT sample and the
+number of retransmission timeouts. Every variant (a flow of any of the four
+implementations, with its own parameters) replays the same trace, which is
+read once: each chunk of the trace is run through all the variants before the
+next chunk is read.
+
+    flows = {'bic': bic_flow, 'cubic': cubic_flow}
+    replay('reports/cubic_tcp_parameters1.csv', flows)
+
+Inputs (open_trace):
+    directory    the streaming.py layout (manifest.json and one .npy file
+                 per column) with a round column and any of loss, rtt and
+                 timeout, memory-mapped. write_trace creates one.
+    trace CSV    a round or a time column and any of loss, rtt and timeout.
+                 rows with a time (seconds) are events: they go to the round
+                 whose end they fall in, ROUND_TIME seconds per round, as
+                 the scheduler does.
+    report CSV   the *_parameters*.csv of the reports directories. losses
+                 are where t_lastloss changes (TA Cubic), or where wmax /
+                 wlast_max changes or cwnd drops; dMin is used as the RTT.
+CSV files are read in chunks of `chunk_rows` rows through a memory map.
+
+In a replayed round a flow runs as usual, except that:
+    - its synthetic loss and timeout events are removed; the losses of the
+      trace are handled at the end of the round (_packet_loss), and the
+      binary search of TA BIC sees them as pending_loss.
+    - Article Cubic takes the RTT of the trace instead of drawing one; a
+      round without a sample reuses the last one, which leaves dMin as is.
+    - timeouts call _timeout() on the implementations that have one.
+
+    python -m TCP_Congestion_Control_Algorithms.replay TRACE \\
+        --variant bic-article --variant bic-article,SMAX=8 --variant cubic-ta
+"""
+import argparse, os
+
+import numpy as np
+
+from .BIC_TCP.TA_Implementation.bic import BICTCPCongestionControl as TABIC
+from .Cubic_TCP.Article_Implementation.cubic import CubicTCPCongestionControl as ArticleCubic
+from .streaming import ColumnSink, MANIFEST, read_columns
+from .sweep import convergence_round, load_algorithm, parse_spec
+
+
+COLUMNS = ('round', 'loss', 'rtt', 'timeout')
+ROUND_TIME = 0.1
+CHUNK_ROWS = 65536
+
+
+class TraceChunk:
+
+    __slots__ = ('first', 'loss', 'rtt', 'timeout')
+
+    def __init__(self, first:int, loss, rtt, timeout):
+        """
+            the rounds first .. first + len(loss) - 1 of a trace.
+
+        Args:
+            first(int): first round of the chunk.
+            loss(np.ndarray): losses of every round (int64).
+            rtt(np.ndarray): RTT sample of every round, NaN without one.
+            timeout(np.ndarray): timeouts of every round (int64).
+        """
+        self.first = first
+        self.loss = loss
+        self.rtt = rtt
+        self.timeout = timeout
+
+    def __len__(self):
+        return len(self.loss)
+
+    @classmethod
+    def empty(cls, first:int, rounds:int):
+        return cls(first, np.zeros(rounds, dtype=np.int64), np.full(rounds, np.nan),
+                   np.zeros(rounds, dtype=np.int64))
+
+
+def _rounds_of(times, round_time:float):
+    """
+        the round whose end (round * round_time) is the first at or after
+        each time, round 1 at least.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    rounds = np.ceil(times / round_time)
+    # rounding of the division can land one round late.
+    rounds = np.where((rounds - 1) * round_time >= times, rounds - 1, rounds)
+    return np.maximum(rounds, 1).astype(np.int64)
+
+
+def _densify(events, chunk_rows:int):
+    """
+        turns chunks of (round, loss, rtt, timeout) rows, sorted by round and
+        possibly sparse or with several rows per round, into TraceChunks
+        covering every round from 1. the rows of the last round of a chunk
+        are held back until the next chunk, which may continue that round.
+    """
+    next_round, pending = 1, None
+    for rows in events:
+        if pending is not None:
+            rows = {name: np.concatenate((pending[name], rows[name])) for name in COLUMNS}
+            pending = None
+        if not len(rows['round']):
+            continue
+        last = rows['round'][-1]
+        held = rows['round'] == last
+        pending = {name: values[held] for name, values in rows.items()}
+        rows = {name: values[~held] for name, values in rows.items()}
+        if len(rows['round']):
+            next_round = yield from _emit(rows, next_round, chunk_rows)
+    if pending is not None:
+        yield from _emit(pending, next_round, chunk_rows)
+
+
+def _emit(rows, first:int, chunk_rows:int):
+    rounds = rows['round']
+    if rounds[0] < first or np.any(np.diff(rounds) < 0):
+        raise ValueError(f'trace rounds must be increasing, from round 1, got {rounds[0]} after {first - 1}')
+    end = int(rounds[-1]) + 1
+    offsets = rounds - first
+    loss = np.zeros(end - first, dtype=np.int64)
+    np.add.at(loss, offsets, rows['loss'])
+    timeout = np.zeros(end - first, dtype=np.int64)
+    np.add.at(timeout, offsets, rows['timeout'])
+    rtt = np.full(end - first, np.nan)
+    sampled = ~np.isnan(rows['rtt'])
+    # with several samples in a round the last one is kept.
+    rtt[offsets[sampled]] = rows['rtt'][sampled]
+    # sparse traces can cover many rounds per row, keep chunks bounded.
+    for start in range(0, end - first, chunk_rows):
+        stop = start + chunk_rows
+        yield TraceChunk(first + start, loss[start:stop], rtt[start:stop], timeout[start:stop])
+    return end
+
+
+def _rows(frame, round_time:float):
+    """
+        the (round, loss, rtt, timeout) rows of a chunk of a trace CSV.
+    """
+    size = len(frame)
+    if 'round' in frame:
+        rounds = frame['round'].to_numpy(dtype=np.int64)
+    elif 'time' in frame:
+        rounds = _rounds_of(frame['time'].to_numpy(), round_time)
+    else:
+        raise ValueError(f'a trace needs a round or a time column, got {list(frame.columns)}')
+    column = lambda name, fill: frame[name].to_numpy(dtype=np.float64) if name in frame else np.full(size, fill)
+    return {
+        'round': rounds,
+        'loss': np.nan_to_num(column('loss', 0.0)).astype(np.int64),
+        'rtt': column('rtt', np.nan),
+        'timeout': np.nan_to_num(column('timeout', 0.0)).astype(np.int64),
+    }
+
+
+def loss_mask(columns, previous=None):
+    """
+        marks the rounds of recorded state with a loss, see module docs.
+        `columns` is a DataFrame or {column: values}. returns (mask,
+        previous), pass previous along with the next chunk of the same run.
+    """
+    if 't_lastloss' in columns:
+        last_loss = np.asarray(columns['t_lastloss'], dtype=np.float64)
+        before = np.concatenate(([0.0 if previous is None else previous[0]], last_loss[:-1]))
+        return last_loss != before, (last_loss[-1],)
+    wmax = np.asarray(columns['wlast_max' if 'wlast_max' in columns else 'wmax'], dtype=np.float64)
+    cwnd = np.asarray(columns['cwnd'], dtype=np.float64)
+    # the first row of a run has nothing to compare with.
+    head = (wmax[0], cwnd[0]) if previous is None else previous
+    loss = (wmax != np.concatenate(([head[0]], wmax[:-1]))) \
+        | (cwnd < np.concatenate(([head[1]], cwnd[:-1])))
+    return loss, (wmax[-1], cwnd[-1])
+
+
+def infer_losses(frames):
+    """
+        yields the (round, loss, rtt, timeout) rows of the chunks of a report
+        CSV (see module docs), carrying the previous row across chunks.
+    """
+    previous = None
+    for frame in frames:
+        rounds = frame[frame.columns[0]].to_numpy(dtype=np.int64)
+        loss, previous = loss_mask(frame, previous)
+        size = len(frame)
+        yield {
+            'round': rounds,
+            'loss': loss.astype(np.int64),
+            'rtt': frame['dMin'].to_numpy(dtype=np.float64) if 'dMin' in frame else np.full(size, np.nan),
+            'timeout': np.zeros(size, dtype=np.int64),
+        }
+
+
+def _directory_rows(directory:str, chunk_rows:int):
+    columns = read_columns(directory)
+    if 'round' not in columns:
+        raise ValueError(f'{directory} has no round column')
+    size = len(columns['round'])
+    for start in range(0, size, chunk_rows):
+        stop = min(start + chunk_rows, size)
+        rows = {'round': np.asarray(columns['round'][start:stop], dtype=np.int64)}
+        for name, fill in (('loss', 0.0), ('rtt', np.nan), ('timeout', 0.0)):
+            values = columns[name][start:stop] if name in columns else np.full(stop - start, fill)
+            rows[name] = np.asarray(values, dtype=np.float64 if name == 'rtt' else np.int64)
+        yield rows
+
+
+def _csv_rows(path:str, chunk_rows:int, round_time:float):
+    import pandas as pd
+    # round_trip: the default float parser can be one ulp off the written values.
+    with pd.read_csv(path, chunksize=chunk_rows, memory_map=True, float_precision='round_trip') as reader:
+        first = next(reader, None)
+        if first is None:
+            return
+        if 'cwnd' in first:
+            yield from infer_losses(_chain(first, reader))
+        else:
+            for frame in _chain(first, reader):
+                yield _rows(frame, round_time)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def open_trace(path:str, chunk_rows:int=CHUNK_ROWS, round_time:float=ROUND_TIME):
+    """
+        yields the TraceChunks of a trace directory or CSV file, see module
+        docs. every round from 1 to the last round of the trace is covered.
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, MANIFEST)):
+            raise ValueError(f'{path} has no {MANIFEST}')
+        events = _directory_rows(path, chunk_rows)
+    else:
+        events = _csv_rows(path, chunk_rows, round_time)
+    return _densify(events, chunk_rows)
+
+
+def write_trace(directory:str, loss, rtt=None, timeout=None, rounds=None):
+    """
+        writes a trace directory (see module docs). `loss`, `rtt` and
+        `timeout` are per row; `rounds` are the rows' rounds, 1, 2, ... by
+        default.
+    """
+    loss = np.asarray(loss, dtype=np.float64)
+    size = len(loss)
+    rounds = np.arange(1, size + 1, dtype=np.float64) if rounds is None else np.asarray(rounds, dtype=np.float64)
+    rtt = np.full(size, np.nan) if rtt is None else np.asarray(rtt, dtype=np.float64)
+    timeout = np.zeros(size) if timeout is None else np.asarray(timeout, dtype=np.float64)
+    sink = ColumnSink(directory, COLUMNS)
+    try:
+        sink.write([rounds, loss, rtt, timeout])
+    finally:
+        sink.close()
+
+
+def prepare(flow):
+    """
+        removes the synthetic losses and timeouts of a flow and returns the
+        function that replays one round on it: step(loss, rtt, timeout).
+    """
+    scheduler = getattr(flow, 'scheduler', None)
+    if scheduler is not None:
+        scheduler.queue.clear()
+
+    if isinstance(flow, TABIC):
+        flow.pending_loss = False
+
+        def step(loss, rtt, timeout):
+            # a loss stays pending until the binary search asks for it.
+            flow.pending_loss = flow.pending_loss or loss > 0
+            flow.run()
+        return step
+
+    if isinstance(flow, ArticleCubic):
+        last_rtt = [None]
+
+        def step(loss, rtt, timeout):
+            if rtt == rtt:
+                last_rtt[0] = rtt
+            flow.run(last_rtt[0])
+            for _ in range(loss):
+                flow._packet_loss()
+            for _ in range(timeout):
+                flow._timeout()
+        return step
+
+    def step(loss, rtt, timeout):
+        flow.run()
+        for _ in range(loss):
+            flow._packet_loss()
+    return step
+
+
+class Replay:
+
+    def __init__(self, flows:dict, record:bool=True):
+        """
+        Args:
+            flows(dict): {name: flow} of the variants, fresh flows of any of
+                            the four implementations.
+            record(bool): record every flow's state at the end of each
+                             round, as step() does.
+
+        Other Instance Variables:
+            rounds(int): rounds replayed so far.
+        """
+        self.flows = dict(flows)
+        self.record = record
+        self.rounds = 0
+        self._steps = {name: prepare(flow) for name, flow in self.flows.items()}
+
+    def feed(self, chunk:TraceChunk):
+        """
+            replays the rounds of one chunk on every variant.
+        """
+        if chunk.first != self.rounds + 1:
+            raise ValueError(f'expected a chunk from round {self.rounds + 1}, got {chunk.first}')
+        # plain lists are much faster to index one round at a time.
+        loss, rtt, timeout = chunk.loss.tolist(), chunk.rtt.tolist(), chunk.timeout.tolist()
+        for name, flow in self.flows.items():
+            step, record = self._steps[name], self.record
+            counter = flow.ROUND_COUNTER
+            for i in range(len(loss)):
+                step(loss[i], rtt[i], timeout[i])
+                if record:
+                    flow.insert_paramaters_to_dataframe()
+                setattr(flow, counter, getattr(flow, counter) + 1)
+        self.rounds += len(loss)
+
+    def run(self, chunks, rounds:int=None):
+        """
+            replays `chunks` (an open_trace iterator) and returns the flows.
+            with `rounds`, stops after that many rounds, and pads a shorter
+            trace with rounds without losses.
+        """
+        for chunk in chunks:
+            if rounds is not None and self.rounds + len(chunk) > rounds:
+                keep = rounds - self.rounds
+                chunk = TraceChunk(chunk.first, chunk.loss[:keep], chunk.rtt[:keep], chunk.timeout[:keep])
+            if len(chunk):
+                self.feed(chunk)
+            if rounds is not None and self.rounds >= rounds:
+                break
+        while rounds is not None and self.rounds < rounds:
+            self.feed(TraceChunk.empty(self.rounds + 1, min(CHUNK_ROWS, rounds - self.rounds)))
+        return self.flows
+
+    def summary(self):
+        """
+            one row per variant: rounds, mean cwnd, losses handled and the
+            convergence round (needs record).
+        """
+        rows = []
+        for name, flow in self.flows.items():
+            row = {'variant': name, 'rounds': self.rounds, 'loss_count': flow.loss_count}
+            if self.record and self.rounds:
+                cwnd = flow.recorder.column('cwnd')
+                row['mean_cwnd'] = float(np.mean(cwnd))
+                row['convergence_round'] = convergence_round(cwnd)
+            rows.append(row)
+        return rows
+
+
+def replay(trace:str, flows:dict, rounds:int=None, record:bool=True,
+           chunk_rows:int=CHUNK_ROWS, round_time:float=ROUND_TIME):
+    """
+        replays a trace file or directory on every flow of {name: flow} in
+        one pass and returns the Replay.
+    """
+    driver = Replay(flows, record)
+    driver.run(open_trace(trace, chunk_rows, round_time), rounds)
+    return driver
+
+
+def parse_variant(spec:str, seed:int=0):
+    """
+        builds the flow of ALGORITHM[,NAME=VALUE...] with the algorithm's
+        default parameters.
+    """
+    algorithm, *params = spec.split(',')
+    cls, defaults = load_algorithm(algorithm)
+    for param in params:
+        name, values = parse_spec(param)
+        if not isinstance(values, list) or len(values) != 1:
+            raise ValueError(f'expected one value for {name} in {spec!r}')
+        defaults[name] = values[0]
+    return cls(**defaults, seed=seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a loss/RTT trace on several algorithm variants.')
+    parser.add_argument('trace', help='trace directory, trace CSV or report parameters CSV')
+    parser.add_argument('--variant', action='append', required=True, metavar='ALGORITHM[,NAME=VALUE...]',
+                        help='repeatable, e.g. bic-article,SMAX=8')
+    parser.add_argument('--rounds', type=int, default=None, help='all rounds of the trace by default')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--round-time', type=float, default=ROUND_TIME,
+                        help='seconds per round for traces with a time column')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='CSV file, printed when omitted')
+    args = parser.parse_args(argv)
+
+    flows = {spec: parse_variant(spec, args.seed) for spec in args.variant}
+    driver = replay(args.trace, flows, args.rounds, True, args.chunk_rows, args.round_time)
+
+    import pandas as pd
+    table = pd.DataFrame(driver.summary())
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
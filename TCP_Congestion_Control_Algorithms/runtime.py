@@ -0,0 +1,227 @@
+"""
+asyncio runtime running many flows concurrently on one event loop.
+
+Every flow gets one task running its rounds, ROUND_TIME simulated seconds
+apart, and one task per random event source of its implementation:
+
+    packet losses  random()*LOSS_INTERVAL simulated seconds apart
+                   (Article BIC, Article Cubic, TA Cubic).
+    timeouts       random()*TIMEOUT_INTERVAL simulated seconds apart
+                   (Article Cubic, _timeout resets the cubic state).
+
+TA BIC draws its losses inside the round, so it only has the rounds task.
+These coroutines replace the flow's scheduled events. Simulated time runs at
+`time_scale` wall seconds per simulated second, so the interleaving of rounds
+and events follows the event loop and runs are not reproducible; use step()
+for that.
+
+Each flow has an asyncio.Lock held by every round and every event handler, so
+the state changes of a flow never interleave. Coroutines that change a flow
+from outside (e.g. losses reported by a network) go through
+FlowHandle.apply(), which takes the same lock.
+
+    async with FlowRuntime(time_scale=0.01) as runtime:
+        handles = [runtime.add(flow, rounds=1000) for flow in flows]
+        await runtime.run()
+"""
+import asyncio, itertools
+
+
+# simulated seconds per round of the implementations without a clock (TA BIC).
+ROUND_TIME = 0.1
+
+
+def event_sources(flow):
+    """
+        returns [(interval, handler)] of the random events of a flow.
+    """
+    sources = []
+    if getattr(flow, 'LOSS_INTERVAL', None) is not None:
+        sources.append((flow.LOSS_INTERVAL, flow._packet_loss))
+    if getattr(flow, 'TIMEOUT_INTERVAL', None) is not None:
+        sources.append((flow.TIMEOUT_INTERVAL, flow._timeout))
+    return sources
+
+
+class FlowHandle:
+
+    def __init__(self, runtime, flow, rounds:int=None, record:bool=True, name:str=None):
+        """
+        Args:
+            runtime(FlowRuntime): the runtime running the flow.
+            flow: an instance of one of the four implementations.
+            rounds(int): rounds to run, None runs until cancelled.
+            record(bool): record the flow's state at the end of every round,
+                             as step() does.
+            name(str): name of the flow, used in the task names.
+
+        Other Instance Variables:
+            lock(asyncio.Lock): serializes the state changes of the flow.
+            rounds_done(int): rounds run so far.
+            events(int): loss and timeout events handled so far.
+        """
+        self.runtime = runtime
+        self.flow = flow
+        self.rounds = rounds
+        self.record = record
+        self.name = name or f'flow-{id(flow):x}'
+        self.lock = asyncio.Lock()
+        self.rounds_done = 0
+        self.events = 0
+        self._counter = flow.ROUND_COUNTER
+        self._tasks = []
+        scheduler = getattr(flow, 'scheduler', None)
+        if scheduler is not None:
+            # the event coroutines replace the scheduled events.
+            scheduler.queue.clear()
+
+    def _start(self):
+        self._tasks.append(asyncio.create_task(self._rounds(), name=f'{self.name}-rounds'))
+        for interval, handler in event_sources(self.flow):
+            self._tasks.append(asyncio.create_task(
+                self._events(interval, handler), name=f'{self.name}-{handler.__name__.strip("_")}',
+            ))
+
+    async def _rounds(self):
+        flow, counter, record = self.flow, self._counter, self.record
+        loop = asyncio.get_running_loop()
+        period = getattr(flow, 'ROUND_TIME', ROUND_TIME) * self.runtime.time_scale
+        started = loop.time()
+        try:
+            for n in itertools.count(1) if self.rounds is None else range(1, self.rounds + 1):
+                async with self.lock:
+                    flow.run()
+                    if record:
+                        flow.insert_paramaters_to_dataframe()
+                    setattr(flow, counter, getattr(flow, counter) + 1)
+                    self.rounds_done += 1
+                # rounds keep to their own deadlines, a late round does not
+                # push back the following ones.
+                await asyncio.sleep(max(0.0, started + n * period - loop.time()))
+        finally:
+            self._cancel_events()
+
+    async def _events(self, interval:float, handler):
+        random, time_scale = self.flow.random, self.runtime.time_scale
+        while True:
+            await asyncio.sleep(random.random() * interval * time_scale)
+            async with self.lock:
+                handler()
+                self.events += 1
+
+    def _cancel_events(self):
+        for task in self._tasks[1:]:
+            task.cancel()
+
+    async def apply(self, function, *args):
+        """
+            calls function(*args) holding the flow's lock and returns its result.
+        """
+        async with self.lock:
+            return function(*args)
+
+    @property
+    def done(self):
+        return bool(self._tasks) and all(task.done() for task in self._tasks)
+
+    def cancel(self):
+        """
+            stops the flow; the state stays as it was after the last round
+            or event handled.
+        """
+        for task in self._tasks:
+            task.cancel()
+
+    async def wait(self):
+        """
+            waits for all the flow's tasks to end.
+        """
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class FlowRuntime:
+
+    def __init__(self, time_scale:float=1.0):
+        """
+        Args:
+            time_scale(float): wall seconds per simulated second, 1 runs in
+                                  real time and 0.01 a hundred times faster.
+
+        Other Instance Variables:
+            handles(list[FlowHandle]): the flows added so far.
+        """
+        if time_scale <= 0:
+            raise ValueError(f'time_scale must be positive, got {time_scale}')
+        self.time_scale = time_scale
+        self.handles = []
+        self._running = False
+
+    def add(self, flow, rounds:int=None, record:bool=True, name:str=None):
+        """
+            adds a flow and returns its FlowHandle. flows added while the
+            runtime runs start right away.
+        """
+        handle = FlowHandle(self, flow, rounds, record, name)
+        self.handles.append(handle)
+        if self._running:
+            handle._start()
+        return handle
+
+    def start(self):
+        """
+            starts the tasks of every flow, needs a running event loop.
+        """
+        if not self._running:
+            self._running = True
+            for handle in self.handles:
+                handle._start()
+
+    async def run(self, duration:float=None):
+        """
+            starts the flows and waits until their rounds are done, or for
+            `duration` simulated seconds, then shuts the runtime down.
+        """
+        if duration is None and any(handle.rounds is None for handle in self.handles):
+            raise ValueError('flows without a round limit need a duration')
+        if not self.handles:
+            await self.shutdown()
+            return
+        self.start()
+        rounds = [handle._tasks[0] for handle in self.handles]
+        try:
+            if duration is not None:
+                done, _ = await asyncio.wait(rounds, timeout=duration * self.time_scale)
+                for task in done:
+                    task.result()
+            else:
+                await asyncio.gather(*rounds)
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        """
+            cancels every flow and waits until all their tasks ended.
+        """
+        for handle in self.handles:
+            handle.cancel()
+        await asyncio.gather(*(handle.wait() for handle in self.handles))
+        self._running = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.shutdown()
+
+
+def run_flows(flows, rounds:int=None, duration:float=None, time_scale:float=1.0, record:bool=True):
+    """
+        runs the flows concurrently on a new event loop, for `rounds` rounds
+        each or `duration` simulated seconds, and returns their handles.
+    """
+    async def main():
+        runtime = FlowRuntime(time_scale)
+        handles = [runtime.add(flow, rounds, record) for flow in flows]
+        await runtime.run(duration)
+        return handles
+    return asyncio.run(main())
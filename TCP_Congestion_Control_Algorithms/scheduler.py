@@ -0,0 +1,50 @@
+"""
+Deterministic event scheduler running on a virtual (simulated) clock.
+
+Loss and timeout events used to come from threads sleeping in wall-clock time,
+so their rate depended on how fast the host ran the rounds. The scheduler keeps
+events in a heap ordered by simulated time; the flows advance the clock between
+rounds and fire whatever became due, which makes a run depend only on its seed.
+"""
+import heapq
+
+
+class EventScheduler:
+
+    def __init__(self):
+        """
+        Instance Variables:
+            now(float): current simulated time, in seconds.
+            queue(list): heap of (time, sequence, event) tuples. sequence keeps
+                            events scheduled for the same time in FIFO order.
+        """
+        self.now = 0.0
+        self.queue = []
+        self._sequence = 0
+
+    def schedule(self, delay:float, event):
+        """
+            schedules event `delay` simulated seconds after now.
+        """
+        if delay < 0:
+            raise ValueError(f'cannot schedule an event in the past (delay={delay})')
+        self._sequence += 1
+        heapq.heappush(self.queue, (self.now + delay, self._sequence, event))
+
+    def advance(self, until:float):
+        """
+            moves the clock to `until` and yields the events that became due,
+            in time order. the clock is set to each event's time while it is
+            being handled, so handlers can schedule follow-up events.
+        """
+        queue = self.queue
+        while queue and queue[0][0] <= until:
+            self.now, _, event = heapq.heappop(queue)
+            yield event
+        self.now = max(self.now, until)
+
+    def next_event_time(self):
+        return self.queue[0][0] if self.queue else float('inf')
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,396 @@
+"""
+Zero-copy collection of the per-round state of runs in worker processes.
+
+A TraceStore is one block of memory shared by the parent and its workers,
+either a multiprocessing.shared_memory segment or (with a path) a memory-mapped
+file, laid out as:
+
+    header   HEADER bytes: the JSON {'runs', 'columns', 'rounds'}.
+    lengths  runs int64: rounds written by every run.
+    data     runs x columns x rounds float64, every (run, column) contiguous.
+
+A worker attaches to the store by its handle, gives each flow the store's
+SharedRecorder of its run and runs it: every recorded round is written in
+place, so nothing is pickled back and the parent reads NumPy views of the
+block without copying.
+
+    with collect_runs('cubic-ta', seeds=range(64), rounds=10**6) as store:
+        cwnd = store.column('cwnd')          # (runs, rounds) view
+        columns = store.run(3)               # {column: view of run 3}
+        ...
+        del cwnd, columns                    # views pin the mapping
+
+Lifecycle: the creating process owns the store. Workers attach() and close()
+it; the owner close()s it, then unlink()s it, which frees the segment or
+deletes the file. A mapping still viewed when it is closed is released with
+the last of its views. Leaving the with block does both,
+except for a file created with keep=True, which open() reads back later.
+A shared memory segment lives in RAM (/dev/shm); 64 runs x 10^6 rounds x 5
+columns take 2.4 GiB, give a path on disk for more than that.
+"""
+import argparse, json, mmap, os, sys, weakref
+from concurrent.futures import ProcessPoolExecutor
+
+from .core.registry import load, names
+from .recording import StateRecorder
+
+
+HEADER = 4096
+LENGTH_BYTES = 8
+VALUE_BYTES = 8
+
+
+def _attach_segment(name:str):
+    """
+        SharedMemory of an existing segment, left to its owner to unlink.
+    """
+    from multiprocessing import shared_memory
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # before 3.13 attaching registers the segment with the resource tracker,
+    # which workers share with the parent that owns it: registering twice is
+    # harmless there, but a process with a tracker of its own would unlink
+    # the segment when it exits.
+    return shared_memory.SharedMemory(name)
+
+
+class TraceStore:
+
+    def __init__(self, buffer, layout:dict, handle:tuple, owner:bool, segment=None, mapping=None, keep:bool=False):
+        """
+            use TraceStore.create, TraceStore.attach or TraceStore.open.
+
+        Other Instance Variables:
+            runs(int): number of runs.
+            columns(tuple): recorded state fields.
+            rounds(int): capacity of every run.
+            handle(tuple): picklable (kind, name or path) to attach with.
+            owner(bool): the store was created here and is unlinked here.
+        """
+        import numpy as np
+        self.runs = layout['runs']
+        self.columns = tuple(layout['columns'])
+        self.rounds = layout['rounds']
+        self.handle = handle
+        self.owner = owner
+        self.keep = keep
+        self._segment = segment
+        self._mapping = mapping
+        self._buffer = buffer
+        self._closed = False
+        self._lengths = buffer[HEADER:HEADER + LENGTH_BYTES * self.runs].cast('q')
+        self._values = buffer[HEADER + LENGTH_BYTES * self.runs:].cast('d')
+        self.lengths = np.frombuffer(buffer, dtype=np.int64, count=self.runs, offset=HEADER)
+        self.data = np.frombuffer(
+            buffer, dtype=np.float64, count=self.runs * len(self.columns) * self.rounds,
+            offset=HEADER + LENGTH_BYTES * self.runs,
+        ).reshape(self.runs, len(self.columns), self.rounds)
+
+    @staticmethod
+    def size(runs:int, columns:int, rounds:int):
+        return HEADER + LENGTH_BYTES * runs + VALUE_BYTES * runs * columns * rounds
+
+    @classmethod
+    def create(cls, runs:int, columns, rounds:int, path:str=None, keep:bool=False):
+        """
+        Args:
+            runs(int): number of runs.
+            columns(list[str]): recorded state fields (the flows' COLUMNS).
+            rounds(int): most rounds a run records.
+            path(str): memory-mapped file to create (replaced if it exists),
+                          a shared memory segment when None.
+            keep(bool): leaving the with block does not delete the file.
+        """
+        if runs <= 0 or rounds <= 0 or not columns:
+            raise ValueError(f'runs and rounds must be positive and columns not empty, got runs={runs}, rounds={rounds}, columns={columns}')
+        layout = {'runs': runs, 'columns': list(columns), 'rounds': rounds}
+        header = json.dumps(layout).encode()
+        if len(header) > HEADER:
+            raise ValueError(f'the layout takes {len(header)} bytes, more than the {HEADER} bytes of the header')
+        size = cls.size(runs, len(columns), rounds)
+        if path is None:
+            from multiprocessing import shared_memory
+            segment = shared_memory.SharedMemory(create=True, size=size)
+            buffer, mapping, handle = segment.buf, None, ('shm', segment.name)
+        else:
+            with open(path, 'w+b') as file:
+                # sparse: the pages of the values are only allocated when written.
+                file.truncate(size)
+                mapping = mmap.mmap(file.fileno(), size)
+            segment, handle = None, ('file', os.path.abspath(path))
+            buffer = memoryview(mapping)
+        buffer[:HEADER] = header.ljust(HEADER, b' ')
+        # a new segment is zeroed, a file grown by truncate reads as zeros.
+        return cls(buffer, layout, handle, True, segment, mapping, keep)
+
+    @classmethod
+    def attach(cls, handle:tuple, write:bool=True):
+        """
+            the store of `handle` (store.handle), in a worker process; the
+            caller closes it but does not unlink it.
+        """
+        kind, name = handle
+        if kind == 'shm':
+            segment = _attach_segment(name)
+            buffer, mapping = segment.buf, None
+        elif kind == 'file':
+            segment = None
+            with open(name, 'r+b' if write else 'rb') as file:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if write else mmap.ACCESS_READ)
+            buffer = memoryview(mapping)
+        else:
+            raise ValueError(f"unknown store kind {kind!r}, expected 'shm' or 'file'")
+        layout = json.loads(bytes(buffer[:HEADER]))
+        return cls(buffer, layout, handle, False, segment, mapping)
+
+    @classmethod
+    def open(cls, path:str):
+        """
+            a read-only store of a file kept after its run.
+        """
+        return cls.attach(('file', os.path.abspath(path)), write=False)
+
+    def recorder(self, run:int):
+        """
+            a recorder writing the rounds of `run` into the store, to set
+            as flow.recorder.
+        """
+        if not 0 <= run < self.runs:
+            raise ValueError(f'run must be in [0, {self.runs}), got {run}')
+        return SharedRecorder(self, run)
+
+    def column(self, name:str):
+        """
+            (runs, rounds) view of one state field; rounds past a run's
+            length are zero.
+        """
+        return self.data[:, self.columns.index(name)]
+
+    def run(self, run:int):
+        """
+            {column: view} of the rounds `run` recorded.
+        """
+        n = int(self.lengths[run])
+        return {name: self.data[run, c, :n] for c, name in enumerate(self.columns)}
+
+    def to_dataframe(self, run:int):
+        import pandas as pd
+        return pd.DataFrame({name: values.copy() for name, values in self.run(run).items()}, columns=list(self.columns))
+
+    def close(self):
+        """
+            releases the mapping of this process. While views handed out
+            (data, column(), run()) are alive the release is deferred until
+            the last of them is dropped.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        # the buffers NumPy exported the arrays from, weakly: they live as long as a view does.
+        exports = (weakref.ref(self.lengths.base), weakref.ref(self.data.base.base))
+        self.data = self.lengths = None
+        self._lengths.release()
+        self._values.release()
+        self._lengths = self._values = None
+        try:
+            self._release()
+        except BufferError:
+            for export in exports:
+                export = export()
+                if export is not None:
+                    weakref.finalize(export, self._release_later)
+
+    def _release(self):
+        self._buffer.release()
+        if self._segment is not None:
+            self._segment.close()
+        if self._mapping is not None:
+            self._mapping.close()
+
+    def _release_later(self):
+        """
+            retried as every exported buffer is freed, the last one succeeds.
+        """
+        try:
+            self._release()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """
+            frees the shared memory segment or deletes the file; only the
+            owner unlinks, the processes still attached keep their mapping.
+        """
+        if not self.owner:
+            raise ValueError('only the process that created the store unlinks it')
+        kind, name = self.handle
+        if kind == 'shm':
+            self._segment.unlink()
+        elif os.path.exists(name):
+            os.remove(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # unlinking does not need the mapping of this process closed.
+        try:
+            self.close()
+        finally:
+            if self.owner and not self.keep:
+                self.unlink()
+
+
+class SharedRecorder(StateRecorder):
+
+    def __init__(self, store:TraceStore, run:int):
+        """
+            StateRecorder of one run of a TraceStore: rounds are written into
+            the store in place, up to store.rounds of them.
+        """
+        self.columns = store.columns
+        self.capacity = store.rounds
+        self._store = store
+        self._run = run
+        width = store.rounds
+        first = run * len(store.columns) * width
+        self._arrays = tuple(
+            store._values[first + c * width:first + (c + 1) * width] for c in range(len(store.columns))
+        )
+        self._dataframe = None
+
+    def record(self, *values):
+        lengths, run = self._store._lengths, self._run
+        n = lengths[run]
+        if len(values) != len(self.columns):
+            raise ValueError(f'expected {len(self.columns)} values {self.columns}, got {len(values)}')
+        if n >= self.capacity:
+            raise ValueError(f'run {run} is full, the store holds {self.capacity} rounds')
+        for column, value in zip(self._arrays, values):
+            column[n] = value
+        lengths[run] = n + 1
+
+    def extend(self, *columns):
+        if len(columns) != len(self.columns):
+            raise ValueError(f'expected {len(self.columns)} columns {self.columns}, got {len(columns)}')
+        if len({len(values) for values in columns}) > 1:
+            raise ValueError('all columns must have the same length')
+        lengths, run = self._store._lengths, self._run
+        n, m = lengths[run], len(columns[0])
+        if n + m > self.capacity:
+            raise ValueError(f'run {run} is full, the store holds {self.capacity} rounds')
+        for column, values in zip(self._arrays, columns):
+            for i, value in enumerate(values, n):
+                column[i] = value
+        lengths[run] = n + m
+
+    def __len__(self):
+        return self._store._lengths[self._run]
+
+    def column(self, name):
+        return self._arrays[self.columns.index(name)][:len(self)]
+
+    def to_numpy(self):
+        import numpy as np
+        n = len(self)
+        return {name: np.frombuffer(column, dtype=np.float64, count=n) for name, column in zip(self.columns, self._arrays)}
+
+    def clear(self):
+        self._store._lengths[self._run] = 0
+        self._dataframe = None
+
+
+def record_runs(handle:tuple, algorithm:str, params:dict, seeds, rounds:int, first:int, early_stop:bool=False):
+    """
+        worker job: runs one headless flow per seed into runs first,
+        first + 1, ... of the store of `handle`; returns the rounds each run
+        recorded. With early_stop a run ends once its cwnd settles
+        (convergence.SteadyStateDetector).
+    """
+    from .convergence import SteadyStateDetector
+    cls, defaults = load(algorithm)
+    defaults.update(params)
+    store = TraceStore.attach(handle)
+    try:
+        recorded = []
+        for r, seed in enumerate(seeds):
+            flow = cls(**defaults, seed=seed)
+            flow.recorder = store.recorder(first + r)
+            stop = SteadyStateDetector() if early_stop else None
+            for _ in flow.iter_rounds(rounds, stop=stop):
+                pass
+            recorded.append(len(flow.recorder))
+            flow.recorder = None
+        return recorded
+    finally:
+        store.close()
+
+
+def _record(job):
+    return record_runs(*job)
+
+
+def collect_runs(algorithm:str, params:dict=None, seeds=(0,), rounds:int=1000, workers:int=None,
+                 path:str=None, keep:bool=False, early_stop:bool=False):
+    """
+        runs one flow per seed in worker processes and returns the TraceStore
+        (owned by the caller, use it in a with block) holding their state,
+        run i being seeds[i].
+
+    Args:
+        params(dict): parameters over the algorithm's defaults.
+        rounds(int): rounds of every run, the most it runs with early_stop.
+        workers(int): worker processes, defaults to os.cpu_count().
+        path(str): memory-mapped file instead of shared memory.
+        keep(bool): keep the file after the with block.
+        early_stop(bool): stop every run once its cwnd settles.
+    """
+    cls, _ = load(algorithm)
+    seeds = list(seeds)
+    params = dict(params or {})
+    store = TraceStore.create(len(seeds), cls.COLUMNS, rounds, path, keep)
+    try:
+        workers = min(workers or os.cpu_count() or 1, len(seeds))
+        # contiguous slices of seeds, so every worker writes its own runs.
+        bounds = [len(seeds) * w // workers for w in range(workers + 1)]
+        jobs = [
+            (store.handle, algorithm, params, seeds[lo:hi], rounds, lo, early_stop)
+            for lo, hi in zip(bounds, bounds[1:]) if hi > lo
+        ]
+        if workers == 1:
+            for job in jobs:
+                _record(job)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_record, jobs))
+    except BaseException:
+        store.close()
+        if not keep:
+            store.unlink()
+        raise
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs seeded flows in parallel into a shared trace store.')
+    parser.add_argument('algorithm', choices=names())
+    parser.add_argument('--seeds', type=int, default=8, help='runs, seeds 0 .. N-1')
+    parser.add_argument('--rounds', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--path', default=None, help='memory-mapped file to keep instead of shared memory')
+    parser.add_argument('--early-stop', action='store_true', help='stop each run once its cwnd settles')
+    args = parser.parse_args(argv)
+
+    with collect_runs(
+        args.algorithm, seeds=range(args.seeds), rounds=args.rounds, workers=args.workers,
+        path=args.path, keep=args.path is not None, early_stop=args.early_stop,
+    ) as store:
+        cwnd, lengths = store.column('cwnd'), store.lengths
+        for run in range(store.runs):
+            n = int(lengths[run])
+            print(f'seed {run}: {n} rounds, mean cwnd {cwnd[run, :n].mean():.4g}')
+        del cwnd, lengths
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Streaming columnar export of the per-round state.
+
+StateRecorder keeps every round in memory until the run ends. StreamingRecorder
+only keeps the current chunk: every `chunk_rows` rounds the chunk is appended
+to the column files of a directory, so a run of 10^8 rounds needs the memory of
+one chunk and the result is read back without any CSV parsing.
+
+Formats:
+    npy       one appendable .npy file per column. The header is rewritten
+              with the new length after every chunk, so the columns written
+              so far can be memory-mapped (np.load(mmap_mode='r')) at any time.
+    parquet   one part-NNNNN.parquet file per chunk (needs pyarrow).
+
+manifest.json in the directory lists the format, the columns and the number
+of rows. read_columns and read_dataframe load a directory back.
+
+    flow.recorder = StreamingRecorder(flow.recorder.columns, 'run1')
+    ...
+    flow.recorder.close()
+    columns = read_columns('run1')          # {column: memory-mapped array}
+"""
+import json, os, struct, sys
+from array import array
+
+from .recording import StateRecorder
+
+
+FORMATS = ('npy', 'parquet')
+MANIFEST = 'manifest.json'
+
+_NPY_HEADER = 128
+_DESCR = '<f8' if sys.byteorder == 'little' else '>f8'
+
+
+def _npy_header(rows:int):
+    """
+        a fixed-size .npy (version 1.0) header, so it can be rewritten in place.
+    """
+    header = f"{{'descr': '{_DESCR}', 'fortran_order': False, 'shape': ({rows},), }}"
+    header = header.ljust(_NPY_HEADER - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class ColumnSink:
+
+    def __init__(self, directory:str, columns, format:str='npy'):
+        """
+        Args:
+            directory(str): created if needed; previous data in it is replaced.
+            columns(list[str]): names of the columns.
+            format(str): 'npy' or 'parquet'.
+
+        Other Instance Variables:
+            rows(int): rows written so far.
+            chunks(int): chunks written so far.
+            closed(bool): close() was called, nothing can be written.
+        """
+        if format not in FORMATS:
+            raise ValueError(f'unknown format {format!r}, expected one of {FORMATS}')
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.format = format
+        self.rows = 0
+        self.chunks = 0
+        self.closed = False
+        self._files = None
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.closed = False
+        self._remove_data()
+        if self.format == 'npy':
+            self._files = []
+            for name in self.columns:
+                file = open(os.path.join(self.directory, f'{name}.npy'), 'w+b')
+                file.write(_npy_header(0))
+                self._files.append(file)
+        else:
+            import pyarrow  # noqa: F401, fail early without pyarrow.
+        self._write_manifest()
+
+    def _remove_data(self):
+        for entry in os.listdir(self.directory):
+            if entry == MANIFEST or (entry.endswith('.npy') and entry[:-4] in self.columns) \
+                    or (entry.startswith('part-') and entry.endswith('.parquet')):
+                os.remove(os.path.join(self.directory, entry))
+
+    def _write_manifest(self):
+        manifest = {'format': self.format, 'columns': list(self.columns), 'rows': self.rows}
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(manifest, file)
+        os.replace(path + '.tmp', path)
+
+    def write(self, columns):
+        """
+            appends one chunk, one sequence of float64 values per column
+            (array('d') is written without a copy).
+        """
+        if self.closed:
+            raise ValueError('sink is closed')
+        if len(columns) != len(self.columns):
+            raise ValueError(f'expected {len(self.columns)} columns {self.columns}, got {len(columns)}')
+        rows = len(columns[0])
+        if not rows:
+            return
+        if self.format == 'npy':
+            for file, values in zip(self._files, columns):
+                if not isinstance(values, array):
+                    values = array('d', values)
+                file.seek(0, os.SEEK_END)
+                values.tofile(file)
+                file.seek(0)
+                file.write(_npy_header(self.rows + rows))
+                file.flush()
+        else:
+            import numpy as np
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({
+                name: np.frombuffer(values, dtype=np.float64) if isinstance(values, array)
+                else np.asarray(values, dtype=np.float64)
+                for name, values in zip(self.columns, columns)
+            })
+            pq.write_table(table, os.path.join(self.directory, f'part-{self.chunks:05d}.parquet'))
+        self.rows += rows
+        self.chunks += 1
+        self._write_manifest()
+
+    def clear(self):
+        """
+            drops everything written so far.
+        """
+        self.close()
+        self.rows = self.chunks = 0
+        self._open()
+
+    def close(self):
+        self.closed = True
+        if self._files is not None:
+            for file in self._files:
+                file.close()
+            self._files = None
+
+
+class StreamingRecorder(StateRecorder):
+
+    def __init__(self, columns, directory:str, chunk_rows:int=65536, format:str='npy'):
+        """
+            a StateRecorder that streams its rounds to `directory` in chunks of
+            `chunk_rows`. column(), to_numpy() and to_dataframe() flush the
+            current chunk and read the whole run back from the directory.
+        """
+        if chunk_rows < 1:
+            raise ValueError(f'chunk_rows must be positive, got {chunk_rows}')
+        super().__init__(columns)
+        self.chunk_rows = chunk_rows
+        self.sink = ColumnSink(directory, self.columns, format)
+
+    def record(self, *values):
+        if self.sink.closed:
+            raise ValueError('sink is closed')
+        super().record(*values)
+        if len(self._arrays[0]) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, *columns):
+        if self.sink.closed:
+            raise ValueError('sink is closed')
+        super().extend(*columns)
+        if len(self._arrays[0]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """
+            writes the buffered rounds to the sink.
+        """
+        if len(self._arrays[0]):
+            self.sink.write(self._arrays)
+            for column in self._arrays:
+                del column[:]
+
+    def __len__(self):
+        return self.sink.rows + len(self._arrays[0])
+
+    def column(self, name):
+        return self.to_numpy()[name]
+
+    def to_numpy(self):
+        """
+            returns {column: array} of the whole run, memory-mapped for npy.
+        """
+        self.flush()
+        return read_columns(self.sink.directory)
+
+    def clear(self):
+        super().clear()
+        self.sink.clear()
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+def read_manifest(directory:str):
+    with open(os.path.join(directory, MANIFEST)) as file:
+        return json.load(file)
+
+
+def read_columns(directory:str, columns=None):
+    """
+        returns {column: numpy array} of a streamed run. npy columns are
+        memory-mapped read-only, parquet parts are read through memory maps
+        and concatenated.
+    """
+    import numpy as np
+    manifest = read_manifest(directory)
+    columns = list(columns or manifest['columns'])
+    rows = manifest['rows']
+    if manifest['format'] == 'npy':
+        result = {}
+        for name in columns:
+            if rows == 0:
+                result[name] = np.empty(0)
+                continue
+            # the manifest is written after the data, so it never counts
+            # rows a reader cannot see yet.
+            result[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')[:rows]
+        return result
+
+    import pyarrow.parquet as pq
+    parts = sorted(entry for entry in os.listdir(directory) if entry.startswith('part-'))
+    tables = [
+        pq.read_table(os.path.join(directory, part), columns=columns, memory_map=True)
+        for part in parts
+    ]
+    return {
+        name: np.concatenate([table.column(name).to_numpy() for table in tables]) if tables else np.empty(0)
+        for name in columns
+    }
+
+
+def read_dataframe(directory:str, columns=None):
+    import pandas as pd
+    data = read_columns(directory, columns)
+    return pd.DataFrame(data, columns=list(data))
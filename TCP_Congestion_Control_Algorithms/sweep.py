@@ -0,0 +1,238 @@
+"""
+Parameter sweeps over the four implementations.
+
+A sweep expands parameter ranges into configurations (full grid or random
+search), runs every (configuration, seed) pair in a ProcessPoolExecutor sized
+to the machine and returns one row per run with summary metrics.
+
+    python -m TCP_Congestion_Control_Algorithms.sweep bic-article \\
+        --param SMAX=3,5,8 --param BETA=0.1:0.3:5 --seeds 1 2 3 --rounds 1000
+
+Parameter specs:
+    a,b,c        the listed values.
+    lo:hi        a uniform draw per configuration (random search only).
+    lo:hi:num    num evenly spaced values from lo to hi (grid).
+
+With --cache (or cache=), runs already in the result cache (cache.py) are
+not run again; --force runs them anyway and replaces the cached rows.
+With --early-stop (or early_stop=True), --rounds is an upper bound: each run
+stops once convergence.SteadyStateDetector finds its cwnd settled.
+"""
+import argparse, itertools, os, random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .convergence import run_until_steady
+from .core.registry import VARIANTS as ALGORITHMS, load as load_algorithm
+
+
+def convergence_round(cwnd, window:int=None, tolerance:float=0.1):
+    """
+        first round from which the moving average of cwnd (over `window`
+        rounds, a tenth of the run by default) stays within `tolerance` of
+        the mean of the second half of the run. returns len(cwnd) + 1 when
+        the run never settles.
+    """
+    cwnd = np.asarray(cwnd, dtype=np.float64)
+    window = max(1, min(window or len(cwnd) // 10, len(cwnd) // 2))
+    steady = cwnd[len(cwnd) // 2:].mean()
+    cumsum = np.concatenate(([0.0], np.cumsum(cwnd)))
+    moving = (cumsum[window:] - cumsum[:-window]) / window
+    outside = np.flatnonzero(np.abs(moving - steady) > tolerance * abs(steady))
+    if len(outside) == 0:
+        return 1
+    if outside[-1] == len(moving) - 1:
+        return len(cwnd) + 1
+    # moving[i] averages rounds i+1 .. i+window.
+    return int(outside[-1]) + window + 1
+
+
+def run_configuration(algorithm:str, params:dict, seed:int, rounds:int):
+    """
+        runs one headless flow for `rounds` rounds and returns its summary.
+    """
+    cls, defaults = load_algorithm(algorithm)
+    defaults.update(params)
+    flow = cls(**defaults, seed=seed)
+    for _ in range(rounds):
+        flow.step()
+    cwnd = flow.recorder.column('cwnd')
+    return {
+        'algorithm': algorithm, **params, 'seed': seed, 'rounds': rounds,
+        'mean_cwnd': sum(cwnd) / len(cwnd),
+        'loss_count': flow.loss_count,
+        'convergence_round': convergence_round(cwnd),
+    }
+
+
+def run_configuration_until_steady(algorithm:str, params:dict, seed:int, rounds:int):
+    """
+        runs one headless flow until its cwnd settles (at most `rounds`
+        rounds) and returns its summary; mean_cwnd is the steady state
+        mean, or the mean over the rounds run when cwnd did not settle
+        (convergence_round is None then), stopped_round the number of
+        rounds run.
+    """
+    cls, defaults = load_algorithm(algorithm)
+    defaults.update(params)
+    flow = cls(**defaults, seed=seed)
+    detector = run_until_steady(flow, rounds, record=False)
+    return {
+        'algorithm': algorithm, **params, 'seed': seed, 'rounds': rounds,
+        'mean_cwnd': detector.mean if detector.converged else detector.total / detector.rounds,
+        'loss_count': flow.loss_count,
+        'convergence_round': detector.round if detector.converged else None,
+        'convergence': detector.kind,
+        'stopped_round': detector.rounds,
+    }
+
+
+def _run(job):
+    function, *arguments = job
+    return function(*arguments)
+
+
+def parse_spec(spec:str):
+    """
+        parses one NAME=VALUES argument into (name, values), see module docs.
+        values is a list or, for lo:hi, a (lo, hi) tuple.
+    """
+    name, sep, values = spec.partition('=')
+    if not sep or not values:
+        raise ValueError(f'expected NAME=VALUES, got {spec!r}')
+
+    def number(text):
+        if text in ('True', 'False'):
+            return text == 'True'
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+
+    if ':' in values:
+        parts = [number(part) for part in values.split(':')]
+        if len(parts) == 2:
+            return name, tuple(parts)
+        if len(parts) == 3:
+            lo, hi, num = parts
+            return name, [float(value) for value in np.linspace(lo, hi, int(num))]
+        raise ValueError(f'expected lo:hi or lo:hi:num, got {values!r}')
+    return name, [number(part) for part in values.split(',')]
+
+
+def expand(space:dict, samples:int=None, seed:int=None):
+    """
+    Args:
+        space(dict): {parameter: list of values or (lo, hi) range}.
+        samples(int): random search with this many configurations;
+                         None for the full grid (ranges are not allowed then).
+        seed(int): seed of the random search.
+
+    Returns:
+        list of {parameter: value} configurations.
+    """
+    if samples is None:
+        ranges = [name for name, values in space.items() if isinstance(values, tuple)]
+        if ranges:
+            raise ValueError(f'lo:hi ranges need random search (samples), got {ranges}')
+        names = list(space)
+        return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+    rng = random.Random(seed)
+    configurations = []
+    for _ in range(samples):
+        configuration = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                lo, hi = values
+                both_int = isinstance(lo, int) and isinstance(hi, int)
+                configuration[name] = rng.randint(lo, hi) if both_int else rng.uniform(lo, hi)
+            else:
+                configuration[name] = rng.choice(values)
+        configurations.append(configuration)
+    return configurations
+
+
+def sweep(algorithm:str, space:dict, seeds=(0,), rounds:int=1000,
+          samples:int=None, search_seed:int=None, workers:int=None,
+          cache=None, force:bool=False, early_stop:bool=False):
+    """
+        runs every configuration of `space` (see expand) with every seed and
+        returns a pandas DataFrame with one row per run.
+
+    Args:
+        search_seed(int): seed of the random search.
+        workers(int): worker processes, defaults to os.cpu_count().
+        cache(ResultCache): result cache (or its directory), None runs
+                               everything.
+        force(bool): run the cached runs again and replace their rows.
+        early_stop(bool): stop each run once it settles, `rounds` being
+                             the most it runs (run_configuration_until_steady).
+    """
+    import pandas as pd
+    from .cache import ResultCache, result_key
+    load_algorithm(algorithm)
+    if rounds < 1:
+        raise ValueError(f'rounds must be at least 1, got {rounds}')
+    function = run_configuration_until_steady if early_stop else run_configuration
+    jobs = [
+        (function, algorithm, configuration, seed, rounds)
+        for configuration in expand(space, samples, search_seed)
+        for seed in seeds
+    ]
+    cache = ResultCache.of(cache)
+    rows = [None] * len(jobs)
+    keys = [result_key(*job) for job in jobs] if cache is not None else None
+    if cache is not None and not force:
+        rows = [cache.get(key) for key in keys]
+    pending = [i for i, row in enumerate(rows) if row is None]
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, row in zip(pending, executor.map(_run, [jobs[i] for i in pending], chunksize=chunksize)):
+                rows[i] = row
+                if cache is not None:
+                    cache.put(keys[i], row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parameter sweep over a congestion control algorithm.')
+    parser.add_argument('algorithm', choices=sorted(ALGORITHMS))
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES',
+                        help='a,b,c | lo:hi (random search) | lo:hi:num (grid), repeatable')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=None,
+                        help='random search with this many configurations instead of the grid')
+    parser.add_argument('--search-seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help='CSV file, printed when omitted')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='DIRECTORY',
+                        help='use the result cache, in its default directory when none is given')
+    parser.add_argument('--force', action='store_true', help='run cached runs again')
+    parser.add_argument('--early-stop', action='store_true',
+                        help='stop each run once its cwnd settles, --rounds at most')
+    args = parser.parse_args(argv)
+    if args.rounds < 1:
+        parser.error(f'--rounds must be at least 1, got {args.rounds}')
+
+    space = dict(parse_spec(spec) for spec in args.param)
+    cache = None
+    if args.cache is not None:
+        from .cache import ResultCache
+        cache = ResultCache(args.cache or None)
+    table = sweep(
+        args.algorithm, space, args.seeds, args.rounds,
+        args.samples, args.search_seed, args.workers, cache, args.force, args.early_stop,
+    )
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
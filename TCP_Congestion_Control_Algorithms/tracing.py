@@ -0,0 +1,242 @@
+"""
+Structured trace channel.
+
+The classes used to call logging.info(f"...") in every branch, so every line
+was formatted even with nobody reading the log. A flow now records compact
+binary events instead (round, event code and up to three numeric fields) and
+the text is only produced offline, by a decoder that reproduces the old log
+lines:
+
+    tracer = Tracer('run.trace')
+    flow = BICTCPCongestionControl(..., tracer=tracer)
+    ...
+    tracer.close()
+
+    python -m TCP_Congestion_Control_Algorithms.tracing run.trace -o log.log
+
+Every implementation registers its events in an EventTable. The event
+constants are bit masks: call sites are guarded by `if self.trace_mask & EVENT`
+and a flow without a tracer has trace_mask 0, so tracing that is off costs one
+integer test per call site. Pass mask=A | B to a Tracer to keep only some events.
+
+A record is RECORD float64 values: round, code, field type tags and FIELDS
+fields. Records go into a fixed-size buffer that is written to the file in one
+call when it is full; a tracer without a file keeps the buffer as a ring of the
+last `capacity` events.
+
+File layout: MAGIC, header length (uint32, little endian), JSON header with
+the event templates and the byte order, then the records.
+"""
+import struct, sys
+from array import array
+
+MAGIC = b'CCTRACE1'
+FIELDS = 3
+RECORD = 3 + FIELDS
+# mask enabling every event.
+ALL = -1
+
+# type tags, 3 bits per field; 0 marks the end of the fields.
+_INT, _FLOAT, _BOOL, _NONE = 1, 2, 3, 4
+_TAGS = {int: _INT, float: _FLOAT, bool: _BOOL, type(None): _NONE}
+
+# code 0 of every table: the blank line the __main__ blocks log between rounds.
+ROUND_END = 1
+
+
+class EventTable:
+
+    def __init__(self):
+        """
+        Instance Variables:
+            templates(list[str]): str.format template of every event code;
+                                     the first placeholder is the round.
+        """
+        self.templates = ['']
+
+    def add(self, template:str):
+        """
+            registers an event and returns its bit mask.
+        """
+        self.templates.append(template)
+        return 1 << (len(self.templates) - 1)
+
+
+class Tracer:
+
+    def __init__(self, path:str=None, mask:int=ALL, capacity:int=4096):
+        """
+        Args:
+            path(str): trace file, None keeps the events in memory only.
+            mask(int): enabled events, an OR of event bit masks.
+            capacity(int): events buffered between two writes (the size of
+                              the ring without a file).
+
+        Other Instance Variables:
+            templates(list[str]): templates of the bound EventTable.
+            count(int): number of events emitted so far.
+        """
+        if capacity < 1:
+            raise ValueError(f'capacity must be positive, got {capacity}')
+        self.path = path
+        self.mask = mask
+        self.capacity = capacity
+        self.templates = None
+        self.count = 0
+        self._buffer = array('d', bytes(8 * RECORD * capacity))
+        self._index = 0
+        self._wrapped = False
+        self._file = None
+
+    def bind(self, events:EventTable):
+        """
+            attaches the tracer to the events of an implementation (writing
+            the file header) and returns the mask the flow checks.
+            flows sharing a tracer must use the same table.
+        """
+        if self.templates is None:
+            self.templates = events.templates
+            if self.path is not None:
+                import json
+                header = json.dumps({'templates': self.templates, 'byteorder': sys.byteorder}).encode()
+                self._file = open(self.path, 'wb')
+                self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        elif self.templates is not events.templates:
+            raise ValueError('a tracer can only record the events of one implementation')
+        return self.mask
+
+    def emit(self, event:int, round_number:int, *values):
+        """
+            records one event; call sites check the mask before calling.
+        """
+        buffer, i = self._buffer, self._index
+        buffer[i] = round_number
+        buffer[i + 1] = event.bit_length() - 1
+        tags, shift = 0, 0
+        for n, value in enumerate(values, i + 3):
+            tag = _TAGS.get(type(value), _FLOAT)
+            buffer[n] = value if tag != _NONE else 0.0
+            tags |= tag << shift
+            shift += 3
+        buffer[i + 2] = tags
+        self.count += 1
+        i += RECORD
+        if i == len(buffer):
+            if self._file is not None:
+                self._index = i
+                self.flush()
+                return
+            i = 0
+            self._wrapped = True
+        self._index = i
+
+    def end_round(self, round_number:int):
+        if self.mask & ROUND_END:
+            self.emit(ROUND_END, round_number)
+
+    def flush(self):
+        """
+            writes the buffered events to the file.
+        """
+        if self._file is not None and self._index:
+            self._buffer[:self._index].tofile(self._file)
+            self._file.flush()
+            self._index = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def records(self):
+        """
+            returns the events still in memory, oldest first, as array('d').
+        """
+        if self._wrapped:
+            return self._buffer[self._index:] + self._buffer[:self._index]
+        return self._buffer[:self._index]
+
+    def lines(self):
+        """
+            decodes the events still in memory into log lines.
+        """
+        return format_records(self.templates, self.records())
+
+
+def read(path:str):
+    """
+        returns (templates, records) of a trace file, records being array('d').
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a trace file')
+        (size,) = struct.unpack('<I', file.read(4))
+        import json
+        header = json.loads(file.read(size))
+        records = array('d')
+        records.frombytes(file.read())
+    if header['byteorder'] != sys.byteorder:
+        records.byteswap()
+    return header['templates'], records
+
+
+def format_records(templates, records):
+    """
+        yields the log line of every record.
+    """
+    for i in range(0, len(records), RECORD):
+        code, tags = int(records[i + 1]), int(records[i + 2])
+        values, n = [], i + 3
+        while tags:
+            tag, value = tags & 7, records[n]
+            if tag == _INT:
+                value = int(value)
+            elif tag == _BOOL:
+                value = bool(value)
+            elif tag == _NONE:
+                value = None
+            values.append(value)
+            tags >>= 3
+            n += 1
+        yield templates[code].format(int(records[i]), *values)
+
+
+def decode(path:str):
+    """
+        yields the log lines of a trace file.
+    """
+    return format_records(*read(path))
+
+
+def decode_file(path:str, output:str):
+    """
+        writes the log lines of a trace file to `output`.
+    """
+    with open(output, 'w') as file:
+        for line in decode(path):
+            file.write(line + '\n')
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Decode a trace file into log lines.')
+    parser.add_argument('trace')
+    parser.add_argument('-o', '--output', default=None, help='log file, printed when omitted')
+    args = parser.parse_args(argv)
+
+    if args.output:
+        decode_file(args.trace, args.output)
+    else:
+        for line in decode(args.trace):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()